@@ -0,0 +1,58 @@
+import argparse
+import time
+from typing import Callable, Dict, List, Tuple
+
+from langchain_text_splitters import MarkdownHeaderTextSplitter, RecursiveCharacterTextSplitter
+
+from benchmarks.synthetic_corpus import SyntheticCorpus
+from src.config.settings import Settings
+from src.document.header_sections import HEADERS_TO_SPLIT_ON
+from src.document.text_chunker import TextChunker
+
+ChunkView = Tuple[str, Dict[str, str]]
+
+
+def parse_arguments() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Compare the native chunker against the LangChain splitters.")
+    parser.add_argument("--sections", type=int, default=5000)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=7)
+    return parser.parse_args()
+
+
+def langchain_chunks(text: str, chunk_size: int, overlap: int) -> List[ChunkView]:
+    header_splitter = MarkdownHeaderTextSplitter(headers_to_split_on=HEADERS_TO_SPLIT_ON)
+    text_splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=overlap)
+    documents = text_splitter.split_documents(header_splitter.split_text(text))
+    return [(document.page_content, document.metadata) for document in documents]
+
+
+def native_chunks(text: str, chunk_size: int, overlap: int) -> List[ChunkView]:
+    return [(chunk.content, chunk.metadata) for chunk in TextChunker(chunk_size, overlap).chunk(text)]
+
+
+def best_seconds(operation: Callable[[], object], repeats: int) -> float:
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        operation()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main() -> None:
+    arguments = parse_arguments()
+    settings = Settings()
+    text = SyntheticCorpus(seed=arguments.seed).markdown(arguments.sections)
+    size, overlap = settings.chunk_size, settings.chunk_overlap
+    expected = langchain_chunks(text, size, overlap)
+    if native_chunks(text, size, overlap) != expected:
+        raise SystemExit("Native chunker boundaries differ from the LangChain splitters.")
+    megabytes = len(text.encode("utf-8")) / 1_000_000
+    for name, chunker in (("langchain", langchain_chunks), ("native", native_chunks)):
+        seconds = best_seconds(lambda: chunker(text, size, overlap), arguments.repeats)
+        print(f"{name:>10}  chunks={len(expected)}  {megabytes / seconds:.2f} MB/s  {len(expected) / seconds:.0f} chunks/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+import argparse
+import json
+from typing import Dict, Iterator, Tuple
+
+HIGHER_IS_BETTER = ("per_second", "recall")
+
+
+def flatten(record: Dict, prefix: str = "") -> Iterator[Tuple[str, float]]:
+    for key, value in record.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            yield from flatten(value, f"{name}.")
+            continue
+        if isinstance(value, (int, float)):
+            yield name, float(value)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare two benchmark suite reports.")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Percent change flagged as a regression.")
+    arguments = parser.parse_args()
+    with open(arguments.baseline, "r", encoding="utf-8") as file:
+        baseline = {result["sections"]: dict(flatten(result)) for result in json.load(file)["results"]}
+    with open(arguments.candidate, "r", encoding="utf-8") as file:
+        candidate = {result["sections"]: dict(flatten(result)) for result in json.load(file)["results"]}
+    for sections in sorted(baseline.keys() & candidate.keys()):
+        print(f"== sections={sections}")
+        for metric, before in baseline[sections].items():
+            after = candidate[sections].get(metric)
+            if after is None or before == 0:
+                continue
+            change = (after - before) / before * 100
+            better = any(marker in metric for marker in HIGHER_IS_BETTER)
+            regressed = change < -arguments.threshold if better else change > arguments.threshold
+            flag = "  REGRESSION" if regressed else ""
+            print(f"  {metric:<45} {before:>12.3f} → {after:>12.3f} ({change:+.1f}%){flag}")
+
+
+if __name__ == "__main__":
+    main()
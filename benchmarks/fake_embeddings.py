@@ -0,0 +1,76 @@
+import hashlib
+import re
+from collections import Counter
+from typing import List
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from qdrant_client.http import models
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def _token_hash(token: str) -> int:
+    return int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class HashingDenseEmbeddings(Embeddings):
+    def __init__(self, dimension: int = 256):
+        self._dimension = dimension
+
+    def dimension(self) -> int:
+        return self._dimension
+
+    def warmup(self) -> None:
+        return None
+
+    def embed(self, text: str) -> List[float]:
+        return self.embed_query(text)
+
+    def embed_many(self, texts: List[str]) -> List[List[float]]:
+        return self.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        vector = np.zeros(self._dimension, dtype=np.float32)
+        for token in tokenize(text):
+            token_hash = _token_hash(token)
+            sign = 1.0 if token_hash & 1 else -1.0
+            vector[(token_hash >> 1) % self._dimension] += sign
+        norm = np.linalg.norm(vector)
+        if norm == 0:
+            vector[0] = 1.0
+            return vector.tolist()
+        return (vector / norm).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self.embed_query(text) for text in texts]
+
+
+class HashingSparseEmbedder:
+    VOCABULARY_SIZE = 1 << 20
+
+    def warmup(self) -> None:
+        return None
+
+    def embed(self, text: str) -> models.SparseVector:
+        return self._vector(Counter(set(tokenize(text))))
+
+    def embed_queries(self, texts: List[str]) -> List[models.SparseVector]:
+        return [self.embed(text) for text in texts]
+
+    def embed_many(self, texts: List[str]) -> List[models.SparseVector]:
+        return [self._vector(Counter(tokenize(text))) for text in texts]
+
+    def _vector(self, counts: Counter) -> models.SparseVector:
+        if not counts:
+            return models.SparseVector(indices=[0], values=[0.0])
+        weights = {}
+        for token, count in counts.items():
+            index = _token_hash(token) % self.VOCABULARY_SIZE
+            weights[index] = weights.get(index, 0.0) + float(count)
+        indices = sorted(weights)
+        return models.SparseVector(indices=indices, values=[weights[index] for index in indices])
@@ -0,0 +1,261 @@
+import argparse
+import bisect
+import json
+import os
+import random
+import subprocess
+import time
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+from qdrant_client import QdrantClient
+from qdrant_client.http import models
+from qdrant_client.hybrid.fusion import DEFAULT_RANKING_CONSTANT_K, distribution_based_score_fusion
+
+from benchmarks.fake_embeddings import HashingDenseEmbeddings, HashingSparseEmbedder
+from benchmarks.synthetic_corpus import SyntheticCorpus
+from src.config.settings import Settings
+from src.document.text_chunker import TextChunk, TextChunker
+from src.embeddings.sparse_embedder import SparseEmbedder
+from src.local.local_hybrid_index import LocalHybridIndex
+from src.local.local_hybrid_searcher import LocalHybridSearcher
+from src.search.hybrid_searcher import HybridSearcher
+from src.storage.collection_manager import CollectionManager
+from src.storage.document_inserter import DocumentInserter
+
+
+class TimedClient:
+    def __init__(self, client):
+        self._client = client
+        self.upsert_seconds = 0.0
+
+    def upsert(self, **kwargs) -> None:
+        started = time.perf_counter()
+        self._client.upsert(**kwargs)
+        self.upsert_seconds += time.perf_counter() - started
+
+
+def parse_arguments() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Offline ingestion, latency and recall benchmarks.")
+    parser.add_argument("--sizes", default="50,250,1000", help="Comma-separated corpus sizes in sections.")
+    parser.add_argument("--backend", choices=["memory", "local"], default="memory")
+    parser.add_argument("--sparse", choices=["bm25", "hashed"], default="bm25")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--limit", type=int, default=3)
+    parser.add_argument("--dimension", type=int, default=256)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", default="")
+    return parser.parse_args()
+
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    return {
+        "p50": float(np.percentile(samples, 50)),
+        "p95": float(np.percentile(samples, 95)),
+        "p99": float(np.percentile(samples, 99)),
+    }
+
+
+def timed(operation: Callable[[], object]) -> float:
+    started = time.perf_counter()
+    operation()
+    return time.perf_counter() - started
+
+
+def build_searcher(arguments, settings, dense, sparse, chunks: List[TextChunk]) -> Dict[str, object]:
+    if arguments.backend == "local":
+        index = LocalHybridIndex(settings, dense.dimension())
+        client = TimedClient(index)
+        inserter = DocumentInserter(client, settings, dense, sparse)
+        seconds = timed(lambda: (inserter.insert(chunks, source="bench"), index.count()))
+        searcher = LocalHybridSearcher(index, settings, dense, sparse, limit=arguments.limit)
+        return {"searcher": searcher, "insert_seconds": seconds, "upsert_seconds": client.upsert_seconds}
+    qdrant = QdrantClient(":memory:")
+    CollectionManager(qdrant, settings).recreate(embedding_dimension=dense.dimension())
+    client = TimedClient(qdrant)
+    seconds = timed(lambda: DocumentInserter(client, settings, dense, sparse).insert(chunks, source="bench"))
+    searcher = HybridSearcher(
+        settings,
+        limit=arguments.limit,
+        client=qdrant,
+        dense_embeddings=dense,
+        sparse_embedder=sparse,
+    )
+    return {"searcher": searcher, "insert_seconds": seconds, "upsert_seconds": client.upsert_seconds}
+
+
+class ExactHybridSearch:
+    SCORE_DECIMALS = 5
+
+    def __init__(self, settings, dense, sparse, chunks: List[TextChunk], limit: int):
+        stored = {DocumentInserter.point_id("bench", chunk.key()): chunk for chunk in chunks}
+        contents = [chunk.content for chunk in stored.values()]
+        self._ids = list(stored)
+        self._metadata = [chunk.metadata for chunk in stored.values()]
+        self._vectors = self._normalized(np.asarray(dense.embed_many(contents), dtype=np.float32))
+        self._postings: Dict[int, List[Tuple[int, float]]] = {}
+        for row, vector in enumerate(sparse.embed_many(contents)):
+            for index, value in zip(vector.indices, vector.values):
+                self._postings.setdefault(index, []).append((row, value))
+        self._dense = dense
+        self._sparse = sparse
+        self._fusion = settings.hybrid_fusion
+        self._limit = limit
+
+    def exact_ids(self, query: str, metadata: Optional[Dict[str, str]]) -> Set[str]:
+        rows = [row for row, stored in enumerate(self._metadata) if self._matches(stored, metadata or {})]
+        rankings = [self._dense_scores(query, rows), self._sparse_scores(query, set(rows))]
+        bounds = self._bounds(rankings)
+        if not bounds:
+            return set()
+        pessimistic = sorted((low for _, low in bounds.values()), reverse=True)
+        threshold = pessimistic[min(self._limit, len(pessimistic)) - 1]
+        return {self._ids[row] for row, (high, _) in bounds.items() if high >= threshold - 1e-9}
+
+    def _bounds(self, rankings: List[Dict[int, float]]) -> Dict[int, Tuple[float, float]]:
+        if self._fusion == "rrf":
+            return self._rrf_bounds(rankings)
+        if self._fusion == "dbsf":
+            return self._dbsf_bounds(rankings)
+        raise ValueError(f"Unknown hybrid fusion '{self._fusion}'.")
+
+    @classmethod
+    def _rrf_bounds(cls, rankings: List[Dict[int, float]]) -> Dict[int, Tuple[float, float]]:
+        bounds: Dict[int, Tuple[float, float]] = {}
+        for scores in rankings:
+            rounded = {row: round(score, cls.SCORE_DECIMALS) for row, score in scores.items()}
+            ascending = sorted(rounded.values())
+            for row, score in rounded.items():
+                first = len(ascending) - bisect.bisect_right(ascending, score)
+                last = len(ascending) - bisect.bisect_left(ascending, score) - 1
+                high, low = bounds.get(row, (0.0, 0.0))
+                bounds[row] = (high + cls._rrf(first), low + cls._rrf(last))
+        return bounds
+
+    @staticmethod
+    def _rrf(position: int) -> float:
+        return 1 / (position + DEFAULT_RANKING_CONSTANT_K)
+
+    def _dbsf_bounds(self, rankings: List[Dict[int, float]]) -> Dict[int, Tuple[float, float]]:
+        responses = [
+            [models.ScoredPoint(id=row, version=0, score=float(score)) for row, score in scores.items()]
+            for scores in rankings
+        ]
+        fused = distribution_based_score_fusion(responses, limit=len(self._ids))
+        return {point.id: (point.score, point.score) for point in fused}
+
+    def _dense_scores(self, query: str, rows: List[int]) -> Dict[int, float]:
+        query_vector = self._normalized(np.asarray([self._dense.embed_query(query)], dtype=np.float32))[0]
+        scores = self._vectors[rows] @ query_vector
+        return {row: float(score) for row, score in zip(rows, scores)}
+
+    def _sparse_scores(self, query: str, rows: Set[int]) -> Dict[int, float]:
+        query_vector = self._sparse.embed_queries([query])[0]
+        scores: Dict[int, float] = {}
+        for index, value in zip(query_vector.indices, query_vector.values):
+            for row, weight in self._postings.get(index, []):
+                if row in rows:
+                    scores[row] = scores.get(row, 0.0) + value * weight
+        return scores
+
+    @staticmethod
+    def _matches(stored: Dict[str, str], metadata: Dict[str, str]) -> bool:
+        return all(stored.get(field) == value for field, value in metadata.items())
+
+    @staticmethod
+    def _normalized(vectors: np.ndarray) -> np.ndarray:
+        return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+
+def sample_queries(chunks: List[TextChunk], count: int, seed: int) -> List[Dict[str, object]]:
+    generator = random.Random(seed)
+    sampled = [generator.choice(chunks) for _ in range(count)]
+    return [
+        {
+            "text": " ".join(chunk.content.split()[:12]),
+            "metadata": {"header_2": chunk.metadata["header_2"]} if "header_2" in chunk.metadata else None,
+        }
+        for chunk in sampled
+    ]
+
+
+def run_queries(searcher, truth, queries, use_filter: bool, limit: int) -> Dict[str, object]:
+    latencies, recalls = [], []
+    for query in queries:
+        metadata = query["metadata"] if use_filter else None
+        started = time.perf_counter()
+        documents = searcher.search(query["text"], metadata=metadata)
+        latencies.append((time.perf_counter() - started) * 1000)
+        expected = truth.exact_ids(query["text"], metadata)
+        found = {str(document.metadata["_id"]) for document in documents}
+        recalls.append(len(expected & found) / max(1, min(limit, len(expected))))
+    return {"latency_ms": percentiles(latencies), "recall_at_k": float(np.mean(recalls))}
+
+
+def benchmark_size(arguments, settings, dense, sparse, sections: int) -> Dict[str, object]:
+    text = SyntheticCorpus(seed=arguments.seed).markdown(sections)
+    chunker = TextChunker(chunk_size=settings.chunk_size, overlap=settings.chunk_overlap)
+    chunk_seconds = timed(lambda: chunker.chunk(text))
+    chunks = list(chunker.chunk(text))
+    contents = [chunk.content for chunk in chunks]
+    dense_seconds = timed(lambda: dense.embed_many(contents))
+    sparse_seconds = timed(lambda: sparse.embed_many(contents))
+    backend = build_searcher(arguments, settings, dense, sparse, chunks)
+    truth = ExactHybridSearch(settings, dense, sparse, chunks, arguments.limit)
+    queries = sample_queries(chunks, arguments.queries, arguments.seed)
+    return {
+        "sections": sections,
+        "chunks": len(chunks),
+        "corpus_bytes": len(text.encode("utf-8")),
+        "chunking_chunks_per_second": len(chunks) / chunk_seconds,
+        "dense_embedding_chunks_per_second": len(chunks) / dense_seconds,
+        "sparse_embedding_chunks_per_second": len(chunks) / sparse_seconds,
+        "insert_chunks_per_second": len(chunks) / backend["insert_seconds"],
+        "upsert_chunks_per_second": len(chunks) / max(backend["upsert_seconds"], 1e-9),
+        "search": run_queries(backend["searcher"], truth, queries, False, arguments.limit),
+        "filtered_search": run_queries(backend["searcher"], truth, queries, True, arguments.limit),
+    }
+
+
+def current_commit() -> Optional[str]:
+    try:
+        output = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return output.stdout.strip()
+
+
+def main() -> None:
+    arguments = parse_arguments()
+    settings = Settings()
+    settings.collection_name = "benchmark"
+    dense = HashingDenseEmbeddings(dimension=arguments.dimension)
+    sparse = HashingSparseEmbedder() if arguments.sparse == "hashed" else SparseEmbedder()
+    sizes = [int(size) for size in arguments.sizes.split(",")]
+    report = {
+        "commit": current_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "backend": arguments.backend,
+        "sparse": arguments.sparse,
+        "limit": arguments.limit,
+        "results": [],
+    }
+    for sections in sizes:
+        result = benchmark_size(arguments, settings, dense, sparse, sections)
+        report["results"].append(result)
+        print(
+            f"sections={sections:>6} chunks={result['chunks']:>6} "
+            f"insert={result['insert_chunks_per_second']:.0f}/s "
+            f"p50={result['search']['latency_ms']['p50']:.2f}ms p99={result['search']['latency_ms']['p99']:.2f}ms "
+            f"recall@{arguments.limit}={result['search']['recall_at_k']:.3f} "
+            f"filtered_recall={result['filtered_search']['recall_at_k']:.3f}"
+        )
+    output = arguments.output or f"benchmarks/results/suite-{arguments.backend}-{report['commit'] or 'nogit'}.json"
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as file:
+        json.dump(report, file, indent=2)
+    print(f"Wrote {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List, Tuple
+
+DEFERRED_MODULES = ["langchain_openai", "openai", "fastembed", "onnxruntime"]
+
+SCENARIOS: Dict[str, Tuple[str, str]] = {
+    "settings": (
+        "from src.config.settings import Settings\n",
+        "Settings()\n",
+    ),
+    "dense_dimension": (
+        "from src.config.settings import Settings\n"
+        "from src.embeddings.dense_embedder import DenseEmbedder\n",
+        "settings = Settings()\n"
+        "DenseEmbedder(settings.model_embeddings, settings.openai_api_key).dimension()\n",
+    ),
+    "hybrid_searcher": (
+        "from src.config.settings import Settings\n"
+        "from src.search.hybrid_searcher import HybridSearcher\n",
+        "HybridSearcher(Settings())\n",
+    ),
+}
+
+PROBE = (
+    "import json, sys, time\n"
+    "started = time.perf_counter()\n"
+    "{imports}"
+    "imported = time.perf_counter()\n"
+    "{construction}"
+    "finished = time.perf_counter()\n"
+    "loaded = [name for name in {deferred} if name in sys.modules]\n"
+    "print(json.dumps({{'import_ms': (imported - started) * 1000, 'construct_ms': (finished - imported) * 1000, "
+    "'loaded': loaded}}))\n"
+)
+
+
+def parse_arguments() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Measure import and construction time in fresh interpreters.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=0, help="Fail when a median import or construction time exceeds this.")
+    return parser.parse_args()
+
+
+def run_once(imports: str, construction: str) -> Dict[str, object]:
+    code = PROBE.format(imports=imports, construction=construction, deferred=DEFERRED_MODULES)
+    started = time.perf_counter()
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    result = json.loads(output.stdout.strip().splitlines()[-1])
+    result["process_ms"] = (time.perf_counter() - started) * 1000
+    return result
+
+
+def measure(imports: str, construction: str, runs: int) -> Dict[str, object]:
+    samples: List[Dict[str, object]] = [run_once(imports, construction) for _ in range(runs)]
+    return {
+        "import_ms": statistics.median(sample["import_ms"] for sample in samples),
+        "construct_ms": statistics.median(sample["construct_ms"] for sample in samples),
+        "process_ms": statistics.median(sample["process_ms"] for sample in samples),
+        "loaded": samples[-1]["loaded"],
+    }
+
+
+def main() -> None:
+    arguments = parse_arguments()
+    over_budget = []
+    for name, (imports, construction) in SCENARIOS.items():
+        result = measure(imports, construction, arguments.runs)
+        print(
+            f"{name:>16}  import={result['import_ms']:7.1f} ms  construct={result['construct_ms']:6.1f} ms  "
+            f"process={result['process_ms']:7.1f} ms  eager={result['loaded'] or '-'}"
+        )
+        over_budget.extend(
+            f"{name} {phase}"
+            for phase in ("import", "construct")
+            if arguments.budget_ms and result[f"{phase}_ms"] > arguments.budget_ms
+        )
+    if over_budget:
+        raise SystemExit(f"Over the {arguments.budget_ms:.0f} ms budget: {', '.join(over_budget)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+import argparse
+import functools
+import json
+import os
+import time
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+from qdrant_client import QdrantClient
+from qdrant_client.http import models
+
+from src.config.settings import Settings
+from src.storage.collection_manager import CollectionManager
+from src.storage.storage_profile import STORAGE_PROFILES, StorageProfile
+
+
+def parse_arguments() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Compare recall and latency of the storage profiles.")
+    parser.add_argument("--points", type=int, default=20000)
+    parser.add_argument("--dimension", type=int, default=1536)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument(
+        "--data",
+        choices=["gaussian", "clustered"],
+        default="gaussian",
+        help="clustered draws points and queries around shared centres, so every query has close neighbours.",
+    )
+    parser.add_argument("--cluster-size", type=int, default=20)
+    parser.add_argument(
+        "--backend",
+        choices=["server", "numpy"],
+        default="server",
+        help="numpy emulates the quantized scan and rescoring in process; it has no HNSW graph.",
+    )
+    parser.add_argument(
+        "--oversampling",
+        default="1.0,1.5,2.0,3.0",
+        help="Comma-separated oversampling factors also measured for quantized profiles.",
+    )
+    parser.add_argument("--output", default="benchmarks/results/storage_profiles.json")
+    return parser.parse_args()
+
+
+def sample(arguments: argparse.Namespace) -> Tuple[np.ndarray, np.ndarray]:
+    generator = np.random.default_rng(7)
+    shape = (arguments.points, arguments.dimension)
+    if arguments.data == "gaussian":
+        vectors = generator.standard_normal(shape, dtype=np.float32)
+        return vectors, generator.standard_normal((arguments.queries, arguments.dimension), dtype=np.float32)
+    centres = generator.standard_normal((arguments.points // arguments.cluster_size, arguments.dimension))
+    vectors = centres[np.arange(arguments.points) % len(centres)] + generator.standard_normal(shape)
+    queries = centres[generator.integers(len(centres), size=arguments.queries)]
+    queries = queries + generator.standard_normal((arguments.queries, arguments.dimension))
+    return vectors.astype(np.float32), queries.astype(np.float32)
+
+
+def load_profile(client: QdrantClient, settings: Settings, vectors: np.ndarray) -> None:
+    CollectionManager(client, settings).recreate(embedding_dimension=vectors.shape[1])
+    for start in range(0, len(vectors), 1000):
+        points = [
+            models.PointStruct(id=start + offset, vector={settings.dense_field: vector.tolist()})
+            for offset, vector in enumerate(vectors[start:start + 1000])
+        ]
+        client.upsert(collection_name=settings.collection_name, points=points, wait=True)
+    while client.get_collection(settings.collection_name).status != models.CollectionStatus.GREEN:
+        time.sleep(1.0)
+
+
+def search_params(profile: StorageProfile, oversampling: float) -> Optional[models.SearchParams]:
+    if profile.quantization == "none":
+        return None
+    return models.SearchParams(
+        quantization=models.QuantizationSearchParams(rescore=profile.rescore, oversampling=oversampling)
+    )
+
+
+def query_ids(client: QdrantClient, settings: Settings, query: np.ndarray, k: int, params) -> List[int]:
+    response = client.query_points(
+        collection_name=settings.collection_name,
+        query=query.tolist(),
+        using=settings.dense_field,
+        limit=k,
+        search_params=params,
+        with_payload=False,
+    )
+    return [point.id for point in response.points]
+
+
+def exact_neighbours(vectors: np.ndarray, queries: np.ndarray, k: int) -> List[Set[int]]:
+    scores = normalized(queries) @ normalized(vectors).T
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    return [set(row.tolist()) for row in top]
+
+
+def normalized(vectors: np.ndarray) -> np.ndarray:
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def scalar_codes(vectors: np.ndarray, low: float, high: float) -> np.ndarray:
+    step = (high - low) / 255
+    return (low + np.round((np.clip(vectors, low, high) - low) / step) * step).astype(np.float32)
+
+
+def binary_codes(vectors: np.ndarray) -> np.ndarray:
+    return np.where(vectors > 0, 1.0, -1.0).astype(np.float32)
+
+
+class QuantizedScan:
+    def __init__(self, profile: StorageProfile, vectors: np.ndarray):
+        self._profile = profile
+        self._vectors = normalized(vectors)
+        self._low, self._high = np.quantile(self._vectors, [0.005, 0.995])
+        self._codes = self._encode(self._vectors)
+
+    def query_ids(self, query: np.ndarray, k: int, oversampling: float) -> List[int]:
+        query = normalized(query[np.newaxis])[0]
+        if self._profile.quantization == "none":
+            return top_ids(self._vectors @ query, k)
+        candidates = np.array(top_ids(self._codes @ self._encode(query[np.newaxis])[0], int(k * oversampling)))
+        if not self._profile.rescore:
+            return candidates[:k].tolist()
+        return candidates[top_ids(self._vectors[candidates] @ query, k)].tolist()
+
+    def _encode(self, vectors: np.ndarray) -> np.ndarray:
+        if self._profile.quantization == "scalar":
+            return scalar_codes(vectors, self._low, self._high)
+        return binary_codes(vectors)
+
+
+def top_ids(scores: np.ndarray, k: int) -> List[int]:
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top])].tolist()
+
+
+def measure(
+    search: Callable[[np.ndarray], List[int]],
+    queries: np.ndarray,
+    truths: List[Set[int]],
+    k: int,
+) -> Dict[str, float]:
+    latencies, recalls = [], []
+    for query, truth in zip(queries, truths):
+        started = time.perf_counter()
+        found = search(query)
+        latencies.append((time.perf_counter() - started) * 1000)
+        recalls.append(len(truth.intersection(found)) / k)
+    return {
+        "recall_at_k": float(np.mean(recalls)),
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+    }
+
+
+def oversampling_factors(profile: StorageProfile, sweep: List[float]) -> List[float]:
+    if profile.quantization == "none":
+        return [profile.oversampling]
+    return sorted(set(sweep) | {profile.oversampling})
+
+
+def server_rows(
+    settings: Settings,
+    vectors: np.ndarray,
+    queries: np.ndarray,
+    truths: List[Set[int]],
+    arguments: argparse.Namespace,
+) -> Tuple[str, List[Dict[str, object]]]:
+    client = settings.qdrant_client()
+    base_collection = settings.collection_name
+    rows = []
+    for name, profile in STORAGE_PROFILES.items():
+        settings.storage_profile = name
+        settings.collection_name = f"{base_collection}_profile_{name}"
+        load_profile(client, settings, vectors)
+        for oversampling in oversampling_factors(profile, arguments.sweep):
+            params = search_params(profile, oversampling)
+            search = functools.partial(query_ids, client, settings, k=arguments.k, params=params)
+            rows.append(row(profile, oversampling, measure(search, queries, truths, arguments.k)))
+        CollectionManager(client, settings).delete()
+    return f"qdrant {client.info().version}", rows
+
+
+def numpy_rows(
+    vectors: np.ndarray,
+    queries: np.ndarray,
+    truths: List[Set[int]],
+    arguments: argparse.Namespace,
+) -> Tuple[str, List[Dict[str, object]]]:
+    rows = []
+    for profile in STORAGE_PROFILES.values():
+        scan = QuantizedScan(profile, vectors)
+        for oversampling in oversampling_factors(profile, arguments.sweep):
+            search = functools.partial(scan.query_ids, k=arguments.k, oversampling=oversampling)
+            rows.append(row(profile, oversampling, measure(search, queries, truths, arguments.k)))
+    return f"numpy {np.__version__} emulation (exact scan, no HNSW)", rows
+
+
+def row(profile: StorageProfile, oversampling: float, measured: Dict[str, float]) -> Dict[str, object]:
+    return {
+        "profile": profile.name,
+        "oversampling": oversampling,
+        "default": oversampling == profile.oversampling,
+        **measured,
+    }
+
+
+def main() -> None:
+    arguments = parse_arguments()
+    arguments.sweep = [float(factor) for factor in arguments.oversampling.split(",")]
+    settings = Settings()
+    vectors, queries = sample(arguments)
+    truths = exact_neighbours(vectors, queries, arguments.k)
+    if arguments.backend == "server":
+        engine, rows = server_rows(settings, vectors, queries, truths, arguments)
+    if arguments.backend == "numpy":
+        engine, rows = numpy_rows(vectors, queries, truths, arguments)
+    for result in rows:
+        marker = "*" if result["default"] else " "
+        print(f"{result['profile']:>8}{marker} oversampling={result['oversampling']:.1f}  "
+              f"recall@{arguments.k}={result['recall_at_k']:.3f}  "
+              f"p50={result['p50_ms']:.2f}ms  p95={result['p95_ms']:.2f}ms")
+    report = {
+        "engine": engine,
+        "data": arguments.data,
+        "points": arguments.points,
+        "dimension": arguments.dimension,
+        "queries": arguments.queries,
+        "k": arguments.k,
+        "results": rows,
+    }
+    os.makedirs(os.path.dirname(arguments.output) or ".", exist_ok=True)
+    with open(arguments.output, "w", encoding="utf-8") as file:
+        json.dump(report, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
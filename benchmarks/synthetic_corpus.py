@@ -0,0 +1,33 @@
+import random
+import re
+from typing import List
+
+WORD_PATTERN = re.compile(r"[A-Za-z][A-Za-z\-]{2,}")
+
+
+class SyntheticCorpus:
+    def __init__(self, template_path: str = "doc.md", seed: int = 7):
+        with open(template_path, "r", encoding="utf-8") as file:
+            self._vocabulary = sorted(set(WORD_PATTERN.findall(file.read())))
+        self._random = random.Random(seed)
+
+    def markdown(self, sections: int) -> str:
+        parts = [f"# {self._title()}\n"]
+        for section in range(sections):
+            parts.append(f"## {self._title()} {section}\n")
+            parts.extend(self._paragraphs())
+            if section % 3 == 0:
+                parts.append(f"### {self._title()}\n")
+                parts.extend(self._paragraphs())
+        return "\n".join(parts)
+
+    def sentence(self) -> str:
+        words = self._random.choices(self._vocabulary, k=self._random.randint(8, 20))
+        return " ".join(words).capitalize() + "."
+
+    def _paragraphs(self) -> List[str]:
+        count = self._random.randint(1, 4)
+        return [" ".join(self.sentence() for _ in range(self._random.randint(2, 6))) + "\n" for _ in range(count)]
+
+    def _title(self) -> str:
+        return " ".join(self._random.choices(self._vocabulary, k=3)).title()
@@ -1,12 +1,32 @@
-import os
+import asyncio
+import contextvars
+import uuid
+from threading import Lock
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
 
 from langchain.agents import create_agent
-from langchain_core.tools import tool
+from langchain_core.messages import AIMessage, BaseMessage, ToolMessage
+from langchain_core.runnables import Runnable, RunnableConfig
+from langchain_core.tools import BaseTool, StructuredTool
 from langfuse import get_client, observe
 from langfuse.langchain import CallbackHandler
+from langchain_mistralai import ChatMistralAI
+from pydantic import SecretStr
 
+from src.agent.tool_result_memo import ToolResultMemo
+from src.config.lazy import Lazy
 from src.config.settings import Settings
+from src.generation.context_packer import ContextPacker
+from src.generation.stream_event import StreamEvent
+from src.observability.latency_metrics import METRICS
+from src.observability.llm_timing_callback import LLMTimingCallback
+from src.observability.trace_exporter import start_trace_exporter
 from src.search.hybrid_searcher import HybridSearcher
+from src.search.search_result import SearchResults
+from src.search.section_catalog import SectionCatalog
+from src.search.section_router import SectionRouter
+
+ToolResult = Tuple[str, SearchResults]
 
 
 class RAGAgent:
@@ -19,55 +39,213 @@ class RAGAgent:
         "Strategy:\n"
         "1. If the question clearly targets one topic, use search_by_section first.\n"
         "2. If results are insufficient or the question is broad, fall back to search_documents.\n"
-        "3. Synthesize a clear answer from the retrieved content."
+        "3. If section results are already in the conversation, answer from them when they suffice.\n"
+        "4. Synthesize a clear answer from the retrieved content."
+    )
+    STREAM_MODES = ["messages", "updates"]
+    NO_RESULTS = "No results found."
+    NO_SECTION_RESULTS = "No results found in that section. Try search_documents instead."
+    SECTION_TOOL = "search_by_section"
+    SECTION_TOOL_DESCRIPTION = (
+        "Search within a specific section of the knowledge base.\n"
+        "The 'section' parameter must be a h2 heading from the knowledge base"
     )
+    TOOL_CALL_ID_LENGTH = 9
 
-    def __init__(self, searcher: HybridSearcher, settings: Settings):
-        os.environ["MISTRAL_API_KEY"] = settings.mistral_api_key
-        self._agent = create_agent(
-            model=f"mistralai:{settings.mistral_model}",
-            tools=self._build_tools(searcher),
-            system_prompt=self.SYSTEM_PROMPT,
+    def __init__(
+        self,
+        searcher: HybridSearcher,
+        settings: Settings,
+        section_catalog: Optional[SectionCatalog] = None,
+        section_router: Optional[SectionRouter] = None,
+    ):
+        client = Lazy(settings.qdrant_client)
+        self._searcher = searcher
+        self._catalog = Lazy(lambda: section_catalog or SectionCatalog(client.get(), settings))
+        self._router = Lazy(lambda: section_router or SectionRouter(client.get(), settings))
+        self._packer = ContextPacker(settings.context_token_budget, settings.chunk_overlap)
+        self._memo = ToolResultMemo(settings.agent_tool_cache_size, settings.agent_tool_cache_ttl_seconds)
+        self._model = ChatMistralAI(
+            model=settings.mistral_model,
+            api_key=SecretStr(settings.mistral_api_key),
+            streaming=True,
         )
+        self._agents: Dict[Tuple[str, ...], Runnable] = {}
+        self._agents_lock = Lock()
+        start_trace_exporter(settings.trace_flush_interval_seconds)
 
     @observe(name="rag_agent")
     def invoke(self, question: str) -> str:
         langfuse = get_client()
         langfuse.update_current_trace(tags=["agent"])
-        result = self._agent.invoke(
-            {"messages": [{"role": "user", "content": question}]},
-            config={"callbacks": [CallbackHandler()]},
-        )
-        langfuse.flush()
+        with METRICS.request() as timings, self._memo.run():
+            prerouted = self._preroute(question)
+            result = self._agent().invoke(self._input(question, prerouted), config=self._config())
+        langfuse.update_current_trace(metadata={"stages_ms": timings})
         return result["messages"][-1].content
 
+    @observe(name="rag_agent_stream", transform_to_string=StreamEvent.answer)
+    def stream(self, question: str) -> Iterator[StreamEvent]:
+        langfuse = get_client()
+        langfuse.update_current_trace(tags=["agent", "stream"])
+        with METRICS.request() as timings, self._memo.run():
+            prerouted = self._preroute(question)
+            yield from (event for message in prerouted for event in self._message_events(message))
+            chunks = self._agent().stream(
+                self._input(question, prerouted),
+                config=self._config(),
+                stream_mode=self.STREAM_MODES,
+            )
+            for mode, chunk in chunks:
+                yield from self._events(mode, chunk)
+        langfuse.update_current_trace(metadata={"stages_ms": timings})
+
+    @observe(name="rag_agent_stream", transform_to_string=StreamEvent.answer)
+    async def astream(self, question: str) -> AsyncIterator[StreamEvent]:
+        langfuse = get_client()
+        langfuse.update_current_trace(tags=["agent", "stream"])
+        with METRICS.request() as timings, self._memo.run():
+            prerouted = await self._apreroute(question)
+            for event in (event for message in prerouted for event in self._message_events(message)):
+                yield event
+            chunks = self._agent().astream(
+                self._input(question, prerouted),
+                config=self._config(),
+                stream_mode=self.STREAM_MODES,
+            )
+            async for mode, chunk in chunks:
+                for event in self._events(mode, chunk):
+                    yield event
+        langfuse.update_current_trace(metadata={"stages_ms": timings})
+
+    @staticmethod
+    def _input(question: str, prerouted: List[BaseMessage]) -> Dict[str, Any]:
+        return {"messages": [{"role": "user", "content": question}, *prerouted]}
+
+    @staticmethod
+    def _config() -> RunnableConfig:
+        return {"callbacks": [CallbackHandler(), LLMTimingCallback()]}
+
+    def _events(self, mode: str, chunk: Any) -> Iterator[StreamEvent]:
+        if mode == "messages":
+            return self._token_events(*chunk)
+        return (event for message in self._updated_messages(chunk) for event in self._message_events(message))
+
+    @staticmethod
+    def _token_events(message: BaseMessage, metadata: Dict[str, Any]) -> Iterator[StreamEvent]:
+        if metadata.get("langgraph_node") != "model" or not isinstance(message, AIMessage):
+            return
+        if message.text:
+            yield StreamEvent.token(message.text)
+
+    @staticmethod
+    def _updated_messages(update: Dict[str, Any]) -> List[BaseMessage]:
+        return [message for state in update.values() if state for message in state.get("messages", [])]
+
     @staticmethod
-    def _build_tools(searcher: HybridSearcher):
+    def _message_events(message: BaseMessage) -> List[StreamEvent]:
+        if isinstance(message, ToolMessage):
+            return RAGAgent._tool_result_events(message)
+        if isinstance(message, AIMessage):
+            return [StreamEvent.tool_start(call["name"], call["args"]) for call in message.tool_calls]
+        return []
 
-        @tool
-        def search_documents(query: str) -> str:
+    @staticmethod
+    def _tool_result_events(message: ToolMessage) -> List[StreamEvent]:
+        finished = StreamEvent.tool_end(message.name, message.text)
+        if message.artifact is None:
+            return [finished]
+        return [finished, StreamEvent.retrieval(message.artifact)]
+
+
+    def _agent(self) -> Runnable:
+        headings = tuple(self._catalog.get().headings())
+        with self._agents_lock:
+            agent = self._agents.get(headings)
+            if agent is None:
+                agent = self._agents[headings] = create_agent(
+                    model=self._model,
+                    tools=self._build_tools(headings),
+                    system_prompt=self.SYSTEM_PROMPT,
+                )
+            return agent
+
+    def _preroute(self, question: str) -> List[BaseMessage]:
+        if not self._router.get().is_available():
+            return []
+        dense_vector = self._searcher.embed_query(question)
+        section = self._router.get().route(dense_vector)
+        if section is None:
+            return []
+        content, results = self._search(question, {"header_2": section}, self.NO_SECTION_RESULTS, dense_vector)
+        if results.is_empty():
+            return []
+        call_id = uuid.uuid4().hex[: self.TOOL_CALL_ID_LENGTH]
+        call = {"name": self.SECTION_TOOL, "args": {"query": question, "section": section}, "id": call_id}
+        return [
+            AIMessage(content="", tool_calls=[call]),
+            ToolMessage(content=content, artifact=results, tool_call_id=call_id, name=self.SECTION_TOOL),
+        ]
+
+    async def _apreroute(self, question: str) -> List[BaseMessage]:
+        context = contextvars.copy_context()
+        return await asyncio.get_running_loop().run_in_executor(None, context.run, self._preroute, question)
+
+    def _respond(self, results: SearchResults, empty_message: str) -> ToolResult:
+        if results.is_empty():
+            return empty_message, results
+        return self._packer.pack(results), results
+
+    def _search(
+        self,
+        query: str,
+        metadata: Optional[Dict[str, str]],
+        empty_message: str,
+        dense_vector: Optional[List[float]] = None,
+    ) -> ToolResult:
+        def compute() -> ToolResult:
+            return self._respond(self._searcher.search_with_scores(query, metadata, dense_vector), empty_message)
+        return self._memo.call(ToolResultMemo.key(query, metadata), compute)
+
+    async def _asearch(self, query: str, metadata: Optional[Dict[str, str]], empty_message: str) -> ToolResult:
+        async def compute() -> ToolResult:
+            return self._respond(await self._searcher.asearch_with_scores(query, metadata), empty_message)
+        return await self._memo.acall(ToolResultMemo.key(query, metadata), compute)
+
+    def _build_tools(self, headings: Tuple[str, ...]) -> List[BaseTool]:
+
+        def search_documents(query: str) -> ToolResult:
             """Search the entire knowledge base with a natural language query.
             Use this for broad questions or when unsure which section to look in."""
-            docs = searcher.search(query)
-            if not docs:
-                return "No results found."
-            return "\n\n".join(doc.page_content for doc in docs)
-
-        @tool
-        def search_by_section(query: str, section: str) -> str:
-            """Search within a specific section of the knowledge base.
-            The 'section' parameter must be a h2 heading from the document:
-            - 'What is Retrieval-Augmented Generation?'
-            - 'How Does RAG Work?'
-            - 'What is Hybrid Search?'
-            - 'What is Qdrant?'
-            - 'What is Multi-Query Retrieval?'
-            - 'Object Calisthenics and Clean Code'
-            - 'Key Design Decisions in This Project'
-            - 'Running the Project'"""
-            docs = searcher.search(query, metadata={"header_2": section})
-            if not docs:
-                return "No results found in that section. Try search_documents instead."
-            return "\n\n".join(doc.page_content for doc in docs)
-
-        return [search_documents, search_by_section]
+            return self._search(query, None, self.NO_RESULTS)
+
+        async def asearch_documents(query: str) -> ToolResult:
+            return await self._asearch(query, None, self.NO_RESULTS)
+
+        def search_by_section(query: str, section: str) -> ToolResult:
+            return self._search(query, {"header_2": section}, self.NO_SECTION_RESULTS)
+
+        async def asearch_by_section(query: str, section: str) -> ToolResult:
+            return await self._asearch(query, {"header_2": section}, self.NO_SECTION_RESULTS)
+
+        return [
+            StructuredTool.from_function(
+                func=search_documents,
+                coroutine=asearch_documents,
+                response_format="content_and_artifact",
+            ),
+            StructuredTool.from_function(
+                func=search_by_section,
+                coroutine=asearch_by_section,
+                name=self.SECTION_TOOL,
+                description=self._section_tool_description(headings),
+                response_format="content_and_artifact",
+            ),
+        ]
+
+    @classmethod
+    def _section_tool_description(cls, headings: Tuple[str, ...]) -> str:
+        if not headings:
+            return f"{cls.SECTION_TOOL_DESCRIPTION}."
+        listed = "\n".join(f"- '{heading}'" for heading in headings)
+        return f"{cls.SECTION_TOOL_DESCRIPTION}:\n{listed}"
@@ -0,0 +1,98 @@
+import asyncio
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from contextlib import contextmanager
+from contextvars import ContextVar
+from threading import Lock
+from typing import Any, Awaitable, Callable, Dict, Iterator, Optional, Tuple
+
+MemoKey = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+_RUN_RESULTS: ContextVar[Optional[Dict[MemoKey, Future]]] = ContextVar("tool_run_results", default=None)
+
+
+class ToolResultMemo:
+    def __init__(self, max_entries: int = 0, ttl_seconds: float = 0):
+        self._max_entries = max_entries
+        self._ttl_seconds = ttl_seconds
+        self._shared: "OrderedDict[MemoKey, Tuple[float, Any]]" = OrderedDict()
+        self._lock = Lock()
+
+    @staticmethod
+    def key(query: str, metadata: Optional[Dict[str, str]] = None) -> MemoKey:
+        return " ".join(query.lower().split()), tuple(sorted((metadata or {}).items()))
+
+    @contextmanager
+    def run(self) -> Iterator[None]:
+        token = _RUN_RESULTS.set({})
+        try:
+            yield
+        finally:
+            _RUN_RESULTS.reset(token)
+
+    def call(self, key: MemoKey, compute: Callable[[], Any]) -> Any:
+        future, owner = self._claim(key)
+        if not owner:
+            return future.result()
+        try:
+            return self._settle(key, future, compute())
+        except BaseException as error:
+            self._fail(key, future, error)
+            raise
+
+    async def acall(self, key: MemoKey, compute: Callable[[], Awaitable[Any]]) -> Any:
+        future, owner = self._claim(key)
+        if not owner:
+            return await asyncio.wrap_future(future)
+        try:
+            return self._settle(key, future, await compute())
+        except BaseException as error:
+            self._fail(key, future, error)
+            raise
+
+    def _claim(self, key: MemoKey) -> Tuple[Future, bool]:
+        with self._lock:
+            shared = self._shared_result(key)
+            if shared is not None:
+                return shared, False
+            run_results = _RUN_RESULTS.get()
+            if run_results is None:
+                return Future(), True
+            future = run_results.get(key)
+            if future is not None:
+                return future, False
+            future = run_results[key] = Future()
+            return future, True
+
+    def _settle(self, key: MemoKey, future: Future, value: Any) -> Any:
+        future.set_result(value)
+        if self._max_entries <= 0:
+            return value
+        with self._lock:
+            self._shared[key] = (time.monotonic(), value)
+            self._shared.move_to_end(key)
+            while len(self._shared) > self._max_entries:
+                self._shared.popitem(last=False)
+        return value
+
+    def _fail(self, key: MemoKey, future: Future, error: BaseException) -> None:
+        future.set_exception(error)
+        run_results = _RUN_RESULTS.get()
+        if run_results is None:
+            return
+        with self._lock:
+            run_results.pop(key, None)
+
+    def _shared_result(self, key: MemoKey) -> Optional[Future]:
+        entry = self._shared.get(key)
+        if entry is None:
+            return None
+        stored, value = entry
+        if time.monotonic() - stored > self._ttl_seconds:
+            del self._shared[key]
+            return None
+        self._shared.move_to_end(key)
+        future: Future = Future()
+        future.set_result(value)
+        return future
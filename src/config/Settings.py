@@ -1,20 +1,91 @@
 import os
+from functools import lru_cache
+from typing import TYPE_CHECKING, Optional
+
 from dotenv import load_dotenv
 
-load_dotenv()
+if TYPE_CHECKING:
+    from qdrant_client import AsyncQdrantClient, QdrantClient
+
+
+@lru_cache(maxsize=None)
+def load_environment() -> None:
+    load_dotenv()
 
 
 class Settings:
     def __init__(self):
+        load_environment()
         self.openai_api_key: str = os.getenv("OPENAI_API_KEY", "")
         self.mistral_api_key: str = os.getenv("MISTRAL_API_KEY", "")
         self.model_embeddings: str = os.getenv("MODEL_EMBEDDINGS", "text-embedding-3-small")
         self.mistral_model: str = os.getenv("MISTRAL_MODEL_NAME", "mistral-large-latest")
         self.vector_db_url: str = os.getenv("VECTOR_DB_URL", "http://localhost:6333")
         self.vector_db_api_key: str = os.getenv("VECTOR_DB_API_KEY", "")
+        self.vector_db_prefer_grpc: bool = self._flag("VECTOR_DB_PREFER_GRPC")
+        self.vector_db_grpc_port: int = int(os.getenv("VECTOR_DB_GRPC_PORT", "6334"))
+        self.vector_db_timeout_seconds: int = int(os.getenv("VECTOR_DB_TIMEOUT_SECONDS", "30"))
+        self.vector_db_pool_size: int = int(os.getenv("VECTOR_DB_POOL_SIZE", "16"))
+        self.vector_db_keepalive_seconds: float = float(os.getenv("VECTOR_DB_KEEPALIVE_SECONDS", "30"))
+        self.vector_db_max_retries: int = int(os.getenv("VECTOR_DB_MAX_RETRIES", "3"))
+        self.vector_db_retry_backoff_seconds: float = float(os.getenv("VECTOR_DB_RETRY_BACKOFF_SECONDS", "0.2"))
         self.collection_name: str = os.getenv("VECTOR_DB_COLLECTION", "rag_collection")
         self.content_field: str = os.getenv("VECTOR_FIELD_CONTENT_NAME", "text")
         self.dense_field: str = "text-dense"
         self.sparse_field: str = "text-sparse"
         self.chunk_size: int = int(os.getenv("CHUNK_SIZE", "500"))
         self.chunk_overlap: int = int(os.getenv("CHUNK_OVERLAP", "50"))
+        self.embedding_batch_size: int = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+        self.embedding_max_concurrency: int = int(os.getenv("EMBEDDING_MAX_CONCURRENCY", "4"))
+        self.sparse_batch_size: int = int(os.getenv("SPARSE_EMBEDDING_BATCH_SIZE", "256"))
+        self.sparse_parallel: Optional[int] = self._optional_int("SPARSE_EMBEDDING_PARALLEL")
+        self.insert_batch_size: int = int(os.getenv("INSERT_BATCH_SIZE", "256"))
+        self.upsert_max_pending: int = int(os.getenv("UPSERT_MAX_PENDING", "2"))
+        self.dense_prefetch_limit: int = int(os.getenv("DENSE_PREFETCH_LIMIT", "20"))
+        self.sparse_prefetch_limit: int = int(os.getenv("SPARSE_PREFETCH_LIMIT", "20"))
+        self.query_batch_size: int = int(os.getenv("QUERY_BATCH_SIZE", "64"))
+        self.query_embedding_window_seconds: float = float(os.getenv("QUERY_EMBEDDING_WINDOW_SECONDS", "0.002"))
+        self.query_embedding_max_batch: int = int(os.getenv("QUERY_EMBEDDING_MAX_BATCH", "32"))
+        self.context_token_budget: int = int(os.getenv("CONTEXT_TOKEN_BUDGET", "2000"))
+        self.llm_max_concurrency: int = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+        self.hybrid_fusion: str = os.getenv("HYBRID_FUSION", "rrf")
+        self.search_mode: str = os.getenv("SEARCH_MODE", "flat")
+        self.section_search_limit: int = int(os.getenv("SECTION_SEARCH_LIMIT", "3"))
+        self.query_expansion_variants: int = int(os.getenv("QUERY_EXPANSION_VARIANTS", "0"))
+        self.storage_profile: str = os.getenv("STORAGE_PROFILE", "memory")
+        self.indexing_threshold: int = int(os.getenv("INDEXING_THRESHOLD", "10000"))
+        self.optimization_timeout_seconds: float = float(os.getenv("OPTIMIZATION_TIMEOUT_SECONDS", "600"))
+        self.embedding_cache_dir: str = os.getenv("EMBEDDING_CACHE_DIR", "")
+        self.embedding_cache_max_entries: int = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "100000"))
+        self.query_embedding_cache_entries: int = int(os.getenv("QUERY_EMBEDDING_CACHE_ENTRIES", "1024"))
+        self.answer_cache_backend: str = os.getenv("ANSWER_CACHE_BACKEND", "")
+        self.answer_cache_path: str = os.getenv("ANSWER_CACHE_PATH", ".cache/answers.sqlite3")
+        self.answer_cache_similarity: float = float(os.getenv("ANSWER_CACHE_SIMILARITY", "0.95"))
+        self.answer_cache_ttl_seconds: float = float(os.getenv("ANSWER_CACHE_TTL_SECONDS", "3600"))
+        self.answer_cache_max_entries: int = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "10000"))
+        self.agent_tool_cache_size: int = int(os.getenv("AGENT_TOOL_CACHE_SIZE", "0"))
+        self.agent_tool_cache_ttl_seconds: float = float(os.getenv("AGENT_TOOL_CACHE_TTL_SECONDS", "300"))
+        self.trace_flush_interval_seconds: float = float(os.getenv("TRACE_FLUSH_INTERVAL_SECONDS", "5"))
+        self.section_catalog_limit: int = int(os.getenv("SECTION_CATALOG_LIMIT", "100"))
+        self.section_catalog_ttl_seconds: float = float(os.getenv("SECTION_CATALOG_TTL_SECONDS", "300"))
+        self.section_routing_min_score: float = float(os.getenv("SECTION_ROUTING_MIN_SCORE", "0.5"))
+        self.section_routing_min_margin: float = float(os.getenv("SECTION_ROUTING_MIN_MARGIN", "0.05"))
+
+    def qdrant_client(self) -> "QdrantClient":
+        from src.config.qdrant_clients import QDRANT_CLIENTS
+        return QDRANT_CLIENTS.client(self)
+
+    def async_qdrant_client(self) -> "AsyncQdrantClient":
+        from src.config.qdrant_clients import QDRANT_CLIENTS
+        return QDRANT_CLIENTS.async_client(self)
+
+    @staticmethod
+    def _flag(name: str) -> bool:
+        return os.getenv(name, "").lower() in ("1", "true", "yes")
+
+    @staticmethod
+    def _optional_int(name: str) -> Optional[int]:
+        value = os.getenv(name, "")
+        if not value:
+            return None
+        return int(value)
@@ -0,0 +1,179 @@
+import asyncio
+import functools
+import time
+from threading import Lock
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterator, Optional, Tuple, TypeVar
+
+import grpc
+import httpx
+from qdrant_client import AsyncQdrantClient, QdrantClient
+from qdrant_client.http.exceptions import ResponseHandlingException, UnexpectedResponse
+
+from src.config.settings import Settings
+
+T = TypeVar("T")
+
+IDEMPOTENT_METHODS = (
+    "batch_update_points",
+    "collection_exists",
+    "count",
+    "delete",
+    "facet",
+    "get_aliases",
+    "get_collection",
+    "get_collections",
+    "query_batch_points",
+    "query_points",
+    "retrieve",
+    "scroll",
+    "set_payload",
+    "upsert",
+)
+
+
+class RetryPolicy:
+    MAX_BACKOFF_SECONDS = 5.0
+    TRANSIENT_STATUS_CODES = frozenset({429, 502, 503, 504})
+    TRANSIENT_GRPC_CODES = frozenset({
+        grpc.StatusCode.UNAVAILABLE,
+        grpc.StatusCode.DEADLINE_EXCEEDED,
+        grpc.StatusCode.RESOURCE_EXHAUSTED,
+    })
+
+    def __init__(self, retries: int, backoff_seconds: float):
+        self._retries = retries
+        self._backoff_seconds = backoff_seconds
+
+    def wrap(self, method: Callable[..., T]) -> Callable[..., T]:
+        @functools.wraps(method)
+        def call(*args: Any, **kwargs: Any) -> T:
+            for delay in self._delays():
+                try:
+                    return method(*args, **kwargs)
+                except Exception as error:
+                    if not self.is_transient(error):
+                        raise
+                time.sleep(delay)
+            return method(*args, **kwargs)
+        return call
+
+    def wrap_async(self, method: Callable[..., Awaitable[T]]) -> Callable[..., Awaitable[T]]:
+        @functools.wraps(method)
+        async def call(*args: Any, **kwargs: Any) -> T:
+            for delay in self._delays():
+                try:
+                    return await method(*args, **kwargs)
+                except Exception as error:
+                    if not self.is_transient(error):
+                        raise
+                await asyncio.sleep(delay)
+            return await method(*args, **kwargs)
+        return call
+
+    @classmethod
+    def is_transient(cls, error: Exception) -> bool:
+        if isinstance(error, UnexpectedResponse):
+            return error.status_code in cls.TRANSIENT_STATUS_CODES
+        if isinstance(error, grpc.RpcError):
+            return error.code() in cls.TRANSIENT_GRPC_CODES
+        if isinstance(error, ResponseHandlingException):
+            return isinstance(error.source, httpx.TransportError)
+        return isinstance(error, httpx.TransportError)
+
+    def _delays(self) -> Iterator[float]:
+        for attempt in range(self._retries):
+            yield min(self._backoff_seconds * 2 ** attempt, self.MAX_BACKOFF_SECONDS)
+
+
+class RetryingQdrantClient(QdrantClient):
+    def __init__(self, policy: RetryPolicy, **options: Any):
+        super().__init__(**options)
+        for name in IDEMPOTENT_METHODS:
+            setattr(self, name, policy.wrap(getattr(self, name)))
+
+
+class RetryingAsyncQdrantClient(AsyncQdrantClient):
+    def __init__(self, policy: RetryPolicy, **options: Any):
+        super().__init__(**options)
+        for name in IDEMPOTENT_METHODS:
+            setattr(self, name, policy.wrap_async(getattr(self, name)))
+
+
+class QdrantClients:
+    def __init__(self):
+        self._clients: Dict[Hashable, Any] = {}
+        self._lock = Lock()
+
+    def client(self, settings: Settings) -> QdrantClient:
+        return self._shared(("sync", *self._key(settings)), lambda: RetryingQdrantClient(
+            self._policy(settings),
+            **self._options(settings),
+        ))
+
+    def async_client(self, settings: Settings) -> AsyncQdrantClient:
+        loop = self._running_loop()
+        self._drop_closed_loops()
+        return self._shared(("async", loop, *self._key(settings)), lambda: RetryingAsyncQdrantClient(
+            self._policy(settings),
+            **self._options(settings, keepalive=loop is not None),
+        ))
+
+    @staticmethod
+    def _running_loop() -> Optional[asyncio.AbstractEventLoop]:
+        try:
+            return asyncio.get_running_loop()
+        except RuntimeError:
+            return None
+
+    def _drop_closed_loops(self) -> None:
+        with self._lock:
+            closed = [key for key in self._clients if key[0] == "async" and key[1] and key[1].is_closed()]
+            for key in closed:
+                del self._clients[key]
+
+    def _shared(self, key: Hashable, factory: Callable[[], T]) -> T:
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                client = self._clients[key] = factory()
+            return client
+
+    @staticmethod
+    def _key(settings: Settings) -> Tuple[Any, ...]:
+        return (
+            settings.vector_db_url,
+            settings.vector_db_api_key,
+            settings.vector_db_prefer_grpc,
+            settings.vector_db_grpc_port,
+            settings.vector_db_timeout_seconds,
+            settings.vector_db_pool_size,
+            settings.vector_db_keepalive_seconds,
+            settings.vector_db_max_retries,
+            settings.vector_db_retry_backoff_seconds,
+        )
+
+    @staticmethod
+    def _policy(settings: Settings) -> RetryPolicy:
+        return RetryPolicy(settings.vector_db_max_retries, settings.vector_db_retry_backoff_seconds)
+
+    @staticmethod
+    def _options(settings: Settings, keepalive: bool = True) -> Dict[str, Any]:
+        options: Dict[str, Any] = {
+            "url": settings.vector_db_url,
+            "api_key": settings.vector_db_api_key,
+            "prefer_grpc": settings.vector_db_prefer_grpc,
+            "grpc_port": settings.vector_db_grpc_port,
+            "timeout": settings.vector_db_timeout_seconds,
+        }
+        if settings.vector_db_prefer_grpc:
+            options["pool_size"] = settings.vector_db_pool_size
+            return options
+        options["limits"] = httpx.Limits(
+            max_connections=settings.vector_db_pool_size,
+            max_keepalive_connections=settings.vector_db_pool_size if keepalive else 0,
+            keepalive_expiry=settings.vector_db_keepalive_seconds,
+        )
+        return options
+
+
+QDRANT_CLIENTS = QdrantClients()
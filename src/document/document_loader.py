@@ -1,3 +1,6 @@
+from typing import Iterator
+
+
 class DocumentLoader:
     def __init__(self, file_path: str):
         self._file_path = file_path
@@ -5,3 +8,7 @@ class DocumentLoader:
     def load(self) -> str:
         with open(self._file_path, "r", encoding="utf-8") as file:
             return file.read()
+
+    def stream(self) -> Iterator[str]:
+        with open(self._file_path, "r", encoding="utf-8") as file:
+            yield from file
@@ -0,0 +1,132 @@
+import sys
+from types import MappingProxyType
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
+
+HEADERS_TO_SPLIT_ON = [
+    ("#", "header_1"),
+    ("##", "header_2"),
+    ("###", "header_3"),
+]
+
+HeaderPath = Tuple[Tuple[str, str], ...]
+
+
+class HeaderSection:
+    __slots__ = ("text", "metadata")
+
+    def __init__(self, text: str, metadata: Mapping[str, str]):
+        self.text = text
+        self.metadata = metadata
+
+
+class SectionBuilder:
+    GROUP_SEPARATOR = "  \n"
+    BACKTICK_FENCE = "```"
+    TILDE_FENCE = "~~~"
+
+    def __init__(self, headers: List[Tuple[str, str]]):
+        self._headers = [(marker, name, marker.count("#")) for marker, name in headers]
+        self._stack: List[Tuple[int, str, str]] = []
+        self._interned: Dict[HeaderPath, Mapping[str, str]] = {}
+        self._metadata = self._intern(())
+        self._section_metadata: Optional[Mapping[str, str]] = None
+        self._groups: List[str] = []
+        self._lines: List[str] = []
+        self._fence = ""
+
+    def feed(self, raw_line: str) -> Optional[HeaderSection]:
+        line = self._clean(raw_line)
+        if self._in_code_block(line):
+            self._lines.append(line)
+            return None
+        header = self._header(line)
+        if header is not None:
+            section = self._close_group()
+            self._push(*header)
+            return section
+        if line:
+            self._lines.append(line)
+            return None
+        return self._close_group()
+
+    def finish(self) -> List[HeaderSection]:
+        closed = self._close_group()
+        last = self._section()
+        return [section for section in (closed, last) if section is not None]
+
+    def _in_code_block(self, line: str) -> bool:
+        if self._fence:
+            if line.startswith(self._fence):
+                self._fence = ""
+            return bool(self._fence)
+        if line.startswith(self.BACKTICK_FENCE) and line.count(self.BACKTICK_FENCE) == 1:
+            self._fence = self.BACKTICK_FENCE
+        elif line.startswith(self.TILDE_FENCE):
+            self._fence = self.TILDE_FENCE
+        return bool(self._fence)
+
+    def _header(self, line: str) -> Optional[Tuple[int, str, str]]:
+        for marker, name, level in self._headers:
+            if line.startswith(marker) and (len(line) == len(marker) or line[len(marker)] == " "):
+                return level, name, line[len(marker):].strip()
+        return None
+
+    def _push(self, level: int, name: str, title: str) -> None:
+        while self._stack and self._stack[-1][0] >= level:
+            self._stack.pop()
+        self._stack.append((level, name, title))
+        self._metadata = self._intern(tuple((name, title) for _, name, title in self._stack))
+
+    def _intern(self, path: HeaderPath) -> Mapping[str, str]:
+        metadata = self._interned.get(path)
+        if metadata is None:
+            interned = {sys.intern(name): sys.intern(title) for name, title in path}
+            metadata = self._interned[path] = MappingProxyType(interned)
+        return metadata
+
+    def _close_group(self) -> Optional[HeaderSection]:
+        if not self._lines:
+            return None
+        group = "\n".join(self._lines)
+        self._lines = []
+        if self._metadata is self._section_metadata:
+            self._groups.append(group)
+            return None
+        previous = self._section()
+        self._groups = [group]
+        self._section_metadata = self._metadata
+        return previous
+
+    def _section(self) -> Optional[HeaderSection]:
+        if not self._groups:
+            return None
+        return HeaderSection(self.GROUP_SEPARATOR.join(self._groups), self._section_metadata)
+
+    @staticmethod
+    def _clean(raw_line: str) -> str:
+        line = raw_line.strip()
+        if line.isprintable():
+            return line
+        return "".join(filter(str.isprintable, line))
+
+
+class HeaderSections:
+    def __init__(self, headers: List[Tuple[str, str]] = HEADERS_TO_SPLIT_ON):
+        self._headers = sorted(headers, key=lambda header: len(header[0]), reverse=True)
+
+    def split(self, pieces: Iterable[str]) -> Iterator[HeaderSection]:
+        builder = SectionBuilder(self._headers)
+        pending = ""
+        for piece in pieces:
+            lines = (pending + piece).split("\n")
+            pending = lines.pop()
+            yield from self._feed(builder, lines)
+        yield from self._feed(builder, [pending])
+        yield from builder.finish()
+
+    @staticmethod
+    def _feed(builder: SectionBuilder, lines: List[str]) -> Iterator[HeaderSection]:
+        for line in lines:
+            section = builder.feed(line)
+            if section is not None:
+                yield section
@@ -0,0 +1,75 @@
+from bisect import bisect_left, bisect_right
+from itertools import accumulate, chain, compress, repeat
+from operator import add, ge, sub
+from typing import Iterator, List, Sequence, Tuple
+
+Span = Tuple[int, int]
+
+
+class SpanSplitter:
+    SEPARATORS = ("\n\n", "\n", " ", "")
+
+    def __init__(self, chunk_size: int, overlap: int):
+        self._chunk_size = chunk_size
+        self._overlap = overlap
+
+    def split(self, text: str) -> Iterator[Span]:
+        for start, end in self._split(text, 0, len(text), self.SEPARATORS):
+            yield start, end - start
+
+    def _split(self, text: str, start: int, end: int, separators: Sequence[str]) -> Iterator[Span]:
+        separator, finer = self._separator(text, start, end, separators)
+        bounds = self._bounds(text, start, end, separator)
+        sizes = map(sub, bounds[1:], bounds[:-1])
+        oversized = compress(range(len(bounds) - 1), map(ge, sizes, repeat(self._chunk_size)))
+        first = 0
+        for piece in oversized:
+            yield from self._merge(text, bounds, first, piece)
+            first = piece + 1
+            if not finer:
+                yield bounds[piece], bounds[piece + 1]
+                continue
+            yield from self._split(text, bounds[piece], bounds[piece + 1], finer)
+        yield from self._merge(text, bounds, first, len(bounds) - 1)
+
+    @staticmethod
+    def _separator(text: str, start: int, end: int, separators: Sequence[str]) -> Tuple[str, Sequence[str]]:
+        for position, separator in enumerate(separators):
+            if not separator:
+                return separator, ()
+            if text.find(separator, start, end) != -1:
+                return separator, separators[position + 1:]
+        return separators[-1], ()
+
+    @staticmethod
+    def _bounds(text: str, start: int, end: int, separator: str) -> List[int]:
+        if not separator:
+            return list(range(start, end + 1))
+        parts = text[start:end].split(separator)
+        tails = map(add, map(len, parts[1:]), repeat(len(separator)))
+        bounds = list(accumulate(chain((start, len(parts[0])), tails)))
+        if parts[0]:
+            return bounds
+        return bounds[1:]
+
+    def _merge(self, text: str, bounds: List[int], first: int, last: int) -> Iterator[Span]:
+        if first >= last:
+            return
+        low = first
+        while True:
+            overflow = bisect_right(bounds, bounds[low] + self._chunk_size, low, last + 1) - 1
+            if overflow >= last:
+                yield from self._stripped(text, bounds[low], bounds[last])
+                return
+            yield from self._stripped(text, bounds[low], bounds[overflow])
+            kept_from = max(bounds[overflow] - self._overlap, bounds[overflow + 1] - self._chunk_size)
+            low = bisect_left(bounds, kept_from, low, overflow)
+
+    @staticmethod
+    def _stripped(text: str, start: int, end: int) -> Iterator[Span]:
+        while start < end and text[start].isspace():
+            start += 1
+        while end > start and text[end - 1].isspace():
+            end -= 1
+        if end > start:
+            yield start, end
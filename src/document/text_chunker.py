@@ -1,20 +1,45 @@
-from typing import Dict, Iterator
+import hashlib
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional
 
-from langchain_text_splitters import MarkdownHeaderTextSplitter, RecursiveCharacterTextSplitter
-
-
-HEADERS_TO_SPLIT_ON = [
-    ("#", "header_1"),
-    ("##", "header_2"),
-    ("###", "header_3"),
-]
+from src.document.header_sections import HeaderSection, HeaderSections
+from src.document.span_splitter import Span, SpanSplitter
+from src.observability.latency_metrics import METRICS
 
 
 class TextChunk:
-    def __init__(self, content: str, index: int, metadata: Dict[str, str]):
-        self.content = content
+    __slots__ = ("_source", "offset", "length", "index", "metadata", "occurrence")
+
+    def __init__(
+        self,
+        source: str,
+        index: int,
+        metadata: Mapping[str, str],
+        offset: int = 0,
+        length: Optional[int] = None,
+        occurrence: int = 0,
+    ):
+        self._source = source
+        self.offset = offset
+        self.length = len(source) - offset if length is None else length
         self.index = index
         self.metadata = metadata
+        self.occurrence = occurrence
+
+    @property
+    def content(self) -> str:
+        return self._source[self.offset:self.offset + self.length]
+
+    def content_hash(self) -> str:
+        return hashlib.sha256(self.content.encode("utf-8")).hexdigest()
+
+    def key(self) -> str:
+        return self.chunk_key(self.content_hash(), self.occurrence)
+
+    @staticmethod
+    def chunk_key(content_hash: str, occurrence: int) -> str:
+        if occurrence == 0:
+            return content_hash
+        return f"{content_hash}:{occurrence}"
 
     def __repr__(self) -> str:
         preview = self.content[:60].replace("\n", " ")
@@ -37,23 +62,38 @@ class Chunks:
 
 class TextChunker:
     def __init__(self, chunk_size: int, overlap: int):
-        self._header_splitter = MarkdownHeaderTextSplitter(
-            headers_to_split_on=HEADERS_TO_SPLIT_ON,
-        )
-        self._text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=chunk_size,
-            chunk_overlap=overlap,
-        )
+        self._sections = HeaderSections()
+        self._splitter = SpanSplitter(chunk_size=chunk_size, overlap=overlap)
 
     def chunk(self, text: str) -> Chunks:
-        header_splits = self._header_splitter.split_text(text)
-        sized_splits = self._text_splitter.split_documents(header_splits)
-        items = [
-            TextChunk(
-                content=doc.page_content,
-                index=index,
-                metadata=dict(doc.metadata),
-            )
-            for index, doc in enumerate(sized_splits)
-        ]
-        return Chunks(items)
+        return Chunks(list(self.iter_chunks(text)))
+
+    def iter_chunks(self, text: str) -> Iterator[TextChunk]:
+        return self.stream([text])
+
+    def stream(self, lines: Iterable[str]) -> Iterator[TextChunk]:
+        sections = self._sections.split(lines)
+        occurrences: Dict[int, int] = {}
+        index = 0
+        while True:
+            with METRICS.time("ingest.chunking"):
+                section = next(sections, None)
+                spans = self._spans(section)
+            if section is None:
+                return
+            for offset, length in spans:
+                occurrence = self._count(occurrences, section.text[offset:offset + length])
+                yield TextChunk(section.text, index, section.metadata, offset, length, occurrence)
+                index += 1
+
+    @staticmethod
+    def _count(occurrences: Dict[int, int], content: str) -> int:
+        content_key = hash(content)
+        occurrence = occurrences.get(content_key, 0)
+        occurrences[content_key] = occurrence + 1
+        return occurrence
+
+    def _spans(self, section: Optional[HeaderSection]) -> List[Span]:
+        if section is None:
+            return []
+        return list(self._splitter.split(section.text))
@@ -0,0 +1,23 @@
+from itertools import islice
+from typing import Iterable, Iterator, List, Tuple, TypeVar
+
+T = TypeVar("T")
+
+_EXHAUSTED = object()
+
+
+def batched(items: Iterable[T], size: int) -> Iterator[List[T]]:
+    iterator = iter(items)
+    batch = list(islice(iterator, size))
+    while batch:
+        yield batch
+        batch = list(islice(iterator, size))
+
+
+def flag_last(items: Iterable[T]) -> Iterator[Tuple[T, bool]]:
+    iterator = iter(items)
+    current = next(iterator, _EXHAUSTED)
+    while current is not _EXHAUSTED:
+        following = next(iterator, _EXHAUSTED)
+        yield current, following is _EXHAUSTED
+        current = following
@@ -1,15 +1,74 @@
-from typing import List
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
 
-from langchain_openai import OpenAIEmbeddings
+from langchain_core.embeddings import Embeddings
+
+from src.config.lazy import Lazy
+from src.embeddings.batching import batched
+from src.embeddings.embedding_cache import DenseEmbeddingCache, QueryEmbeddingCache, embed_through_cache
+
+
+def openai_embeddings(model: str, api_key: str, batch_size: int) -> Embeddings:
+    from langchain_openai import OpenAIEmbeddings
+
+    return OpenAIEmbeddings(model=model, api_key=api_key, chunk_size=batch_size)
 
 
 class DenseEmbedder:
-    def __init__(self, model: str, api_key: str):
-        self._embeddings = OpenAIEmbeddings(model=model, api_key=api_key)
+    DEFAULT_BATCH_SIZE = 64
+    DEFAULT_MAX_CONCURRENCY = 4
+    MODEL_DIMENSIONS: Dict[str, int] = {
+        "text-embedding-3-small": 1536,
+        "text-embedding-3-large": 3072,
+        "text-embedding-ada-002": 1536,
+    }
+    _probed_dimensions: Dict[str, int] = {}
+
+    def __init__(
+        self,
+        model: str,
+        api_key: str,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        cache: Optional[DenseEmbeddingCache] = None,
+        query_cache: Optional[QueryEmbeddingCache] = None,
+    ):
+        self._model = model
+        self._embeddings = Lazy(lambda: openai_embeddings(model, api_key, batch_size))
+        self._batch_size = batch_size
+        self._max_concurrency = max_concurrency
+        self._cache = cache
+        self._query_cache = query_cache
 
     def embed(self, text: str) -> List[float]:
-        return self._embeddings.embed_query(text)
+        return embed_through_cache(self._query_cache, [text], self._embed_queries)[0]
+
+    def embed_many(self, texts: List[str]) -> List[List[float]]:
+        return embed_through_cache(self._cache, texts, self._embed_documents)
 
     def dimension(self) -> int:
-        sample = self._embeddings.embed_query("dimension probe")
-        return len(sample)
+        known = self.MODEL_DIMENSIONS.get(self._model) or self._probed_dimensions.get(self._model)
+        if known:
+            return known
+        dimension = len(self._embeddings.get().embed_query("dimension probe"))
+        self._probed_dimensions[self._model] = dimension
+        return dimension
+
+    def warmup(self) -> None:
+        self._embeddings.get()
+
+    def _embed_queries(self, texts: List[str]) -> List[List[float]]:
+        return [self._embeddings.get().embed_query(text) for text in texts]
+
+    def _embed_documents(self, texts: List[str]) -> List[List[float]]:
+        batches = list(batched(texts, self._batch_size))
+        if len(batches) <= 1:
+            return self._embed_batch(texts)
+        with ThreadPoolExecutor(max_workers=self._max_concurrency) as executor:
+            results = executor.map(self._embed_batch, batches)
+            return [vector for batch in results for vector in batch]
+
+    def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        return self._embeddings.get().embed_documents(texts)
@@ -0,0 +1,293 @@
+import hashlib
+import os
+import sqlite3
+from collections import OrderedDict
+from threading import Lock
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, TypeVar
+
+import numpy as np
+
+from src.config.settings import Settings
+from src.embeddings.batching import batched
+
+if TYPE_CHECKING:
+    from qdrant_client.http import models
+
+V = TypeVar("V")
+
+
+def cache_key(model: str, text: str) -> str:
+    return hashlib.sha256(f"{model}\0{text}".encode("utf-8")).hexdigest()
+
+
+def embed_through_cache(cache, texts: List[str], compute: Callable[[List[str]], List[V]]) -> List[V]:
+    if cache is None:
+        return compute(texts)
+    cached = cache.get_many(texts)
+    missing = [text for text, vector in zip(texts, cached) if vector is None]
+    if not missing:
+        return cached
+    computed = compute(missing)
+    cache.put_many(missing, computed)
+    fresh = iter(computed)
+    return [next(fresh) if vector is None else vector for vector in cached]
+
+
+class QueryEmbeddingCache:
+    def __init__(self, max_entries: int):
+        self._max_entries = max_entries
+        self._lock = Lock()
+        self._entries: "OrderedDict[str, List[float]]" = OrderedDict()
+
+    @classmethod
+    def from_settings(cls, settings: Settings) -> Optional["QueryEmbeddingCache"]:
+        if settings.query_embedding_cache_entries <= 0:
+            return None
+        return cls(max_entries=settings.query_embedding_cache_entries)
+
+    def get_many(self, texts: List[str]) -> List[Optional[List[float]]]:
+        with self._lock:
+            return [self._get(text) for text in texts]
+
+    def put_many(self, texts: List[str], vectors: List[List[float]]) -> None:
+        with self._lock:
+            self._entries.update(zip(texts, vectors))
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def _get(self, text: str) -> Optional[List[float]]:
+        vector = self._entries.get(text)
+        if vector is not None:
+            self._entries.move_to_end(text)
+        return vector
+
+
+class DenseEmbeddingCache:
+    DATABASE_FILE = "index.sqlite3"
+    VECTORS_FILE = "vectors.f32"
+
+    def __init__(self, directory: str, model: str, max_entries: int):
+        self._directory = os.path.join(directory, "dense", hashlib.sha1(model.encode("utf-8")).hexdigest()[:12])
+        self._model = model
+        self._max_entries = max_entries
+        self._lock = Lock()
+        self._slots: "OrderedDict[str, int]" = OrderedDict()
+        self._free: List[int] = []
+        self._clock = 0
+        self._dimension = 0
+        self._vectors: Optional[np.memmap] = None
+        os.makedirs(self._directory, exist_ok=True)
+        self._connection = sqlite3.connect(self._path(self.DATABASE_FILE), check_same_thread=False)
+        with self._connection:
+            self._connection.execute("CREATE TABLE IF NOT EXISTS layout (dimension INTEGER, max_entries INTEGER)")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS slots (key TEXT PRIMARY KEY, slot INTEGER, used INTEGER)"
+            )
+        self._load_index()
+
+    @classmethod
+    def from_settings(cls, settings: Settings) -> Optional["DenseEmbeddingCache"]:
+        if not settings.embedding_cache_dir:
+            return None
+        return cls(
+            directory=settings.embedding_cache_dir,
+            model=settings.model_embeddings,
+            max_entries=settings.embedding_cache_max_entries,
+        )
+
+    def dimension(self) -> int:
+        return self._dimension
+
+    def get_many(self, texts: List[str]) -> List[Optional[List[float]]]:
+        keys = [cache_key(self._model, text) for text in texts]
+        with self._lock:
+            vectors = [self._get(key) for key in keys]
+            self._touch([key for key, vector in zip(keys, vectors) if vector is not None])
+            return vectors
+
+    def put_many(self, texts: List[str], vectors: List[List[float]]) -> None:
+        if not texts:
+            return
+        keys = [cache_key(self._model, text) for text in texts]
+        with self._lock:
+            self._ensure_vectors(len(vectors[0]))
+            slots = self._assign_slots(keys)
+            for slot, vector in zip(slots, vectors):
+                self._vectors[slot] = vector
+            self._vectors.flush()
+            self._remember(keys)
+
+    def _get(self, key: str) -> Optional[List[float]]:
+        slot = self._slots.get(key)
+        if slot is None:
+            return None
+        self._slots.move_to_end(key)
+        return self._vectors[slot].tolist()
+
+    def _assign_slots(self, keys: List[str]) -> List[int]:
+        overwritten = [key for key in keys if key in self._slots]
+        slots = [self._slot_for(key, overwritten) for key in keys]
+        self._forget(overwritten)
+        return slots
+
+    def _slot_for(self, key: str, overwritten: List[str]) -> int:
+        slot = self._slots.pop(key, None)
+        if slot is None:
+            slot = self._free_slot(overwritten)
+        self._slots[key] = slot
+        return slot
+
+    def _free_slot(self, overwritten: List[str]) -> int:
+        if self._free:
+            return self._free.pop()
+        key, slot = self._slots.popitem(last=False)
+        overwritten.append(key)
+        return slot
+
+    def _forget(self, keys: List[str]) -> None:
+        with self._connection:
+            self._connection.executemany("DELETE FROM slots WHERE key = ?", [(key,) for key in keys])
+
+    def _remember(self, keys: List[str]) -> None:
+        rows = [(key, self._slots[key], self._tick()) for key in dict.fromkeys(keys) if key in self._slots]
+        with self._connection:
+            self._connection.executemany("INSERT OR REPLACE INTO slots VALUES (?, ?, ?)", rows)
+
+    def _touch(self, keys: List[str]) -> None:
+        if not keys:
+            return
+        rows = [(self._tick(), key) for key in keys]
+        with self._connection:
+            self._connection.executemany("UPDATE slots SET used = ? WHERE key = ?", rows)
+
+    def _tick(self) -> int:
+        self._clock += 1
+        return self._clock
+
+    def _ensure_vectors(self, dimension: int) -> None:
+        if self._vectors is not None:
+            return
+        self._dimension = dimension
+        self._vectors = self._open_vectors("w+")
+        with self._connection:
+            self._connection.execute("INSERT INTO layout VALUES (?, ?)", (dimension, self._max_entries))
+
+    def _open_vectors(self, mode: str) -> np.memmap:
+        return np.memmap(
+            self._path(self.VECTORS_FILE),
+            dtype=np.float32,
+            mode=mode,
+            shape=(self._max_entries, self._dimension),
+        )
+
+    def _load_index(self) -> None:
+        layout = self._connection.execute("SELECT dimension, max_entries FROM layout").fetchone()
+        if layout is None or layout[1] != self._max_entries or not os.path.exists(self._path(self.VECTORS_FILE)):
+            self._reset_index()
+            return
+        self._dimension = layout[0]
+        rows = self._connection.execute("SELECT key, slot, used FROM slots ORDER BY used").fetchall()
+        self._slots = OrderedDict((key, slot) for key, slot, _ in rows)
+        self._clock = rows[-1][2] if rows else 0
+        taken = set(self._slots.values())
+        self._free = [slot for slot in range(self._max_entries - 1, -1, -1) if slot not in taken]
+        self._vectors = self._open_vectors("r+")
+
+    def _reset_index(self) -> None:
+        with self._connection:
+            self._connection.execute("DELETE FROM layout")
+            self._connection.execute("DELETE FROM slots")
+        self._free = list(range(self._max_entries - 1, -1, -1))
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self._directory, name)
+
+
+class SparseEmbeddingCache:
+    DATABASE_FILE = "sparse.sqlite3"
+    QUERY_BATCH_SIZE = 500
+
+    def __init__(self, directory: str, model: str, max_entries: int):
+        os.makedirs(directory, exist_ok=True)
+        self._model = model
+        self._max_entries = max_entries
+        self._lock = Lock()
+        self._connection = sqlite3.connect(os.path.join(directory, self.DATABASE_FILE), check_same_thread=False)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, indices BLOB, vector_values BLOB, used INTEGER)"
+        )
+
+    @classmethod
+    def from_settings(cls, settings: Settings, model: str) -> Optional["SparseEmbeddingCache"]:
+        if not settings.embedding_cache_dir:
+            return None
+        return cls(
+            directory=settings.embedding_cache_dir,
+            model=model,
+            max_entries=settings.embedding_cache_max_entries,
+        )
+
+    def get_many(self, texts: List[str]) -> List[Optional["models.SparseVector"]]:
+        keys = [cache_key(self._model, text) for text in texts]
+        with self._lock:
+            found = self._select(keys)
+            self._touch(list(found))
+        return [found.get(key) for key in keys]
+
+    def put_many(self, texts: List[str], vectors: List["models.SparseVector"]) -> None:
+        rows = [
+            (
+                cache_key(self._model, text),
+                np.asarray(vector.indices, dtype=np.uint32).tobytes(),
+                np.asarray(vector.values, dtype=np.float32).tobytes(),
+            )
+            for text, vector in zip(texts, vectors)
+        ]
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, (SELECT COALESCE(MAX(used), 0) + 1 FROM entries))",
+                rows,
+            )
+            self._evict()
+
+    def _select(self, keys: List[str]) -> Dict[str, "models.SparseVector"]:
+        found: Dict[str, "models.SparseVector"] = {}
+        for batch in batched(keys, self.QUERY_BATCH_SIZE):
+            found.update(self._select_batch(batch))
+        return found
+
+    def _select_batch(self, keys: List[str]) -> Dict[str, "models.SparseVector"]:
+        from qdrant_client.http import models
+
+        placeholders = ",".join("?" for _ in keys)
+        rows = self._connection.execute(
+            f"SELECT key, indices, vector_values FROM entries WHERE key IN ({placeholders})",
+            keys,
+        )
+        return {
+            key: models.SparseVector(
+                indices=np.frombuffer(indices, dtype=np.uint32).tolist(),
+                values=np.frombuffer(values, dtype=np.float32).tolist(),
+            )
+            for key, indices, values in rows
+        }
+
+    def _touch(self, keys: List[str]) -> None:
+        with self._connection:
+            for batch in batched(keys, self.QUERY_BATCH_SIZE):
+                self._touch_batch(batch)
+
+    def _touch_batch(self, keys: List[str]) -> None:
+        placeholders = ",".join("?" for _ in keys)
+        self._connection.execute(
+            f"UPDATE entries SET used = (SELECT MAX(used) + 1 FROM entries) WHERE key IN ({placeholders})",
+            keys,
+        )
+
+    def _evict(self) -> None:
+        self._connection.execute(
+            "DELETE FROM entries WHERE key IN ("
+            "SELECT key FROM entries ORDER BY used DESC LIMIT -1 OFFSET ?)",
+            (self._max_entries,),
+        )
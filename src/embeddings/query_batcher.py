@@ -0,0 +1,118 @@
+import asyncio
+from concurrent.futures import Future, ThreadPoolExecutor
+from threading import Lock, Timer
+from typing import Callable, Dict, Generic, List, Optional, TypeVar
+
+from src.config.lazy import Lazy
+
+T = TypeVar("T")
+
+Batch = Dict[str, Future]
+
+
+class QueryBatcher(Generic[T]):
+    def __init__(
+        self,
+        compute: Callable[[List[str]], List[T]],
+        window_seconds: float,
+        max_batch_size: int,
+        max_concurrency: int,
+    ):
+        self._compute = compute
+        self._window_seconds = window_seconds
+        self._max_batch_size = max_batch_size
+        self._executor = Lazy(
+            lambda: ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="query-batcher")
+        )
+        self._in_flight: Batch = {}
+        self._pending: Batch = {}
+        self._generation = 0
+        self._running = 0
+        self._lock = Lock()
+
+    def embed(self, text: str) -> T:
+        return self.submit(text).result()
+
+    async def aembed(self, text: str) -> T:
+        return await asyncio.wrap_future(self.submit(text))
+
+    def submit(self, text: str) -> Future:
+        with self._lock:
+            future = self._in_flight.get(text)
+            if future is not None:
+                return future
+            future = self._in_flight[text] = self._pending[text] = Future()
+            batch = self._ready_batch()
+        if batch:
+            self._dispatch(batch)
+        return future
+
+    def _ready_batch(self) -> Optional[Batch]:
+        if self._flushes_now():
+            return self._take()
+        if len(self._pending) == 1:
+            timer = Timer(self._window_seconds, self._flush, args=(self._generation,))
+            timer.daemon = True
+            timer.start()
+        return None
+
+    def _flushes_now(self) -> bool:
+        return self._running == 0 or self._window_seconds <= 0 or len(self._pending) >= self._max_batch_size
+
+    def _flush(self, generation: int) -> None:
+        with self._lock:
+            if generation != self._generation or not self._pending:
+                return
+            batch = self._take()
+        self._dispatch(batch)
+
+    def _take(self) -> Batch:
+        batch, self._pending = self._pending, {}
+        self._generation += 1
+        self._running += 1
+        return batch
+
+    def _dispatch(self, batch: Batch) -> None:
+        self._executor.get().submit(self._run, batch)
+
+    def _run(self, batch: Batch) -> None:
+        try:
+            self._resolve(batch)
+        finally:
+            self._release()
+
+    def _release(self) -> None:
+        with self._lock:
+            self._running -= 1
+            batch = self._idle_batch()
+        if batch:
+            self._dispatch(batch)
+
+    def _idle_batch(self) -> Optional[Batch]:
+        if self._running > 0 or not self._pending:
+            return None
+        return self._take()
+
+    def _resolve(self, batch: Batch) -> None:
+        try:
+            results = self._checked(batch, self._compute(list(batch)))
+        except BaseException as error:
+            self._settle(batch)
+            for future in batch.values():
+                future.set_exception(error)
+            return
+        self._settle(batch)
+        for future, result in zip(batch.values(), results):
+            future.set_result(result)
+
+    @staticmethod
+    def _checked(batch: Batch, results: List[T]) -> List[T]:
+        if len(results) != len(batch):
+            raise ValueError(f"Expected {len(batch)} results, got {len(results)}.")
+        return results
+
+    def _settle(self, batch: Batch) -> None:
+        with self._lock:
+            for text, future in batch.items():
+                if self._in_flight.get(text) is future:
+                    del self._in_flight[text]
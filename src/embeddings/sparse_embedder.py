@@ -1,15 +1,52 @@
-from fastembed import SparseTextEmbedding
+from typing import Any, List, Optional
+
 from qdrant_client.http import models
 
+from src.config.lazy import Lazy
+from src.embeddings.embedding_cache import SparseEmbeddingCache, embed_through_cache
+
+
+def fastembed_sparse_model(model_name: str) -> Any:
+    from fastembed import SparseTextEmbedding
+
+    return SparseTextEmbedding(model_name=model_name)
+
 
 class SparseEmbedder:
     DEFAULT_MODEL = "Qdrant/bm25"
+    DEFAULT_BATCH_SIZE = 256
 
-    def __init__(self, model_name: str = DEFAULT_MODEL):
-        self._model = SparseTextEmbedding(model_name=model_name)
+    def __init__(
+        self,
+        model_name: str = DEFAULT_MODEL,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        parallel: Optional[int] = None,
+        cache: Optional[SparseEmbeddingCache] = None,
+    ):
+        self._model = Lazy(lambda: fastembed_sparse_model(model_name))
+        self._batch_size = batch_size
+        self._parallel = parallel
+        self._cache = cache
+
+    def warmup(self) -> None:
+        self._model.get()
 
     def embed(self, text: str) -> models.SparseVector:
-        result = list(self._model.query_embed(text))[0]
+        result = next(iter(self._model.get().query_embed(text)))
+        return self._to_sparse_vector(result)
+
+    def embed_queries(self, texts: List[str]) -> List[models.SparseVector]:
+        return [self._to_sparse_vector(result) for result in self._model.get().query_embed(texts)]
+
+    def embed_many(self, texts: List[str]) -> List[models.SparseVector]:
+        return embed_through_cache(self._cache, texts, self._embed_documents)
+
+    def _embed_documents(self, texts: List[str]) -> List[models.SparseVector]:
+        results = self._model.get().embed(texts, batch_size=self._batch_size, parallel=self._parallel)
+        return [self._to_sparse_vector(result) for result in results]
+
+    @staticmethod
+    def _to_sparse_vector(result) -> models.SparseVector:
         return models.SparseVector(
             indices=result.indices.tolist(),
             values=result.values.tolist(),
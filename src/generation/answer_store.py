@@ -0,0 +1,148 @@
+import os
+import sqlite3
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from src.generation.answer_vectors import AnswerVectors, EntryKey
+
+
+class InMemoryAnswerStore:
+    def __init__(self, max_entries: int):
+        self._max_entries = max_entries
+        self._entries: "OrderedDict[EntryKey, Tuple[str, float]]" = OrderedDict()
+        self._vectors = AnswerVectors()
+        self._lock = Lock()
+
+    def get(self, scope: str, key: str, min_created: float) -> Optional[str]:
+        with self._lock:
+            return self._get((scope, key), min_created)
+
+    def similar(self, scope: str, vector: List[float], min_created: float, threshold: float) -> Optional[str]:
+        with self._lock:
+            candidates = self._vectors.candidates(scope, np.asarray(vector), min_created, threshold)
+            return self._get(candidates[0], min_created) if candidates else None
+
+    def put(self, scope: str, key: str, vector: List[float], answer: str) -> None:
+        entry_key = (scope, key)
+        created = time.time()
+        with self._lock:
+            self._entries[entry_key] = (answer, created)
+            self._entries.move_to_end(entry_key)
+            self._vectors.put(entry_key, np.asarray(vector), created)
+            self._evict()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._vectors.clear()
+
+    def _get(self, entry_key: EntryKey, min_created: float) -> Optional[str]:
+        entry = self._entries.get(entry_key)
+        if entry is None:
+            return None
+        answer, created = entry
+        if created < min_created:
+            self._remove(entry_key)
+            return None
+        self._entries.move_to_end(entry_key)
+        return answer
+
+    def _evict(self) -> None:
+        while len(self._entries) > self._max_entries:
+            entry_key, _ = self._entries.popitem(last=False)
+            self._vectors.remove(entry_key)
+
+    def _remove(self, entry_key: EntryKey) -> None:
+        self._entries.pop(entry_key, None)
+        self._vectors.remove(entry_key)
+
+
+class SqliteAnswerStore:
+    BUSY_TIMEOUT_SECONDS = 30.0
+    MIRROR_SLACK = 2
+
+    def __init__(self, path: str, max_entries: int):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._max_entries = max_entries
+        self._lock = Lock()
+        self._vectors = AnswerVectors()
+        self._watermark = 0
+        self._epoch: Optional[int] = None
+        self._connection = sqlite3.connect(path, timeout=self.BUSY_TIMEOUT_SECONDS, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        with self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS answers ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, scope TEXT, key TEXT, vector BLOB, answer TEXT, "
+                "created REAL, used INTEGER, UNIQUE (scope, key))"
+            )
+            self._connection.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER)")
+            self._connection.execute("INSERT OR IGNORE INTO meta VALUES ('epoch', 0)")
+
+    def get(self, scope: str, key: str, min_created: float) -> Optional[str]:
+        with self._lock:
+            return self._get((scope, key), min_created)
+
+    def similar(self, scope: str, vector: List[float], min_created: float, threshold: float) -> Optional[str]:
+        with self._lock:
+            self._sync()
+            for entry_key in self._vectors.candidates(scope, np.asarray(vector), min_created, threshold):
+                answer = self._get(entry_key, min_created)
+                if answer is not None:
+                    return answer
+                self._vectors.remove(entry_key)
+            return None
+
+    def put(self, scope: str, key: str, vector: List[float], answer: str) -> None:
+        row = (scope, key, np.asarray(vector, dtype=np.float32).tobytes(), answer, time.time())
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO answers (scope, key, vector, answer, created, used) "
+                "VALUES (?, ?, ?, ?, ?, (SELECT COALESCE(MAX(used), 0) + 1 FROM answers))",
+                row,
+            )
+            self._connection.execute(
+                "DELETE FROM answers WHERE id IN (SELECT id FROM answers ORDER BY used DESC LIMIT -1 OFFSET ?)",
+                (self._max_entries,),
+            )
+
+    def clear(self) -> None:
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM answers")
+            self._connection.execute("UPDATE meta SET value = value + 1 WHERE name = 'epoch'")
+
+    def _get(self, entry_key: EntryKey, min_created: float) -> Optional[str]:
+        row = self._connection.execute(
+            "SELECT answer, created FROM answers WHERE scope = ? AND key = ?",
+            entry_key,
+        ).fetchone()
+        if row is None:
+            return None
+        answer, created = row
+        with self._connection:
+            if created < min_created:
+                self._connection.execute("DELETE FROM answers WHERE scope = ? AND key = ?", entry_key)
+                return None
+            self._connection.execute(
+                "UPDATE answers SET used = (SELECT MAX(used) + 1 FROM answers) WHERE scope = ? AND key = ?",
+                entry_key,
+            )
+        return answer
+
+    def _sync(self) -> None:
+        epoch = self._connection.execute("SELECT value FROM meta WHERE name = 'epoch'").fetchone()[0]
+        if epoch != self._epoch or len(self._vectors) > self.MIRROR_SLACK * self._max_entries:
+            self._vectors.clear()
+            self._watermark = 0
+            self._epoch = epoch
+        rows = self._connection.execute(
+            "SELECT id, scope, key, vector, created FROM answers WHERE id > ? ORDER BY id",
+            (self._watermark,),
+        )
+        for row_id, scope, key, vector, created in rows:
+            self._vectors.put((scope, key), np.frombuffer(vector, dtype=np.float32), created)
+            self._watermark = row_id
@@ -0,0 +1,86 @@
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+EntryKey = Tuple[str, str]
+
+
+class AnswerVectors:
+    INITIAL_CAPACITY = 64
+
+    def __init__(self):
+        self.clear()
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def clear(self) -> None:
+        self._vectors: Optional[np.ndarray] = None
+        self._created = np.empty(0, dtype=np.float64)
+        self._scope_of = np.empty(0, dtype=np.int32)
+        self._keys: List[Optional[EntryKey]] = []
+        self._slots: Dict[EntryKey, int] = {}
+        self._scope_ids: Dict[str, int] = {}
+        self._free: List[int] = []
+        self._size = 0
+
+    def put(self, entry_key: EntryKey, vector: np.ndarray, created: float) -> None:
+        slot = self._slots.get(entry_key)
+        if slot is None:
+            slot = self._allocate(len(vector))
+        self._vectors[slot] = self._normalize(vector)
+        self._created[slot] = created
+        self._scope_of[slot] = self._scope_ids.setdefault(entry_key[0], len(self._scope_ids))
+        self._keys[slot] = entry_key
+        self._slots[entry_key] = slot
+
+    def remove(self, entry_key: EntryKey) -> None:
+        slot = self._slots.pop(entry_key, None)
+        if slot is None:
+            return
+        self._scope_of[slot] = -1
+        self._keys[slot] = None
+        self._free.append(slot)
+
+    def candidates(self, scope: str, vector: np.ndarray, min_created: float, threshold: float) -> List[EntryKey]:
+        scope_id = self._scope_ids.get(scope)
+        if scope_id is None or self._vectors is None:
+            return []
+        scores = self._vectors[: self._size] @ self._normalize(vector)
+        eligible = (
+            (self._scope_of[: self._size] == scope_id)
+            & (self._created[: self._size] >= min_created)
+            & (scores >= threshold)
+        )
+        slots = np.flatnonzero(eligible)
+        return [self._keys[slot] for slot in slots[np.argsort(-scores[slots])]]
+
+    def _allocate(self, dimension: int) -> int:
+        if self._free:
+            return self._free.pop()
+        if self._vectors is None or self._size == len(self._vectors):
+            self._grow(dimension)
+        self._size += 1
+        self._keys.append(None)
+        return self._size - 1
+
+    def _grow(self, dimension: int) -> None:
+        capacity = max(self.INITIAL_CAPACITY, 2 * self._size)
+        current = self._vectors if self._vectors is not None else np.zeros((0, dimension), dtype=np.float32)
+        self._vectors = self._resized(current, capacity, 0)
+        self._created = self._resized(self._created, capacity, 0)
+        self._scope_of = self._resized(self._scope_of, capacity, -1)
+
+    @staticmethod
+    def _resized(array: np.ndarray, capacity: int, fill: float) -> np.ndarray:
+        resized = np.full((capacity,) + array.shape[1:], fill, dtype=array.dtype)
+        resized[: len(array)] = array
+        return resized
+
+    @staticmethod
+    def _normalize(vector: np.ndarray) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        if norm == 0:
+            return vector
+        return vector / norm
@@ -0,0 +1,88 @@
+import math
+import re
+from typing import List, Optional, Tuple
+
+from src.observability.latency_metrics import METRICS
+from src.search.search_result import SearchResult, SearchResults
+
+SectionKey = Tuple[str, str, str]
+
+
+class TokenEstimator:
+    PIECE_PATTERN = re.compile(r"\w+|[^\w\s]")
+    CHARS_PER_TOKEN = 4
+
+    def estimate(self, text: str) -> int:
+        pieces = sum(1 for _ in self.PIECE_PATTERN.finditer(text))
+        return max(pieces, math.ceil(len(text) / self.CHARS_PER_TOKEN))
+
+
+class ContextPacker:
+    SEPARATOR = "\n\n"
+    SECTION_FIELDS = ("header_1", "header_2", "header_3")
+    MIN_OVERLAP_CHARS = 10
+
+    def __init__(self, token_budget: int, max_overlap: int, estimator: Optional[TokenEstimator] = None):
+        self._token_budget = token_budget
+        self._max_overlap = max_overlap
+        self._estimator = estimator or TokenEstimator()
+
+    def pack(self, results: SearchResults) -> str:
+        with METRICS.time("generation.context_packing"):
+            spans = sorted(self.merge(results), key=lambda span: span.score, reverse=True)
+            return self.SEPARATOR.join(self._fit(spans))
+
+    def merge(self, results: SearchResults) -> SearchResults:
+        ordered = sorted(results, key=lambda result: (result.source, self._section(result), result.chunk_index))
+        merged: List[SearchResult] = []
+        previous: Optional[SearchResult] = None
+        for result in ordered:
+            if previous is not None and self._adjacent(previous, result):
+                merged[-1] = self._join(merged[-1], result)
+                previous = result
+                continue
+            merged.append(result)
+            previous = result
+        return SearchResults(merged)
+
+    def _adjacent(self, previous: SearchResult, result: SearchResult) -> bool:
+        if previous.source != result.source or self._section(previous) != self._section(result):
+            return False
+        return result.chunk_index == previous.chunk_index + 1
+
+    def _join(self, head: SearchResult, tail: SearchResult) -> SearchResult:
+        return SearchResult(
+            content=self._stitch(head.content, tail.content),
+            score=max(head.score, tail.score),
+            chunk_index=head.chunk_index,
+            point_id=head.point_id,
+            metadata=head.metadata,
+            source=head.source,
+        )
+
+    def _stitch(self, head: str, tail: str) -> str:
+        longest = min(len(head), len(tail), self._max_overlap)
+        for size in range(longest, self.MIN_OVERLAP_CHARS - 1, -1):
+            if head.endswith(tail[:size]):
+                return head + tail[size:]
+        return head + self.SEPARATOR + tail
+
+    def _fit(self, spans: List[SearchResult]) -> List[str]:
+        remaining = self._token_budget
+        packed: List[str] = []
+        for span in spans:
+            tokens = self._estimator.estimate(span.content)
+            if tokens > remaining:
+                continue
+            packed.append(span.content)
+            remaining -= tokens
+        if packed or not spans:
+            return packed
+        return [self._truncate(spans[0].content)]
+
+    def _truncate(self, text: str) -> str:
+        ratio = self._token_budget / self._estimator.estimate(text)
+        return text[: int(len(text) * ratio)]
+
+    def _section(self, result: SearchResult) -> SectionKey:
+        return tuple(result.metadata.get(field) or "" for field in self.SECTION_FIELDS)
@@ -0,0 +1,50 @@
+from typing import Any, Dict, List, Optional
+
+from pydantic import SecretStr
+
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_mistralai import ChatMistralAI
+
+from src.config.settings import Settings
+
+
+class QueryExpander:
+    PROMPT_TEMPLATE = (
+        "Generate {variants} different rephrasings of the user question below to retrieve relevant documents "
+        "from a vector database. Return one rephrasing per line, without numbering or extra text.\n\n"
+        "Question: {question}"
+    )
+
+    def __init__(self, settings: Settings, variants: int = 3):
+        llm = ChatMistralAI(
+            model=settings.mistral_model,
+            api_key=SecretStr(settings.mistral_api_key),
+        )
+        prompt = ChatPromptTemplate.from_template(self.PROMPT_TEMPLATE)
+        self._chain = prompt | llm | StrOutputParser()
+        self._variants = variants
+        self._max_concurrency = settings.llm_max_concurrency
+
+    @classmethod
+    def from_settings(cls, settings: Settings) -> Optional["QueryExpander"]:
+        if settings.query_expansion_variants <= 0:
+            return None
+        return cls(settings, variants=settings.query_expansion_variants)
+
+    def expand(self, question: str) -> List[str]:
+        return self._queries(question, self._chain.invoke(self._inputs(question)))
+
+    def expand_many(self, questions: List[str]) -> List[List[str]]:
+        outputs = self._chain.batch(
+            [self._inputs(question) for question in questions],
+            config={"max_concurrency": self._max_concurrency},
+        )
+        return [self._queries(question, output) for question, output in zip(questions, outputs)]
+
+    def _inputs(self, question: str) -> Dict[str, Any]:
+        return {"question": question, "variants": self._variants}
+
+    def _queries(self, question: str, output: str) -> List[str]:
+        rephrasings = [line.strip() for line in output.splitlines() if line.strip()]
+        return [question] + rephrasings[: self._variants]
@@ -1,16 +1,31 @@
-from typing import Dict, Optional
+import asyncio
+import contextvars
+import functools
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Tuple
 
 from langfuse import get_client, observe
 from langfuse.langchain import CallbackHandler
 from pydantic import SecretStr
 
 from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompt_values import PromptValue
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.runnables import RunnablePassthrough
+from langchain_core.runnables import Runnable, RunnableConfig, RunnableLambda, RunnablePassthrough
 from langchain_mistralai import ChatMistralAI
 
 from src.config.settings import Settings
+from src.generation.context_packer import ContextPacker
+from src.generation.query_expander import QueryExpander
+from src.generation.semantic_answer_cache import SemanticAnswerCache
+from src.generation.stream_event import StreamEvent
+from src.observability.latency_metrics import METRICS
+from src.observability.llm_timing_callback import LLMTimingCallback
+from src.observability.trace_exporter import start_trace_exporter
 from src.search.hybrid_searcher import HybridSearcher
+from src.search.search_result import SearchResults
+
+FilterKey = Tuple[Tuple[str, str], ...]
+Miss = Tuple[int, List[float]]
 
 
 class RAGChain:
@@ -20,29 +35,333 @@ class RAGChain:
         "Question: {question}"
     )
 
-    def __init__(self, searcher: HybridSearcher, settings: Settings):
+    def __init__(
+        self,
+        searcher: HybridSearcher,
+        settings: Settings,
+        answer_cache: Optional[SemanticAnswerCache] = None,
+        query_expander: Optional[QueryExpander] = None,
+    ):
         self._searcher = searcher
+        self._answer_cache = answer_cache
+        self._query_expander = query_expander
         self._llm = ChatMistralAI(
-            name=settings.mistral_model,
+            model=settings.mistral_model,
             api_key=SecretStr(settings.mistral_api_key),
+            streaming=True,
         )
         self._prompt = ChatPromptTemplate.from_template(self.PROMPT_TEMPLATE)
+        self._generation = RunnableLambda(self._build_prompt) | self._llm | StrOutputParser()
+        self._packer = ContextPacker(settings.context_token_budget, settings.chunk_overlap)
+        self._chains: Dict[FilterKey, Runnable] = {}
+        self._max_concurrency = settings.llm_max_concurrency
+        start_trace_exporter(settings.trace_flush_interval_seconds)
 
     @observe(name="rag_chain")
     def invoke(self, question: str, metadata: Optional[Dict[str, str]] = None) -> str:
         langfuse = get_client()
         langfuse.update_current_trace(tags=["chain"])
-        retriever = self._searcher.as_retriever(metadata=metadata)
-        chain = (
-            {"context": retriever | self._format_documents, "question": RunnablePassthrough()}
-            | self._prompt
-            | self._llm
-            | StrOutputParser()
-        )
-        result = chain.invoke(question, config={"callbacks": [CallbackHandler()]})
-        langfuse.flush()
+        with METRICS.request() as timings:
+            result = self._answer(question, metadata)
+        langfuse.update_current_trace(metadata={"stages_ms": timings})
+        return result
+
+    @observe(name="rag_chain_batch")
+    def batch(self, questions: List[str], metadata: Optional[Dict[str, str]] = None) -> List[str]:
+        langfuse = get_client()
+        langfuse.update_current_trace(tags=["chain", "batch"])
+        with METRICS.request() as timings:
+            result = self._batch_answers(questions, metadata)
+        langfuse.update_current_trace(metadata={"stages_ms": timings, "questions": len(questions)})
         return result
 
+    @observe(name="rag_chain_batch")
+    async def abatch(self, questions: List[str], metadata: Optional[Dict[str, str]] = None) -> List[str]:
+        langfuse = get_client()
+        langfuse.update_current_trace(tags=["chain", "batch"])
+        with METRICS.request() as timings:
+            result = await self._abatch_answers(questions, metadata)
+        langfuse.update_current_trace(metadata={"stages_ms": timings, "questions": len(questions)})
+        return result
+
+    @observe(name="rag_chain_stream", transform_to_string=StreamEvent.answer)
+    def stream(self, question: str, metadata: Optional[Dict[str, str]] = None) -> Iterator[StreamEvent]:
+        langfuse = get_client()
+        langfuse.update_current_trace(tags=["chain", "stream"])
+        with METRICS.request() as timings:
+            yield from self._stream_answer(question, metadata)
+        langfuse.update_current_trace(metadata={"stages_ms": timings})
+
+    @observe(name="rag_chain_stream", transform_to_string=StreamEvent.answer)
+    async def astream(self, question: str, metadata: Optional[Dict[str, str]] = None) -> AsyncIterator[StreamEvent]:
+        langfuse = get_client()
+        langfuse.update_current_trace(tags=["chain", "stream"])
+        with METRICS.request() as timings:
+            async for event in self._astream_answer(question, metadata):
+                yield event
+        langfuse.update_current_trace(metadata={"stages_ms": timings})
+
+    def _stream_answer(self, question: str, metadata: Optional[Dict[str, str]]) -> Iterator[StreamEvent]:
+        if self._answer_cache is None:
+            return self._generated_stream(question, metadata)
+        return self._cached_stream(question, metadata)
+
+    def _cached_stream(self, question: str, metadata: Optional[Dict[str, str]]) -> Iterator[StreamEvent]:
+        cached = self._answer_cache.get_exact(question, metadata)
+        if cached is not None:
+            yield from self._replayed_stream(question, metadata, cached)
+            return
+        vector = self._searcher.embed_query(question)
+        cached = self._answer_cache.get_similar(vector, metadata)
+        if cached is not None:
+            yield from self._replayed_stream(question, metadata, cached, vector)
+            return
+        events: List[StreamEvent] = []
+        for event in self._generated_stream(question, metadata, vector):
+            events.append(event)
+            yield event
+        self._answer_cache.put(question, vector, StreamEvent.answer(events), metadata)
+
+    def _replayed_stream(
+        self,
+        question: str,
+        metadata: Optional[Dict[str, str]],
+        answer: str,
+        dense_vector: Optional[List[float]] = None,
+    ) -> Iterator[StreamEvent]:
+        yield StreamEvent.retrieval(self._retrieve(question, metadata, dense_vector=dense_vector))
+        yield StreamEvent.token(answer)
+
+    def _generated_stream(
+        self,
+        question: str,
+        metadata: Optional[Dict[str, str]],
+        dense_vector: Optional[List[float]] = None,
+    ) -> Iterator[StreamEvent]:
+        results = self._retrieve(question, metadata, dense_vector=dense_vector)
+        yield StreamEvent.retrieval(results)
+        inputs = self._generation_input(question, results)
+        for token in self._generation.stream(inputs, config=self._config()):
+            yield StreamEvent.token(token)
+
+    def _astream_answer(self, question: str, metadata: Optional[Dict[str, str]]) -> AsyncIterator[StreamEvent]:
+        if self._answer_cache is None:
+            return self._agenerated_stream(question, metadata)
+        return self._acached_stream(question, metadata)
+
+    async def _acached_stream(self, question: str, metadata: Optional[Dict[str, str]]) -> AsyncIterator[StreamEvent]:
+        cached = self._answer_cache.get_exact(question, metadata)
+        if cached is not None:
+            async for event in self._areplayed_stream(question, metadata, cached):
+                yield event
+            return
+        vector = (await self._searcher.aembed_queries([question]))[0]
+        cached = self._answer_cache.get_similar(vector, metadata)
+        if cached is not None:
+            async for event in self._areplayed_stream(question, metadata, cached, vector):
+                yield event
+            return
+        events: List[StreamEvent] = []
+        async for event in self._agenerated_stream(question, metadata, vector):
+            events.append(event)
+            yield event
+        self._answer_cache.put(question, vector, StreamEvent.answer(events), metadata)
+
+    async def _areplayed_stream(
+        self,
+        question: str,
+        metadata: Optional[Dict[str, str]],
+        answer: str,
+        dense_vector: Optional[List[float]] = None,
+    ) -> AsyncIterator[StreamEvent]:
+        yield StreamEvent.retrieval(await self._aretrieve(question, metadata, dense_vector))
+        yield StreamEvent.token(answer)
+
+    async def _agenerated_stream(
+        self,
+        question: str,
+        metadata: Optional[Dict[str, str]],
+        dense_vector: Optional[List[float]] = None,
+    ) -> AsyncIterator[StreamEvent]:
+        results = await self._aretrieve(question, metadata, dense_vector)
+        yield StreamEvent.retrieval(results)
+        inputs = self._generation_input(question, results)
+        async for token in self._generation.astream(inputs, config=self._config()):
+            yield StreamEvent.token(token)
+
+    def _answer(self, question: str, metadata: Optional[Dict[str, str]]) -> str:
+        if self._answer_cache is None:
+            return self._chain_for(metadata).invoke(question, config=self._config())
+        return self._cached_answer(question, metadata)
+
+    def _cached_answer(self, question: str, metadata: Optional[Dict[str, str]]) -> str:
+        cached = self._answer_cache.get_exact(question, metadata)
+        if cached is not None:
+            return cached
+        vector = self._searcher.embed_query(question)
+        cached = self._answer_cache.get_similar(vector, metadata)
+        if cached is not None:
+            return cached
+        results = self._retrieve(question, metadata, dense_vector=vector)
+        answer = self._generation.invoke(self._generation_input(question, results), config=self._config())
+        self._answer_cache.put(question, vector, answer, metadata)
+        return answer
+
+    def _retrieve(
+        self,
+        question: str,
+        metadata: Optional[Dict[str, str]],
+        dense_vector: Optional[List[float]] = None,
+    ) -> SearchResults:
+        if self._query_expander is None:
+            return self._searcher.search_with_scores(question, metadata, dense_vector=dense_vector)
+        return self._searcher.multi_search(self._query_expander.expand(question), metadata)
+
+    async def _aretrieve(
+        self,
+        question: str,
+        metadata: Optional[Dict[str, str]],
+        dense_vector: Optional[List[float]] = None,
+    ) -> SearchResults:
+        if self._query_expander is None:
+            return await self._searcher.asearch_with_scores(question, metadata, dense_vector=dense_vector)
+        retrieve_call = functools.partial(contextvars.copy_context().run, self._retrieve, question, metadata)
+        return await asyncio.get_running_loop().run_in_executor(None, retrieve_call)
+
+    def _batch_retrieve(
+        self,
+        questions: List[str],
+        metadata: Optional[Dict[str, str]],
+        dense_vectors: Optional[List[List[float]]] = None,
+    ) -> List[SearchResults]:
+        if self._query_expander is None:
+            return self._searcher.batch_search(questions, metadata, dense_vectors=dense_vectors)
+        return [
+            self._searcher.multi_search(queries, metadata)
+            for queries in self._query_expander.expand_many(questions)
+        ]
+
+    async def _abatch_retrieve(
+        self,
+        questions: List[str],
+        metadata: Optional[Dict[str, str]],
+        dense_vectors: Optional[List[List[float]]] = None,
+    ) -> List[SearchResults]:
+        if self._query_expander is None:
+            return await self._searcher.abatch_search(questions, metadata, dense_vectors=dense_vectors)
+        retrieve_call = functools.partial(contextvars.copy_context().run, self._batch_retrieve, questions, metadata)
+        return await asyncio.get_running_loop().run_in_executor(None, retrieve_call)
+
+    def _batch_answers(self, questions: List[str], metadata: Optional[Dict[str, str]]) -> List[str]:
+        if self._answer_cache is None:
+            return self._generate_batch(questions, metadata)
+        answers, misses = self._exact_answers(questions, metadata)
+        if not misses:
+            return answers
+        vectors = self._searcher.embed_queries([questions[index] for index in misses])
+        misses = self._similar_answers(answers, dict(zip(misses, vectors)), metadata)
+        generated = self._generate_batch(
+            [questions[index] for index, _ in misses],
+            metadata,
+            [vector for _, vector in misses],
+        )
+        return self._cache_generated(questions, answers, misses, generated, metadata)
+
+    async def _abatch_answers(self, questions: List[str], metadata: Optional[Dict[str, str]]) -> List[str]:
+        if self._answer_cache is None:
+            return await self._agenerate_batch(questions, metadata)
+        answers, misses = self._exact_answers(questions, metadata)
+        if not misses:
+            return answers
+        vectors = await self._searcher.aembed_queries([questions[index] for index in misses])
+        misses = self._similar_answers(answers, dict(zip(misses, vectors)), metadata)
+        generated = await self._agenerate_batch(
+            [questions[index] for index, _ in misses],
+            metadata,
+            [vector for _, vector in misses],
+        )
+        return self._cache_generated(questions, answers, misses, generated, metadata)
+
+    def _exact_answers(
+        self,
+        questions: List[str],
+        metadata: Optional[Dict[str, str]],
+    ) -> Tuple[List[Optional[str]], List[int]]:
+        answers = [self._answer_cache.get_exact(question, metadata) for question in questions]
+        return answers, [index for index, answer in enumerate(answers) if answer is None]
+
+    def _similar_answers(
+        self,
+        answers: List[Optional[str]],
+        vectors: Dict[int, List[float]],
+        metadata: Optional[Dict[str, str]],
+    ) -> List[Miss]:
+        for index, vector in vectors.items():
+            answers[index] = self._answer_cache.get_similar(vector, metadata)
+        return [(index, vector) for index, vector in vectors.items() if answers[index] is None]
+
+    def _cache_generated(
+        self,
+        questions: List[str],
+        answers: List[Optional[str]],
+        misses: List[Miss],
+        generated: List[str],
+        metadata: Optional[Dict[str, str]],
+    ) -> List[str]:
+        for (index, vector), answer in zip(misses, generated):
+            answers[index] = answer
+            self._answer_cache.put(questions[index], vector, answer, metadata)
+        return answers
+
+    def _generate_batch(
+        self,
+        questions: List[str],
+        metadata: Optional[Dict[str, str]],
+        dense_vectors: Optional[List[List[float]]] = None,
+    ) -> List[str]:
+        if not questions:
+            return []
+        contexts = self._batch_retrieve(questions, metadata, dense_vectors)
+        return self._generation.batch(self._generation_inputs(questions, contexts), config=self._config())
+
+    async def _agenerate_batch(
+        self,
+        questions: List[str],
+        metadata: Optional[Dict[str, str]],
+        dense_vectors: Optional[List[List[float]]] = None,
+    ) -> List[str]:
+        if not questions:
+            return []
+        contexts = await self._abatch_retrieve(questions, metadata, dense_vectors)
+        return await self._generation.abatch(self._generation_inputs(questions, contexts), config=self._config())
+
+    def _chain_for(self, metadata: Optional[Dict[str, str]]) -> Runnable:
+        key = self._filter_key(metadata)
+        chain = self._chains.get(key)
+        if chain is not None:
+            return chain
+        retrieve = RunnableLambda(functools.partial(self._retrieve, metadata=metadata))
+        context = retrieve.with_config(run_name="hybrid_search") | self._packer.pack
+        chain = {"context": context, "question": RunnablePassthrough()} | self._generation
+        return self._chains.setdefault(key, chain)
+
+    def _config(self) -> RunnableConfig:
+        return {
+            "callbacks": [CallbackHandler(), LLMTimingCallback()],
+            "max_concurrency": self._max_concurrency,
+        }
+
+    def _generation_inputs(self, questions: List[str], contexts: List[SearchResults]) -> List[Dict[str, str]]:
+        return [self._generation_input(question, results) for question, results in zip(questions, contexts)]
+
+    def _generation_input(self, question: str, results: SearchResults) -> Dict[str, str]:
+        return {"context": self._packer.pack(results), "question": question}
+
+    def _build_prompt(self, inputs: Dict[str, str]) -> PromptValue:
+        with METRICS.time("generation.prompt_build"):
+            return self._prompt.invoke(inputs)
+
     @staticmethod
-    def _format_documents(documents):
-        return "\n\n".join(document.page_content for document in documents)
+    def _filter_key(metadata: Optional[Dict[str, str]]) -> FilterKey:
+        return tuple(sorted((metadata or {}).items()))
+
@@ -0,0 +1,64 @@
+import json
+import re
+import time
+from typing import Dict, List, Optional, Union
+
+from src.config.settings import Settings
+from src.generation.answer_store import InMemoryAnswerStore, SqliteAnswerStore
+from src.observability.latency_metrics import METRICS
+
+AnswerStore = Union[InMemoryAnswerStore, SqliteAnswerStore]
+
+
+class SemanticAnswerCache:
+    TRAILING_PUNCTUATION = "?!. "
+    WHITESPACE = re.compile(r"\s+")
+
+    def __init__(self, store: AnswerStore, collection_name: str, similarity_threshold: float, ttl_seconds: float):
+        self._store = store
+        self._collection_name = collection_name
+        self._similarity_threshold = similarity_threshold
+        self._ttl_seconds = ttl_seconds
+
+    @classmethod
+    def from_settings(cls, settings: Settings) -> Optional["SemanticAnswerCache"]:
+        if not settings.answer_cache_backend:
+            return None
+        return cls(
+            store=cls._store_from_settings(settings),
+            collection_name=settings.collection_name,
+            similarity_threshold=settings.answer_cache_similarity,
+            ttl_seconds=settings.answer_cache_ttl_seconds,
+        )
+
+    def get_exact(self, question: str, metadata: Optional[Dict[str, str]] = None) -> Optional[str]:
+        with METRICS.time("cache.exact_lookup"):
+            return self._store.get(self._scope(metadata), self.normalize(question), self._min_created())
+
+    def get_similar(self, vector: List[float], metadata: Optional[Dict[str, str]] = None) -> Optional[str]:
+        with METRICS.time("cache.similar_lookup"):
+            return self._store.similar(self._scope(metadata), vector, self._min_created(), self._similarity_threshold)
+
+    def put(self, question: str, vector: List[float], answer: str, metadata: Optional[Dict[str, str]] = None) -> None:
+        self._store.put(self._scope(metadata), self.normalize(question), vector, answer)
+
+    def invalidate(self) -> None:
+        self._store.clear()
+
+    @classmethod
+    def normalize(cls, question: str) -> str:
+        return cls.WHITESPACE.sub(" ", question.lower()).strip(cls.TRAILING_PUNCTUATION)
+
+    def _scope(self, metadata: Optional[Dict[str, str]]) -> str:
+        return json.dumps([self._collection_name, sorted((metadata or {}).items())])
+
+    def _min_created(self) -> float:
+        return time.time() - self._ttl_seconds
+
+    @staticmethod
+    def _store_from_settings(settings: Settings) -> AnswerStore:
+        if settings.answer_cache_backend == "memory":
+            return InMemoryAnswerStore(max_entries=settings.answer_cache_max_entries)
+        if settings.answer_cache_backend == "sqlite":
+            return SqliteAnswerStore(path=settings.answer_cache_path, max_entries=settings.answer_cache_max_entries)
+        raise ValueError(f"Unknown answer cache backend '{settings.answer_cache_backend}'.")
@@ -0,0 +1,37 @@
+from typing import Any, Dict, Iterable
+
+from src.search.search_result import SearchResults
+
+
+class StreamEvent:
+    RETRIEVAL = "retrieval"
+    TOKEN = "token"
+    TOOL_START = "tool_start"
+    TOOL_END = "tool_end"
+
+    def __init__(self, kind: str, data: Any):
+        self.kind = kind
+        self.data = data
+
+    @classmethod
+    def retrieval(cls, results: SearchResults) -> "StreamEvent":
+        return cls(cls.RETRIEVAL, results)
+
+    @classmethod
+    def token(cls, text: str) -> "StreamEvent":
+        return cls(cls.TOKEN, text)
+
+    @classmethod
+    def tool_start(cls, name: str, arguments: Dict[str, Any]) -> "StreamEvent":
+        return cls(cls.TOOL_START, {"name": name, "arguments": arguments})
+
+    @classmethod
+    def tool_end(cls, name: str, output: str) -> "StreamEvent":
+        return cls(cls.TOOL_END, {"name": name, "output": output})
+
+    @staticmethod
+    def answer(events: Iterable["StreamEvent"]) -> str:
+        return "".join(event.data for event in events if event.kind == StreamEvent.TOKEN)
+
+    def __repr__(self) -> str:
+        return f"StreamEvent(kind={self.kind}, data={self.data!r})"
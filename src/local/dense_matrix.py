@@ -0,0 +1,18 @@
+import numpy as np
+
+
+class DenseMatrix:
+    def __init__(self, vectors: np.ndarray):
+        self.vectors = vectors
+
+    @staticmethod
+    def normalize(rows: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(rows, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return np.ascontiguousarray(rows / norms, dtype=np.float32)
+
+    def scores(self, query: np.ndarray) -> np.ndarray:
+        norm = np.linalg.norm(query)
+        if norm == 0 or len(self.vectors) == 0:
+            return np.full(len(self.vectors), -np.inf, dtype=np.float32)
+        return self.vectors @ (query.astype(np.float32) / norm)
@@ -0,0 +1,66 @@
+import numpy as np
+
+
+class InvertedIndex:
+    def __init__(self, terms: np.ndarray, offsets: np.ndarray, documents: np.ndarray, weights: np.ndarray, size: int):
+        self.terms = terms
+        self.offsets = offsets
+        self.documents = documents
+        self.weights = weights
+        self._size = size
+
+    @classmethod
+    def from_rows(cls, row_offsets: np.ndarray, row_terms: np.ndarray, row_weights: np.ndarray) -> "InvertedIndex":
+        size = len(row_offsets) - 1
+        rows = np.repeat(np.arange(size, dtype=np.uint32), np.diff(row_offsets))
+        order = np.argsort(row_terms, kind="stable")
+        return cls.from_postings(row_terms[order], rows[order], row_weights[order].astype(np.float32), size)
+
+    @classmethod
+    def from_postings(
+        cls,
+        posting_terms: np.ndarray,
+        documents: np.ndarray,
+        weights: np.ndarray,
+        size: int,
+    ) -> "InvertedIndex":
+        starts = np.flatnonzero(np.diff(posting_terms)) + 1
+        if len(posting_terms):
+            starts = np.concatenate([[0], starts])
+        offsets = np.append(starts, len(posting_terms)).astype(np.int64)
+        return cls(posting_terms[starts], offsets, documents, weights, size)
+
+    def appended(self, other: "InvertedIndex") -> "InvertedIndex":
+        own_terms = self._posting_terms()
+        other_terms = other._posting_terms()
+        positions = np.searchsorted(own_terms, other_terms, side="right")
+        return self.from_postings(
+            np.insert(own_terms, positions, other_terms),
+            np.insert(self.documents, positions, (other.documents + self._size).astype(np.uint32)),
+            np.insert(self.weights, positions, other.weights),
+            self._size + other._size,
+        )
+
+    def kept(self, keep: np.ndarray) -> "InvertedIndex":
+        retained = keep[self.documents]
+        renumbered = (np.cumsum(keep) - 1).astype(np.uint32)
+        return self.from_postings(
+            self._posting_terms()[retained],
+            renumbered[self.documents[retained]],
+            self.weights[retained],
+            int(keep.sum()),
+        )
+
+    def scores(self, indices: np.ndarray, weights: np.ndarray) -> np.ndarray:
+        scores = np.zeros(self._size, dtype=np.float32)
+        positions = np.searchsorted(self.terms, indices)
+        for position, term, weight in zip(positions, indices, weights):
+            if position >= len(self.terms) or self.terms[position] != term:
+                continue
+            start, end = self.offsets[position], self.offsets[position + 1]
+            scores[self.documents[start:end]] += self.weights[start:end] * weight
+        scores[scores == 0] = -np.inf
+        return scores
+
+    def _posting_terms(self) -> np.ndarray:
+        return np.repeat(self.terms, np.diff(self.offsets))
@@ -0,0 +1,57 @@
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+BitmapKey = Tuple[str, str]
+
+
+class KeywordBitmaps:
+    def __init__(self, keys: List[BitmapKey], packed: np.ndarray, size: int):
+        self.keys = keys
+        self.packed = packed
+        self._positions = {key: position for position, key in enumerate(keys)}
+        self._size = size
+
+    @classmethod
+    def from_payloads(cls, payloads: List[dict], fields: List[str]) -> "KeywordBitmaps":
+        masks: Dict[BitmapKey, np.ndarray] = {}
+        for row, payload in enumerate(payloads):
+            metadata = payload.get("metadata") or {}
+            for field in fields:
+                if field not in metadata:
+                    continue
+                key = (field, metadata[field])
+                masks.setdefault(key, np.zeros(len(payloads), dtype=bool))[row] = True
+        keys = list(masks)
+        packed = np.zeros((len(keys), (len(payloads) + 7) // 8), dtype=np.uint8)
+        for position, key in enumerate(keys):
+            packed[position] = np.packbits(masks[key])
+        return cls(keys, packed, len(payloads))
+
+    def appended(self, other: "KeywordBitmaps") -> "KeywordBitmaps":
+        keys = self.keys + [key for key in other.keys if key not in self._positions]
+        positions = {key: position for position, key in enumerate(keys)}
+        bits = np.zeros((len(keys), self._size + other._size), dtype=bool)
+        bits[: len(self.keys), : self._size] = self._unpacked()
+        bits[[positions[key] for key in other.keys], self._size :] = other._unpacked()
+        return KeywordBitmaps(keys, np.packbits(bits, axis=1), self._size + other._size)
+
+    def kept(self, keep: np.ndarray) -> "KeywordBitmaps":
+        return KeywordBitmaps(self.keys, np.packbits(self._unpacked()[:, keep], axis=1), int(keep.sum()))
+
+    def mask(self, metadata: Dict[str, str]) -> Optional[np.ndarray]:
+        if not metadata:
+            return None
+        mask = np.ones(self._size, dtype=bool)
+        for field, value in metadata.items():
+            mask &= self._bitmap(field, value)
+        return mask
+
+    def _bitmap(self, field: str, value: str) -> np.ndarray:
+        position = self._positions.get((field, value))
+        if position is None:
+            return np.zeros(self._size, dtype=bool)
+        return np.unpackbits(self.packed[position], count=self._size).astype(bool)
+
+    def _unpacked(self) -> np.ndarray:
+        return np.unpackbits(self.packed, axis=1, count=self._size).astype(bool)
@@ -0,0 +1,206 @@
+import json
+import os
+from threading import Lock
+from typing import Dict, List, Optional
+
+import numpy as np
+from qdrant_client.http import models
+
+from src.config.settings import Settings
+from src.local.dense_matrix import DenseMatrix
+from src.local.inverted_index import InvertedIndex
+from src.local.keyword_bitmaps import KeywordBitmaps
+from src.local.top_k import top_k
+from src.search.search_result import PointId
+
+
+class LocalHybridIndex:
+    BITMAP_FIELDS = ["header_1", "header_2", "header_3"]
+    MANIFEST_FILE = "manifest.json"
+    ARRAY_FILES = [
+        "dense",
+        "row_offsets",
+        "row_terms",
+        "row_weights",
+        "terms",
+        "term_offsets",
+        "postings",
+        "posting_weights",
+        "bitmaps",
+    ]
+
+    def __init__(self, settings: Settings, dimension: int):
+        self._settings = settings
+        self._dimension = dimension
+        self._lock = Lock()
+        self._ids: List[PointId] = []
+        self._payloads: List[dict] = []
+        self._dense_rows = np.zeros((0, dimension), dtype=np.float32)
+        self._row_offsets = np.zeros(1, dtype=np.int64)
+        self._row_terms = np.zeros(0, dtype=np.uint32)
+        self._row_weights = np.zeros(0, dtype=np.float32)
+        self._pending: Dict[PointId, models.PointStruct] = {}
+        self._compile()
+
+    def upsert(self, collection_name: str, points: List[models.PointStruct], wait: bool = True) -> None:
+        with self._lock:
+            self._pending.update({point.id: point for point in points})
+
+    def count(self) -> int:
+        with self._lock:
+            self._flush_pending()
+            return len(self._ids)
+
+    def query(
+        self,
+        dense_vector: List[float],
+        sparse_vector: models.SparseVector,
+        metadata: Optional[Dict[str, str]],
+    ) -> List[List[models.ScoredPoint]]:
+        with self._lock:
+            self._flush_pending()
+            mask = self._bitmaps.mask(metadata or {})
+            dense_scores = self._dense.scores(np.asarray(dense_vector, dtype=np.float32))
+            sparse_scores = self._sparse.scores(
+                np.asarray(sparse_vector.indices, dtype=np.uint32),
+                np.asarray(sparse_vector.values, dtype=np.float32),
+            )
+            return [
+                self._ranked(dense_scores, mask, self._settings.dense_prefetch_limit),
+                self._ranked(sparse_scores, mask, self._settings.sparse_prefetch_limit),
+            ]
+
+    def save(self, directory: str) -> None:
+        with self._lock:
+            self._flush_pending()
+            os.makedirs(directory, exist_ok=True)
+            for name, array in self._arrays().items():
+                self._write(os.path.join(directory, f"{name}.npy"), lambda file, data=array: np.save(file, data), "wb")
+            manifest = {
+                "dimension": self._dimension,
+                "ids": self._ids,
+                "payloads": self._payloads,
+                "bitmap_keys": self._bitmaps.keys,
+            }
+            self._write(os.path.join(directory, self.MANIFEST_FILE), lambda file: json.dump(manifest, file), "w")
+
+    @staticmethod
+    def _write(path: str, dump, mode: str) -> None:
+        temporary_path = path + ".tmp"
+        with open(temporary_path, mode) as file:
+            dump(file)
+        os.replace(temporary_path, path)
+
+    @classmethod
+    def load(cls, settings: Settings, directory: str) -> "LocalHybridIndex":
+        with open(os.path.join(directory, cls.MANIFEST_FILE), "r", encoding="utf-8") as file:
+            manifest = json.load(file)
+        arrays = {name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r") for name in cls.ARRAY_FILES}
+        index = cls.__new__(cls)
+        index._settings = settings
+        index._dimension = manifest["dimension"]
+        index._lock = Lock()
+        index._ids = manifest["ids"]
+        index._payloads = manifest["payloads"]
+        index._pending = {}
+        index._restore(arrays, [tuple(key) for key in manifest["bitmap_keys"]])
+        return index
+
+    def _restore(self, arrays: Dict[str, np.ndarray], bitmap_keys: list) -> None:
+        self._dense_rows = arrays["dense"]
+        self._row_offsets = arrays["row_offsets"]
+        self._row_terms = arrays["row_terms"]
+        self._row_weights = arrays["row_weights"]
+        self._positions = {point_id: row for row, point_id in enumerate(self._ids)}
+        self._dense = DenseMatrix(arrays["dense"])
+        self._sparse = InvertedIndex(
+            arrays["terms"],
+            arrays["term_offsets"],
+            arrays["postings"],
+            arrays["posting_weights"],
+            len(self._ids),
+        )
+        self._bitmaps = KeywordBitmaps(bitmap_keys, arrays["bitmaps"], len(self._ids))
+
+    def _arrays(self) -> Dict[str, np.ndarray]:
+        return {
+            "dense": self._dense.vectors,
+            "row_offsets": self._row_offsets,
+            "row_terms": self._row_terms,
+            "row_weights": self._row_weights,
+            "terms": self._sparse.terms,
+            "term_offsets": self._sparse.offsets,
+            "postings": self._sparse.documents,
+            "posting_weights": self._sparse.weights,
+            "bitmaps": self._bitmaps.packed,
+        }
+
+    def _flush_pending(self) -> None:
+        if not self._pending:
+            return
+        replaced = [row for row in map(self._position, self._pending) if row is not None]
+        if replaced:
+            keep = np.ones(len(self._ids), dtype=bool)
+            keep[replaced] = False
+            self._keep_rows(keep)
+        first_row = len(self._ids)
+        self._append(list(self._pending.values()))
+        self._pending = {}
+        self._compile_from(first_row)
+
+    def _keep_rows(self, keep: np.ndarray) -> None:
+        lengths = np.diff(self._row_offsets)
+        kept_entries = np.repeat(keep, lengths)
+        self._ids = [point_id for point_id, kept in zip(self._ids, keep) if kept]
+        self._payloads = [payload for payload, kept in zip(self._payloads, keep) if kept]
+        self._dense_rows = np.asarray(self._dense_rows)[keep]
+        self._row_offsets = np.concatenate([[0], np.cumsum(lengths[keep])]).astype(np.int64)
+        self._row_terms = np.asarray(self._row_terms)[kept_entries]
+        self._row_weights = np.asarray(self._row_weights)[kept_entries]
+        self._positions = {point_id: row for row, point_id in enumerate(self._ids)}
+        self._sparse = self._sparse.kept(keep)
+        self._bitmaps = self._bitmaps.kept(keep)
+
+    def _append(self, points: List[models.PointStruct]) -> None:
+        sparse_vectors = [point.vector[self._settings.sparse_field] for point in points]
+        lengths = [len(vector.indices) for vector in sparse_vectors]
+        dense_rows = np.asarray([point.vector[self._settings.dense_field] for point in points], dtype=np.float32)
+        self._ids.extend(point.id for point in points)
+        self._payloads.extend(point.payload for point in points)
+        normalized = DenseMatrix.normalize(dense_rows.reshape(-1, self._dimension))
+        self._dense_rows = np.vstack([self._dense_rows, normalized])
+        self._row_offsets = np.concatenate([self._row_offsets, self._row_offsets[-1] + np.cumsum(lengths)])
+        new_terms = [np.asarray(vector.indices, dtype=np.uint32) for vector in sparse_vectors]
+        new_weights = [np.asarray(vector.values, dtype=np.float32) for vector in sparse_vectors]
+        self._row_terms = np.concatenate([self._row_terms, *new_terms])
+        self._row_weights = np.concatenate([self._row_weights, *new_weights])
+
+    def _compile(self) -> None:
+        self._positions = {point_id: row for row, point_id in enumerate(self._ids)}
+        self._dense = DenseMatrix(self._dense_rows)
+        self._sparse = InvertedIndex.from_rows(self._row_offsets, self._row_terms, self._row_weights)
+        self._bitmaps = KeywordBitmaps.from_payloads(self._payloads, self.BITMAP_FIELDS)
+
+    def _compile_from(self, first_row: int) -> None:
+        self._positions.update((self._ids[row], row) for row in range(first_row, len(self._ids)))
+        self._dense = DenseMatrix(self._dense_rows)
+        first_entry = self._row_offsets[first_row]
+        added = InvertedIndex.from_rows(
+            self._row_offsets[first_row:] - first_entry,
+            self._row_terms[first_entry:],
+            self._row_weights[first_entry:],
+        )
+        self._sparse = self._sparse.appended(added)
+        self._bitmaps = self._bitmaps.appended(
+            KeywordBitmaps.from_payloads(self._payloads[first_row:], self.BITMAP_FIELDS)
+        )
+
+    def _position(self, point_id: PointId) -> Optional[int]:
+        return self._positions.get(point_id)
+
+    def _ranked(self, scores: np.ndarray, mask: Optional[np.ndarray], limit: int) -> List[models.ScoredPoint]:
+        rows = top_k(scores, mask, limit)
+        return [
+            models.ScoredPoint(id=self._ids[row], version=0, score=float(scores[row]), payload=self._payloads[row])
+            for row in rows
+        ]
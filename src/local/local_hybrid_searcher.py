@@ -0,0 +1,128 @@
+import asyncio
+from typing import Dict, List, Optional
+
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from qdrant_client.http import models
+
+from src.config.settings import Settings
+from src.embeddings.dense_embedder import DenseEmbedder
+from src.embeddings.sparse_embedder import SparseEmbedder
+from src.local.local_hybrid_index import LocalHybridIndex
+from src.search.hybrid_retriever import HybridRetriever
+from src.search.rank_fusion import QueryFusion, ReciprocalRankFusion
+from src.search.search_result import SearchResult, SearchResults
+
+
+class LocalHybridSearcher:
+    def __init__(
+        self,
+        index: LocalHybridIndex,
+        settings: Settings,
+        dense_embedder: DenseEmbedder,
+        sparse_embedder: SparseEmbedder,
+        limit: int = 3,
+    ):
+        self._index = index
+        self._settings = settings
+        self._dense_embedder = dense_embedder
+        self._sparse_embedder = sparse_embedder
+        self._fusion = QueryFusion(settings.hybrid_fusion)
+        self._rank_fusion = ReciprocalRankFusion(content_field=settings.content_field)
+        self._limit = limit
+
+    def warmup(self) -> None:
+        self._dense_embedder.warmup()
+        self._sparse_embedder.warmup()
+
+    def as_retriever(self, metadata: Optional[Dict[str, str]] = None) -> BaseRetriever:
+        return HybridRetriever(searcher=self, metadata_filter=metadata)
+
+    def as_async_retriever(self, metadata: Optional[Dict[str, str]] = None) -> BaseRetriever:
+        return self.as_retriever(metadata)
+
+    def search(self, query: str, metadata: Optional[Dict[str, str]] = None) -> List[Document]:
+        return [self._to_document(result) for result in self.search_with_scores(query, metadata)]
+
+    async def asearch(self, query: str, metadata: Optional[Dict[str, str]] = None) -> List[Document]:
+        return await asyncio.get_running_loop().run_in_executor(None, self.search, query, metadata)
+
+    def search_with_scores(
+        self,
+        query: str,
+        metadata: Optional[Dict[str, str]] = None,
+        dense_vector: Optional[List[float]] = None,
+    ) -> SearchResults:
+        if dense_vector is None:
+            dense_vector = self.embed_query(query)
+        return self._results(self._query_points(dense_vector, self._sparse_embedder.embed(query), metadata))
+
+    def embed_query(self, query: str) -> List[float]:
+        return self._dense_embedder.embed(query)
+
+    def embed_queries(self, queries: List[str]) -> List[List[float]]:
+        return self._dense_embedder.embed_many(queries)
+
+    async def aembed_queries(self, queries: List[str]) -> List[List[float]]:
+        return await asyncio.get_running_loop().run_in_executor(None, self.embed_queries, queries)
+
+    async def asearch_with_scores(
+        self,
+        query: str,
+        metadata: Optional[Dict[str, str]] = None,
+        dense_vector: Optional[List[float]] = None,
+    ) -> SearchResults:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.search_with_scores, query, metadata, dense_vector)
+
+    def multi_search(self, queries: List[str], metadata: Optional[Dict[str, str]] = None) -> SearchResults:
+        fused = self._rank_fusion.fuse(self._batch_query_points(queries, metadata))
+        return fused.top(self._limit)
+
+    def batch_search(
+        self,
+        queries: List[str],
+        metadata: Optional[Dict[str, str]] = None,
+        dense_vectors: Optional[List[List[float]]] = None,
+    ) -> List[SearchResults]:
+        return [self._results(points) for points in self._batch_query_points(queries, metadata, dense_vectors)]
+
+    async def abatch_search(
+        self,
+        queries: List[str],
+        metadata: Optional[Dict[str, str]] = None,
+        dense_vectors: Optional[List[List[float]]] = None,
+    ) -> List[SearchResults]:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.batch_search, queries, metadata, dense_vectors)
+
+    def _batch_query_points(
+        self,
+        queries: List[str],
+        metadata: Optional[Dict[str, str]],
+        dense_vectors: Optional[List[List[float]]] = None,
+    ) -> List[List[models.ScoredPoint]]:
+        if dense_vectors is None:
+            dense_vectors = self.embed_queries(queries)
+        sparse_vectors = self._sparse_embedder.embed_queries(queries)
+        return [
+            self._query_points(dense_vector, sparse_vector, metadata)
+            for dense_vector, sparse_vector in zip(dense_vectors, sparse_vectors)
+        ]
+
+    def _query_points(
+        self,
+        dense_vector: List[float],
+        sparse_vector: models.SparseVector,
+        metadata: Optional[Dict[str, str]],
+    ) -> List[models.ScoredPoint]:
+        return self._fusion.points(self._index.query(dense_vector, sparse_vector, metadata), self._limit)
+
+    def _results(self, points: List[models.ScoredPoint]) -> SearchResults:
+        return SearchResults([SearchResult.from_point(point, self._settings.content_field) for point in points])
+
+    def _to_document(self, result: SearchResult) -> Document:
+        metadata = dict(result.metadata)
+        metadata["_id"] = result.point_id
+        return Document(page_content=result.content, metadata=metadata)
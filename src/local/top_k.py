@@ -0,0 +1,13 @@
+from typing import Optional
+
+import numpy as np
+
+
+def top_k(scores: np.ndarray, mask: Optional[np.ndarray], k: int) -> np.ndarray:
+    if mask is not None:
+        scores = np.where(mask, scores, -np.inf)
+    candidates = np.flatnonzero(np.isfinite(scores))
+    if len(candidates) > k:
+        partitioned = np.argpartition(-scores[candidates], k - 1)[:k]
+        candidates = candidates[partitioned]
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
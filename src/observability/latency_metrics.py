@@ -0,0 +1,111 @@
+import bisect
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from threading import Lock
+from typing import Dict, Iterator, List, Optional
+
+_REQUEST_TIMINGS: ContextVar[Optional[Dict[str, float]]] = ContextVar("request_timings", default=None)
+
+
+class LatencyHistogram:
+    BUCKETS_MS = [1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, float("inf")]
+
+    def __init__(self):
+        self._counts = [0] * len(self.BUCKETS_MS)
+        self._total = 0.0
+        self._lock = Lock()
+
+    def observe(self, milliseconds: float) -> None:
+        position = bisect.bisect_left(self.BUCKETS_MS, milliseconds)
+        with self._lock:
+            self._counts[position] += 1
+            self._total += milliseconds
+
+    def snapshot(self) -> Dict[str, object]:
+        with self._lock:
+            counts = list(self._counts)
+            total = self._total
+        observations = sum(counts)
+        return {
+            "count": observations,
+            "sum_ms": total,
+            "buckets": dict(zip([str(bound) for bound in self.BUCKETS_MS], counts)),
+            "p50_ms": self._quantile(counts, observations, 0.50),
+            "p95_ms": self._quantile(counts, observations, 0.95),
+            "p99_ms": self._quantile(counts, observations, 0.99),
+        }
+
+    def _quantile(self, counts: List[int], observations: int, quantile: float) -> float:
+        if observations == 0:
+            return 0.0
+        target = quantile * observations
+        cumulative = 0
+        for bound, count in zip(self.BUCKETS_MS, counts):
+            cumulative += count
+            if cumulative >= target:
+                return bound
+        return self.BUCKETS_MS[-1]
+
+
+class LatencyMetrics:
+    def __init__(self):
+        self._histograms: Dict[str, LatencyHistogram] = {}
+        self._lock = Lock()
+
+    @contextmanager
+    def time(self, stage: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, (time.perf_counter() - started) * 1000)
+
+    def observe(self, stage: str, milliseconds: float) -> None:
+        self._histogram(stage).observe(milliseconds)
+        timings = _REQUEST_TIMINGS.get()
+        if timings is None:
+            return
+        timings[stage] = timings.get(stage, 0.0) + milliseconds
+
+    @contextmanager
+    def request(self) -> Iterator[Dict[str, float]]:
+        timings: Dict[str, float] = {}
+        token = _REQUEST_TIMINGS.set(timings)
+        try:
+            yield timings
+        finally:
+            _REQUEST_TIMINGS.reset(token)
+
+    def snapshot(self) -> Dict[str, Dict[str, object]]:
+        with self._lock:
+            histograms = dict(self._histograms)
+        return {stage: histogram.snapshot() for stage, histogram in sorted(histograms.items())}
+
+    def to_prometheus(self, metric_name: str = "rag_stage_latency_ms") -> str:
+        lines = [f"# TYPE {metric_name} histogram"]
+        for stage, snapshot in self.snapshot().items():
+            lines.extend(self._prometheus_lines(metric_name, stage, snapshot))
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _prometheus_lines(metric_name: str, stage: str, snapshot: Dict[str, object]) -> List[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in snapshot["buckets"].items():
+            cumulative += count
+            label = "+Inf" if bound == "inf" else bound
+            lines.append(f'{metric_name}_bucket{{stage="{stage}",le="{label}"}} {cumulative}')
+        lines.append(f'{metric_name}_sum{{stage="{stage}"}} {snapshot["sum_ms"]}')
+        lines.append(f'{metric_name}_count{{stage="{stage}"}} {snapshot["count"]}')
+        return lines
+
+    def _histogram(self, stage: str) -> LatencyHistogram:
+        histogram = self._histograms.get(stage)
+        if histogram is not None:
+            return histogram
+        with self._lock:
+            return self._histograms.setdefault(stage, LatencyHistogram())
+
+
+METRICS = LatencyMetrics()
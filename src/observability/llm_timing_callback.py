@@ -0,0 +1,49 @@
+import time
+from typing import Any, Dict, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from src.observability.latency_metrics import METRICS
+
+
+class LLMTimingCallback(BaseCallbackHandler):
+    def __init__(self):
+        self._started: Dict[UUID, float] = {}
+        self._first_token_seen: Dict[UUID, bool] = {}
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._start(run_id)
+
+    def on_llm_start(self, serialized: Dict[str, Any], prompts: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._start(run_id)
+
+    def on_llm_new_token(self, token: str, *, run_id: UUID, **kwargs: Any) -> None:
+        if self._first_token_seen.get(run_id, True):
+            return
+        self._first_token_seen[run_id] = True
+        METRICS.observe("generation.llm_ttft", self._elapsed(run_id))
+
+    def on_llm_end(self, response: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._finish(run_id)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._finish(run_id)
+
+    def _start(self, run_id: UUID) -> None:
+        self._started[run_id] = time.perf_counter()
+        self._first_token_seen[run_id] = False
+
+    def _finish(self, run_id: UUID) -> None:
+        elapsed = self._elapsed(run_id)
+        self._started.pop(run_id, None)
+        self._first_token_seen.pop(run_id, None)
+        if elapsed is None:
+            return
+        METRICS.observe("generation.llm_total", elapsed)
+
+    def _elapsed(self, run_id: UUID) -> Optional[float]:
+        started = self._started.get(run_id)
+        if started is None:
+            return None
+        return (time.perf_counter() - started) * 1000
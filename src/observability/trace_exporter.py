@@ -0,0 +1,42 @@
+import atexit
+from threading import Event, Lock, Thread
+from typing import Optional
+
+from langfuse import get_client
+
+
+class BackgroundTraceExporter:
+    def __init__(self, interval_seconds: float):
+        self._interval_seconds = interval_seconds
+        self._stopped = Event()
+        self._lock = Lock()
+        self._thread: Optional[Thread] = None
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = Thread(target=self._run, name="trace-exporter", daemon=True)
+            self._thread.start()
+            atexit.register(self.stop)
+
+    def stop(self) -> None:
+        self._stopped.set()
+        get_client().flush()
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self._interval_seconds):
+            get_client().flush()
+
+
+_EXPORTER: Optional[BackgroundTraceExporter] = None
+_EXPORTER_LOCK = Lock()
+
+
+def start_trace_exporter(interval_seconds: float) -> BackgroundTraceExporter:
+    global _EXPORTER
+    with _EXPORTER_LOCK:
+        if _EXPORTER is None:
+            _EXPORTER = BackgroundTraceExporter(interval_seconds)
+        _EXPORTER.start()
+        return _EXPORTER
@@ -1,41 +1,329 @@
-from typing import Any, Dict, List, Optional
-
-from pydantic import SecretStr
+import asyncio
+import contextvars
+import functools
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar
 
 from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
 from langchain_core.retrievers import BaseRetriever
-from langchain_openai import OpenAIEmbeddings
-from langchain_qdrant import QdrantVectorStore, FastEmbedSparse, RetrievalMode
+from qdrant_client import AsyncQdrantClient, QdrantClient
 from qdrant_client.http import models
 
+from src.config.lazy import Lazy
 from src.config.settings import Settings
+from src.embeddings.batching import batched
+from src.embeddings.dense_embedder import openai_embeddings
+from src.embeddings.query_batcher import QueryBatcher
+from src.embeddings.sparse_embedder import SparseEmbedder
+from src.observability.latency_metrics import METRICS
+from src.search.hybrid_retriever import HybridRetriever
+from src.search.rank_fusion import ReciprocalRankFusion
+from src.search.search_result import SearchResult, SearchResults
+from src.search.section_router import Section, SectionRouter
+from src.storage.section_index import SectionIndex
+from src.storage.storage_profile import StorageProfile
+
+T = TypeVar("T")
 
 
 class HybridSearcher:
-    def __init__(self, settings: Settings, limit: int = 3):
-        self._store = QdrantVectorStore.from_existing_collection(
-            embedding=OpenAIEmbeddings(model=settings.model_embeddings, api_key=SecretStr(settings.openai_api_key)),
-            sparse_embedding=FastEmbedSparse(model_name="Qdrant/bm25"),
-            collection_name=settings.collection_name,
-            url=settings.vector_db_url,
-            api_key=settings.vector_db_api_key,
-            retrieval_mode=RetrievalMode.HYBRID,
-            vector_name=settings.dense_field,
-            sparse_vector_name=settings.sparse_field,
-            content_payload_key=settings.content_field,
-            validate_collection_config=False,
+    SEARCH_MODES = ("flat", "hierarchical")
+
+    def __init__(
+        self,
+        settings: Settings,
+        limit: int = 3,
+        client: Optional[QdrantClient] = None,
+        dense_embeddings: Optional[Embeddings] = None,
+        sparse_embedder: Optional[SparseEmbedder] = None,
+        async_client: Optional[AsyncQdrantClient] = None,
+    ):
+        if settings.search_mode not in self.SEARCH_MODES:
+            raise ValueError(f"Unknown search mode '{settings.search_mode}'.")
+        self._settings = settings
+        self._dense_embeddings = Lazy(
+            lambda: dense_embeddings or openai_embeddings(
+                settings.model_embeddings,
+                settings.openai_api_key,
+                settings.query_batch_size,
+            )
         )
+        self._sparse_embedder = sparse_embedder or SparseEmbedder()
+        self._dense_batcher = self._query_batcher(self._embed_dense_queries)
+        self._sparse_batcher = self._query_batcher(self._embed_sparse_queries)
+        self._client = Lazy(lambda: client or settings.qdrant_client())
+        self._async_client = async_client
+        self._runs_sync_client = client is not None and async_client is None
+        self._fusion = ReciprocalRankFusion(content_field=settings.content_field)
+        self._payload_fields = [settings.content_field, "chunk_index", "metadata", "source"]
+        self._search_params = StorageProfile.from_settings(settings).search_params()
+        self._sections = Lazy(lambda: SectionRouter(self._client.get(), settings))
         self._limit = limit
 
+    def warmup(self) -> None:
+        self._sparse_embedder.warmup()
+        self._dense_embeddings.get()
+        self._client.get().collection_exists(self._settings.collection_name)
+
     def as_retriever(self, metadata: Optional[Dict[str, str]] = None) -> BaseRetriever:
-        search_kwargs: Dict[str, Any] = {"k": self._limit}
-        if metadata:
-            search_kwargs["filter"] = self._build_filter(metadata)
-        return self._store.as_retriever(search_kwargs=search_kwargs)
+        return HybridRetriever(searcher=self, metadata_filter=metadata)
+
+    def as_async_retriever(self, metadata: Optional[Dict[str, str]] = None) -> BaseRetriever:
+        return self.as_retriever(metadata)
 
     def search(self, query: str, metadata: Optional[Dict[str, str]] = None) -> List[Document]:
+        return [self._to_document(point) for point in self._query_points(query, metadata)]
+
+    def search_with_scores(
+        self,
+        query: str,
+        metadata: Optional[Dict[str, str]] = None,
+        dense_vector: Optional[List[float]] = None,
+    ) -> SearchResults:
+        return SearchResults([self._to_result(point) for point in self._query_points(query, metadata, dense_vector)])
+
+    def embed_query(self, query: str) -> List[float]:
+        with METRICS.time("query.dense_wait"):
+            return self._dense_batcher.embed(query)
+
+    def embed_queries(self, queries: List[str]) -> List[List[float]]:
+        return self._embed_dense_queries(queries)
+
+    async def aembed_queries(self, queries: List[str]) -> List[List[float]]:
+        with METRICS.time("query.dense_embedding"):
+            return await self._dense_embeddings.get().aembed_documents(queries)
+
+    def multi_search(self, queries: List[str], metadata: Optional[Dict[str, str]] = None) -> SearchResults:
+        fused = self._fusion.fuse(self._batch_query_points(queries, metadata))
+        return fused.top(self._limit)
+
+    def batch_search(
+        self,
+        queries: List[str],
+        metadata: Optional[Dict[str, str]] = None,
+        dense_vectors: Optional[List[List[float]]] = None,
+    ) -> List[SearchResults]:
+        return [
+            SearchResults([self._to_result(point) for point in points])
+            for points in self._batch_query_points(queries, metadata, dense_vectors)
+        ]
+
+    async def abatch_search(
+        self,
+        queries: List[str],
+        metadata: Optional[Dict[str, str]] = None,
+        dense_vectors: Optional[List[List[float]]] = None,
+    ) -> List[SearchResults]:
+        dense_vectors, sparse_vectors = await self._aembed_many(queries, dense_vectors)
+        filters = await self._ascoped_filters(dense_vectors, metadata)
+        responses: List[models.QueryResponse] = []
+        requests = self._hybrid_requests(dense_vectors, sparse_vectors, filters)
+        for request_batch in batched(requests, self._settings.query_batch_size):
+            with METRICS.time("query.qdrant_search"):
+                responses.extend(
+                    await self._acall(
+                        "query_batch_points",
+                        collection_name=self._settings.collection_name,
+                        requests=request_batch,
+                    )
+                )
+        return [SearchResults([self._to_result(point) for point in response.points]) for response in responses]
+
+    async def asearch(self, query: str, metadata: Optional[Dict[str, str]] = None) -> List[Document]:
+        return [self._to_document(point) for point in await self._aquery_points(query, metadata)]
+
+    async def asearch_with_scores(
+        self,
+        query: str,
+        metadata: Optional[Dict[str, str]] = None,
+        dense_vector: Optional[List[float]] = None,
+    ) -> SearchResults:
+        points = await self._aquery_points(query, metadata, dense_vector)
+        return SearchResults([self._to_result(point) for point in points])
+
+    def _query_points(
+        self,
+        query: str,
+        metadata: Optional[Dict[str, str]],
+        dense_vector: Optional[List[float]] = None,
+    ) -> List[models.ScoredPoint]:
+        sparse_future = self._sparse_batcher.submit(query)
+        if dense_vector is None:
+            dense_vector = self.embed_query(query)
+        with METRICS.time("query.sparse_wait"):
+            sparse_vector = sparse_future.result()
+        qdrant_filter = self._scoped_filters([dense_vector], metadata)[0]
+        with METRICS.time("query.qdrant_search"):
+            response = self._client.get().query_points(
+                collection_name=self._settings.collection_name,
+                **self._hybrid_query(dense_vector, sparse_vector, qdrant_filter),
+            )
+        return response.points
+
+    async def _aquery_points(
+        self,
+        query: str,
+        metadata: Optional[Dict[str, str]],
+        dense_vector: Optional[List[float]] = None,
+    ) -> List[models.ScoredPoint]:
+        dense_vector, sparse_vector = await self._aembed(query, dense_vector)
+        qdrant_filter = (await self._ascoped_filters([dense_vector], metadata))[0]
+        with METRICS.time("query.qdrant_search"):
+            response = await self._acall(
+                "query_points",
+                collection_name=self._settings.collection_name,
+                **self._hybrid_query(dense_vector, sparse_vector, qdrant_filter),
+            )
+        return response.points
+
+    def _batch_query_points(
+        self,
+        queries: List[str],
+        metadata: Optional[Dict[str, str]],
+        dense_vectors: Optional[List[List[float]]] = None,
+    ) -> List[List[models.ScoredPoint]]:
+        if dense_vectors is None:
+            dense_vectors = self.embed_queries(queries)
+        sparse_vectors = self._embed_sparse_queries(queries)
+        filters = self._scoped_filters(dense_vectors, metadata)
+        responses: List[models.QueryResponse] = []
+        requests = self._hybrid_requests(dense_vectors, sparse_vectors, filters)
+        for request_batch in batched(requests, self._settings.query_batch_size):
+            with METRICS.time("query.qdrant_search"):
+                responses.extend(
+                    self._client.get().query_batch_points(
+                        collection_name=self._settings.collection_name,
+                        requests=request_batch,
+                    )
+                )
+        return [response.points for response in responses]
+
+    async def _acall(self, method: str, **arguments: Any) -> Any:
+        if self._runs_sync_client:
+            call = functools.partial(contextvars.copy_context().run, getattr(self._client.get(), method), **arguments)
+            return await asyncio.get_running_loop().run_in_executor(None, call)
+        async_client = self._async_client or self._settings.async_qdrant_client()
+        return await getattr(async_client, method)(**arguments)
+
+    async def _aembed(
+        self,
+        query: str,
+        dense_vector: Optional[List[float]] = None,
+    ) -> Tuple[List[float], models.SparseVector]:
+        sparse_future = asyncio.wrap_future(self._sparse_batcher.submit(query))
+        if dense_vector is None:
+            dense_vector = await self._adense_embedding(query)
+        with METRICS.time("query.sparse_wait"):
+            sparse_vector = await sparse_future
+        return dense_vector, sparse_vector
+
+    async def _adense_embedding(self, query: str) -> List[float]:
+        with METRICS.time("query.dense_wait"):
+            return await self._dense_batcher.aembed(query)
+
+    async def _aembed_many(
+        self,
+        queries: List[str],
+        dense_vectors: Optional[List[List[float]]] = None,
+    ) -> Tuple[List[List[float]], List[models.SparseVector]]:
+        loop = asyncio.get_running_loop()
+        sparse_call = functools.partial(contextvars.copy_context().run, self._embed_sparse_queries, queries)
+        sparse_task = loop.run_in_executor(None, sparse_call)
+        if dense_vectors is not None:
+            return dense_vectors, await sparse_task
+        dense_vectors, sparse_vectors = await asyncio.gather(self.aembed_queries(queries), sparse_task)
+        return dense_vectors, sparse_vectors
+
+    def _embed_dense_queries(self, queries: List[str]) -> List[List[float]]:
+        with METRICS.time("query.dense_embedding"):
+            return self._dense_embeddings.get().embed_documents(queries)
+
+    def _embed_sparse_queries(self, queries: List[str]) -> List[models.SparseVector]:
+        with METRICS.time("query.sparse_embedding"):
+            return self._sparse_embedder.embed_queries(queries)
+
+    def _query_batcher(self, compute: Callable[[List[str]], List[T]]) -> QueryBatcher[T]:
+        return QueryBatcher(
+            compute,
+            self._settings.query_embedding_window_seconds,
+            self._settings.query_embedding_max_batch,
+            self._settings.embedding_max_concurrency,
+        )
+
+    def _hybrid_requests(
+        self,
+        dense_vectors: List[List[float]],
+        sparse_vectors: List[models.SparseVector],
+        filters: List[Optional[models.Filter]],
+    ) -> List[models.QueryRequest]:
+        return [
+            models.QueryRequest(**self._hybrid_query(dense_vector, sparse_vector, qdrant_filter))
+            for dense_vector, sparse_vector, qdrant_filter in zip(dense_vectors, sparse_vectors, filters)
+        ]
+
+    def _scoped_filters(
+        self,
+        dense_vectors: List[List[float]],
+        metadata: Optional[Dict[str, str]],
+    ) -> List[Optional[models.Filter]]:
         qdrant_filter = self._build_filter(metadata) if metadata else None
-        return self._store.similarity_search(query, k=self._limit, filter=qdrant_filter)
+        if not self._narrows_sections(metadata):
+            return [qdrant_filter] * len(dense_vectors)
+        top_sections = self._sections.get().top_sections(dense_vectors, self._settings.section_search_limit, metadata)
+        return [self._within_sections(qdrant_filter, sections) for sections in top_sections]
+
+    async def _ascoped_filters(
+        self,
+        dense_vectors: List[List[float]],
+        metadata: Optional[Dict[str, str]],
+    ) -> List[Optional[models.Filter]]:
+        if not self._narrows_sections(metadata):
+            return self._scoped_filters(dense_vectors, metadata)
+        loop = asyncio.get_running_loop()
+        scoped_call = functools.partial(contextvars.copy_context().run, self._scoped_filters, dense_vectors, metadata)
+        return await loop.run_in_executor(None, scoped_call)
+
+    def _hybrid_query(
+        self,
+        dense_vector: List[float],
+        sparse_vector: models.SparseVector,
+        qdrant_filter: Optional[models.Filter],
+    ) -> Dict[str, Any]:
+        return {
+            "prefetch": [
+                models.Prefetch(
+                    using=self._settings.dense_field,
+                    query=dense_vector,
+                    filter=qdrant_filter,
+                    limit=self._settings.dense_prefetch_limit,
+                    params=self._search_params,
+                ),
+                models.Prefetch(
+                    using=self._settings.sparse_field,
+                    query=sparse_vector,
+                    filter=qdrant_filter,
+                    limit=self._settings.sparse_prefetch_limit,
+                ),
+            ],
+            "query": models.FusionQuery(fusion=models.Fusion(self._settings.hybrid_fusion)),
+            "limit": self._limit,
+            "with_payload": self._payload_fields,
+        }
+
+    def _narrows_sections(self, metadata: Optional[Dict[str, str]]) -> bool:
+        return self._settings.search_mode == "hierarchical" and "header_2" not in (metadata or {})
+
+    def _to_result(self, point: models.ScoredPoint) -> SearchResult:
+        return SearchResult.from_point(point, self._settings.content_field)
+
+    def _to_document(self, point: models.ScoredPoint) -> Document:
+        metadata = dict(point.payload.get("metadata") or {})
+        metadata["_id"] = point.id
+        metadata["_collection_name"] = self._settings.collection_name
+        return Document(
+            page_content=point.payload.get(self._settings.content_field, ""),
+            metadata=metadata,
+        )
 
     @staticmethod
     def _build_filter(metadata: Dict[str, str]) -> models.Filter:
@@ -47,3 +335,27 @@ class HybridSearcher:
             for field, value in metadata.items()
         ]
         return models.Filter(must=conditions)
+
+    @classmethod
+    def _within_sections(
+        cls,
+        qdrant_filter: Optional[models.Filter],
+        sections: List[Section],
+    ) -> Optional[models.Filter]:
+        if not sections:
+            return qdrant_filter
+        section_filters: List[models.Condition] = [
+            models.Filter(
+                must=[cls._section_condition(field, section.get(field)) for field in SectionIndex.SECTION_FIELDS]
+            )
+            for section in sections
+        ]
+        must = qdrant_filter.must if qdrant_filter else None
+        return models.Filter(must=must, should=section_filters)
+
+    @staticmethod
+    def _section_condition(field: str, value: Optional[str]) -> models.Condition:
+        key = f"metadata.{field}"
+        if not value:
+            return models.IsEmptyCondition(is_empty=models.PayloadField(key=key))
+        return models.FieldCondition(key=key, match=models.MatchValue(value=value))
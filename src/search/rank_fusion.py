@@ -0,0 +1,41 @@
+from typing import Callable, Dict, List
+
+from qdrant_client.http import models
+from qdrant_client.hybrid.fusion import distribution_based_score_fusion, reciprocal_rank_fusion
+
+from src.search.search_result import PointId, SearchResult, SearchResults
+
+
+class ReciprocalRankFusion:
+    DEFAULT_K = 60
+
+    def __init__(self, content_field: str, k: int = DEFAULT_K):
+        self._content_field = content_field
+        self._k = k
+
+    def fuse(self, rankings: List[List[models.ScoredPoint]]) -> SearchResults:
+        scores: Dict[PointId, float] = {}
+        points: Dict[PointId, models.ScoredPoint] = {}
+        for ranking in rankings:
+            for rank, point in enumerate(ranking, start=1):
+                scores[point.id] = scores.get(point.id, 0.0) + 1.0 / (self._k + rank)
+                points.setdefault(point.id, point)
+        ordered = sorted(scores, key=scores.get, reverse=True)
+        return SearchResults(
+            [SearchResult.from_point(points[point_id], self._content_field, scores[point_id]) for point_id in ordered]
+        )
+
+
+class QueryFusion:
+    FUSIONS: Dict[str, Callable[[List[List[models.ScoredPoint]], int], List[models.ScoredPoint]]] = {
+        "rrf": lambda rankings, limit: reciprocal_rank_fusion(rankings, limit=limit),
+        "dbsf": lambda rankings, limit: distribution_based_score_fusion(rankings, limit=limit),
+    }
+
+    def __init__(self, fusion: str):
+        if fusion not in self.FUSIONS:
+            raise ValueError(f"Unknown hybrid fusion '{fusion}'.")
+        self._fuse = self.FUSIONS[fusion]
+
+    def points(self, rankings: List[List[models.ScoredPoint]], limit: int) -> List[models.ScoredPoint]:
+        return self._fuse(rankings, limit)
@@ -1,11 +1,38 @@
-from typing import List
+from typing import Dict, Iterator, List, Optional, Union
+
+from qdrant_client.http import models
+
+PointId = Union[int, str]
 
 
 class SearchResult:
-    def __init__(self, content: str, score: float, chunk_index: int):
+    def __init__(
+        self,
+        content: str,
+        score: float,
+        chunk_index: int,
+        point_id: Optional[PointId] = None,
+        metadata: Optional[Dict[str, str]] = None,
+        source: str = "",
+    ):
         self.content = content
         self.score = score
         self.chunk_index = chunk_index
+        self.point_id = point_id
+        self.metadata = metadata or {}
+        self.source = source
+
+    @classmethod
+    def from_point(cls, point: models.ScoredPoint, content_field: str, score: Optional[float] = None) -> "SearchResult":
+        payload = point.payload or {}
+        return cls(
+            content=payload.get(content_field, ""),
+            score=point.score if score is None else score,
+            chunk_index=payload.get("chunk_index", -1),
+            point_id=point.id,
+            metadata=payload.get("metadata") or {},
+            source=payload.get("source", ""),
+        )
 
     def __repr__(self) -> str:
         preview = self.content[:80].replace("\n", " ")
@@ -13,21 +40,32 @@ class SearchResult:
 
 
 class SearchResults:
-    def __init__(self, dense: List[SearchResult], sparse: List[SearchResult]):
-        self.dense = dense
-        self.sparse = sparse
+    def __init__(self, items: List[SearchResult]):
+        self._items = items
+
+    def __iter__(self) -> Iterator[SearchResult]:
+        return iter(self._items)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def is_empty(self) -> bool:
+        return len(self._items) == 0
+
+    def top(self, limit: int) -> "SearchResults":
+        return SearchResults(self._items[:limit])
 
     def all_unique_contents(self) -> List[str]:
         seen = set()
         unique = []
-        for result in self.dense + self.sparse:
+        for result in self._items:
             if result.content not in seen:
                 seen.add(result.content)
                 unique.append(result.content)
         return unique
 
     def total_hits(self) -> int:
-        return len(self.dense) + len(self.sparse)
+        return len(self._items)
 
     def __repr__(self) -> str:
-        return f"SearchResults(dense={len(self.dense)}, sparse={len(self.sparse)})"
+        return f"SearchResults(hits={len(self._items)})"
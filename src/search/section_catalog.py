@@ -0,0 +1,48 @@
+import time
+from threading import Lock
+from typing import List, Optional, Tuple
+
+from qdrant_client import QdrantClient
+
+from src.config.settings import Settings
+
+
+class SectionCatalog:
+    SECTION_KEY = "metadata.header_2"
+
+    def __init__(self, client: QdrantClient, settings: Settings):
+        self._client = client
+        self._collection_name = settings.collection_name
+        self._limit = settings.section_catalog_limit
+        self._ttl_seconds = settings.section_catalog_ttl_seconds
+        self._cached: Optional[Tuple[float, List[str]]] = None
+        self._lock = Lock()
+
+    def headings(self) -> List[str]:
+        with self._lock:
+            if self._is_fresh():
+                return self._cached[1]
+            headings = self._load()
+            if headings:
+                self._cached = (time.monotonic(), headings)
+            return headings
+
+    def refresh(self) -> None:
+        with self._lock:
+            self._cached = None
+
+    def _is_fresh(self) -> bool:
+        if self._cached is None:
+            return False
+        return time.monotonic() - self._cached[0] <= self._ttl_seconds
+
+    def _load(self) -> List[str]:
+        if not self._client.collection_exists(self._collection_name):
+            return []
+        response = self._client.facet(
+            collection_name=self._collection_name,
+            key=self.SECTION_KEY,
+            limit=self._limit,
+            exact=True,
+        )
+        return [str(hit.value) for hit in response.hits]
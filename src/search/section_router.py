@@ -0,0 +1,120 @@
+import time
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
+
+from qdrant_client import QdrantClient
+from qdrant_client.http import models
+
+from src.config.settings import Settings
+from src.observability.latency_metrics import METRICS
+from src.storage.section_index import SectionIndex
+
+Section = Dict[str, str]
+
+
+class SectionRouter:
+    SCROLL_PAGE_SIZE = 1024
+
+    def __init__(self, client: QdrantClient, settings: Settings):
+        self._client = client
+        self._chunks_collection = settings.collection_name
+        self._collection_name = SectionIndex.collection_for(settings.collection_name)
+        self._dense_field = settings.dense_field
+        self._min_score = settings.section_routing_min_score
+        self._min_margin = settings.section_routing_min_margin
+        self._ttl_seconds = settings.section_catalog_ttl_seconds
+        self._available: Optional[Tuple[float, bool]] = None
+        self._lock = Lock()
+
+    def is_available(self) -> bool:
+        with self._lock:
+            if self._available is not None and time.monotonic() - self._available[0] <= self._ttl_seconds:
+                return self._available[1]
+            available = self._is_current()
+            self._available = (time.monotonic(), available)
+            return available
+
+    def _is_current(self) -> bool:
+        if not self._client.collection_exists(self._collection_name):
+            return False
+        if not self._client.collection_exists(self._chunks_collection):
+            return False
+        return self._indexed_chunks() == self._client.count(collection_name=self._chunks_collection, exact=True).count
+
+    def _indexed_chunks(self) -> int:
+        total = 0
+        offset = None
+        while True:
+            records, offset = self._client.scroll(
+                collection_name=self._collection_name,
+                limit=self.SCROLL_PAGE_SIZE,
+                offset=offset,
+                with_payload=["chunk_count"],
+                with_vectors=False,
+            )
+            total += sum(record.payload.get("chunk_count", 0) for record in records)
+            if offset is None:
+                return total
+
+    def refresh(self) -> None:
+        with self._lock:
+            self._available = None
+
+    def route(self, dense_vector: List[float]) -> Optional[str]:
+        points = self._nearest([dense_vector], 2, None)[0]
+        if not points or not self._is_confident([point.score for point in points]):
+            return None
+        return points[0].payload["metadata"].get("header_2")
+
+    def top_sections(
+        self,
+        dense_vectors: List[List[float]],
+        limit: int,
+        metadata: Optional[Dict[str, str]] = None,
+    ) -> List[List[Section]]:
+        return [
+            [point.payload["metadata"] for point in points]
+            for points in self._nearest(dense_vectors, limit, metadata)
+        ]
+
+    def _nearest(
+        self,
+        dense_vectors: List[List[float]],
+        limit: int,
+        metadata: Optional[Dict[str, str]],
+    ) -> List[List[models.ScoredPoint]]:
+        with METRICS.time("query.section_lookup"):
+            if not self.is_available():
+                return [[] for _ in dense_vectors]
+            responses = self._client.query_batch_points(
+                collection_name=self._collection_name,
+                requests=[
+                    models.QueryRequest(
+                        query=dense_vector,
+                        using=self._dense_field,
+                        filter=self._section_filter(metadata or {}),
+                        limit=limit,
+                        with_payload=["metadata"],
+                    )
+                    for dense_vector in dense_vectors
+                ],
+            )
+        return [response.points for response in responses]
+
+    def _is_confident(self, scores: List[float]) -> bool:
+        if scores[0] < self._min_score:
+            return False
+        if len(scores) == 1:
+            return True
+        return scores[0] - scores[1] >= self._min_margin
+
+    @staticmethod
+    def _section_filter(metadata: Dict[str, str]) -> Optional[models.Filter]:
+        conditions: List[models.Condition] = [
+            models.FieldCondition(key=f"metadata.{field}", match=models.MatchValue(value=value))
+            for field, value in metadata.items()
+            if field in SectionIndex.SECTION_FIELDS
+        ]
+        if not conditions:
+            return None
+        return models.Filter(must=conditions)
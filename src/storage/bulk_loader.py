@@ -0,0 +1,39 @@
+from typing import Callable, Iterable, Optional, Tuple
+
+from src.document.text_chunker import TextChunk
+from src.storage.collection_manager import CollectionManager
+from src.storage.document_inserter import DocumentInserter
+from src.storage.section_index import SectionIndex
+
+
+class BulkLoader:
+    def __init__(
+        self,
+        collection_manager: CollectionManager,
+        inserter: DocumentInserter,
+        section_index: Optional[SectionIndex] = None,
+        on_change: Optional[Callable[[], None]] = None,
+    ):
+        self._collection_manager = collection_manager
+        self._inserter = inserter
+        self._section_index = section_index
+        self._on_change = on_change
+
+    def load(self, documents: Iterable[Tuple[str, Iterable[TextChunk]]], embedding_dimension: int) -> str:
+        shadow_name = self._collection_manager.create_shadow(embedding_dimension)
+        self._inserter.insert_documents(documents, collection_name=shadow_name)
+        self._collection_manager.finalize_shadow(shadow_name)
+        self._build_sections(shadow_name)
+        self._collection_manager.promote(shadow_name)
+        self._notify_change()
+        return shadow_name
+
+    def _build_sections(self, shadow_name: str) -> None:
+        if self._section_index is None:
+            return
+        self._section_index.for_collection(shadow_name).rebuild()
+
+    def _notify_change(self) -> None:
+        if self._on_change is None:
+            return
+        self._on_change()
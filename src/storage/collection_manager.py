@@ -1,55 +1,179 @@
+import time
+from typing import Callable, List, Optional
+
 from qdrant_client import QdrantClient
 from qdrant_client.http import models
 
 from src.config.settings import Settings
+from src.storage.section_index import SectionIndex
+from src.storage.storage_profile import StorageProfile
 
 
 class CollectionManager:
-    def __init__(self, client: QdrantClient, settings: Settings):
+    def __init__(
+        self,
+        client: QdrantClient,
+        settings: Settings,
+        on_change: Optional[Callable[[], None]] = None,
+    ):
         self._client = client
         self._settings = settings
+        self._profile = StorageProfile.from_settings(settings)
+        self._on_change = on_change
 
     METADATA_INDEX_FIELDS = [
         "metadata.header_1",
         "metadata.header_2",
         "metadata.header_3",
     ]
+    SOURCE_INDEX_FIELDS = [
+        "source",
+        "content_hash",
+    ]
+    OPTIMIZATION_POLL_SECONDS = 1.0
 
     def recreate(self, embedding_dimension: int) -> None:
         self.delete()
-        self._create(embedding_dimension)
-        self._create_payload_indexes()
+        self._create_aliased(embedding_dimension)
+        self._notify_change()
+
+    def ensure(self, embedding_dimension: int) -> None:
+        if self.exists():
+            return
+        self._create_aliased(embedding_dimension)
 
     def exists(self) -> bool:
-        collections = self._client.get_collections().collections
-        names = [collection.name for collection in collections]
-        return self._settings.collection_name in names
+        return bool(self.alias_targets()) or self._is_concrete(self._settings.collection_name)
 
     def delete(self) -> None:
-        if not self.exists():
+        self._delete_aliased(self._settings.collection_name)
+        self._delete_aliased(self._sections_name())
+
+    def create_shadow(self, embedding_dimension: int) -> str:
+        shadow_name = self._versioned_name()
+        deferred_indexing = models.OptimizersConfigDiff(indexing_threshold=0)
+        self._create(shadow_name, embedding_dimension, deferred_indexing)
+        return shadow_name
+
+    def finalize_shadow(self, shadow_name: str) -> None:
+        self._client.update_collection(
+            collection_name=shadow_name,
+            optimizers_config=models.OptimizersConfigDiff(
+                indexing_threshold=self._settings.indexing_threshold,
+            ),
+        )
+        self._create_payload_indexes(shadow_name)
+        self._wait_until_optimized(shadow_name)
+
+    def promote(self, shadow_name: str) -> None:
+        self._point_alias(self._settings.collection_name, shadow_name)
+        self._promote_sections(shadow_name)
+        self._notify_change()
+
+    def alias_targets(self) -> List[str]:
+        return self._alias_targets(self._settings.collection_name)
+
+    def _alias_targets(self, alias_name: str) -> List[str]:
+        aliases = self._client.get_aliases().aliases
+        return [alias.collection_name for alias in aliases if alias.alias_name == alias_name]
+
+    def _promote_sections(self, shadow_name: str) -> None:
+        shadow_sections = SectionIndex.collection_for(shadow_name)
+        if not self._client.collection_exists(shadow_sections):
+            self._delete_aliased(self._sections_name())
             return
-        self._client.delete_collection(self._settings.collection_name)
+        self._point_alias(self._sections_name(), shadow_sections)
+
+    def _point_alias(self, alias_name: str, collection_name: str) -> None:
+        previous = self._alias_targets(alias_name)
+        if self._is_concrete(alias_name):
+            self._client.delete_collection(alias_name)
+        self._client.update_collection_aliases(
+            change_aliases_operations=self._alias_switch(alias_name, collection_name, previous),
+        )
+        for previous_name in previous:
+            self._client.delete_collection(previous_name)
 
-    def _create(self, dimension: int) -> None:
+    def _delete_aliased(self, alias_name: str) -> None:
+        targets = self._alias_targets(alias_name)
+        if targets:
+            self._client.update_collection_aliases(change_aliases_operations=[self._alias_delete(alias_name)])
+        for collection_name in targets:
+            self._client.delete_collection(collection_name)
+        if self._is_concrete(alias_name):
+            self._client.delete_collection(alias_name)
+
+    def _alias_switch(
+        self,
+        alias_name: str,
+        collection_name: str,
+        previous: List[str],
+    ) -> List[models.AliasOperations]:
+        create = models.CreateAliasOperation(
+            create_alias=models.CreateAlias(collection_name=collection_name, alias_name=alias_name)
+        )
+        if not previous:
+            return [create]
+        return [self._alias_delete(alias_name), create]
+
+    @staticmethod
+    def _alias_delete(alias_name: str) -> models.DeleteAliasOperation:
+        return models.DeleteAliasOperation(delete_alias=models.DeleteAlias(alias_name=alias_name))
+
+    def _create_aliased(self, embedding_dimension: int) -> None:
+        collection_name = self._versioned_name()
+        self._create(collection_name, embedding_dimension)
+        self._create_payload_indexes(collection_name)
+        self._client.update_collection_aliases(
+            change_aliases_operations=self._alias_switch(self._settings.collection_name, collection_name, []),
+        )
+
+    def _is_concrete(self, name: str) -> bool:
+        collections = self._client.get_collections().collections
+        return name in [collection.name for collection in collections]
+
+    def _sections_name(self) -> str:
+        return SectionIndex.collection_for(self._settings.collection_name)
+
+    def _versioned_name(self) -> str:
+        return f"{self._settings.collection_name}_v{time.time_ns()}"
+
+    def _wait_until_optimized(self, collection_name: str) -> None:
+        deadline = time.monotonic() + self._settings.optimization_timeout_seconds
+        while self._client.get_collection(collection_name).status != models.CollectionStatus.GREEN:
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Collection '{collection_name}' was not optimized in time.")
+            time.sleep(self.OPTIMIZATION_POLL_SECONDS)
+
+    def _create(
+        self,
+        collection_name: str,
+        dimension: int,
+        optimizers_config: Optional[models.OptimizersConfigDiff] = None,
+    ) -> None:
         self._client.create_collection(
-            collection_name=self._settings.collection_name,
+            collection_name=collection_name,
             vectors_config={
-                self._settings.dense_field: models.VectorParams(
-                    size=dimension,
-                    distance=models.Distance.COSINE,
-                )
+                self._settings.dense_field: self._profile.vector_params(dimension),
             },
             sparse_vectors_config={
-                self._settings.sparse_field: models.SparseVectorParams(
-                    index=models.SparseIndexParams()
-                )
+                self._settings.sparse_field: self._profile.sparse_vector_params(),
             },
+            hnsw_config=self._profile.hnsw_config(),
+            quantization_config=self._profile.quantization_config(),
+            on_disk_payload=self._profile.on_disk_payload,
+            optimizers_config=optimizers_config,
         )
 
-    def _create_payload_indexes(self) -> None:
-        for field in self.METADATA_INDEX_FIELDS:
+    def _create_payload_indexes(self, collection_name: str) -> None:
+        for field in self.METADATA_INDEX_FIELDS + self.SOURCE_INDEX_FIELDS:
             self._client.create_payload_index(
-                collection_name=self._settings.collection_name,
+                collection_name=collection_name,
                 field_name=field,
                 field_schema=models.PayloadSchemaType.KEYWORD,
             )
+
+    def _notify_change(self) -> None:
+        if self._on_change is None:
+            return
+        self._on_change()
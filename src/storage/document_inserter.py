@@ -1,13 +1,18 @@
 import uuid
-from typing import List
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
 
 from qdrant_client import QdrantClient
 from qdrant_client.http import models
 
 from src.config.settings import Settings
-from src.document.text_chunker import Chunks, TextChunk
+from src.document.text_chunker import TextChunk
+from src.embeddings.batching import batched, flag_last
 from src.embeddings.dense_embedder import DenseEmbedder
 from src.embeddings.sparse_embedder import SparseEmbedder
+from src.observability.latency_metrics import METRICS
+from src.storage.upsert_pipeline import UpsertPipeline
+
+SourcedChunk = Tuple[str, TextChunk]
 
 
 class DocumentInserter:
@@ -17,26 +22,78 @@ class DocumentInserter:
         settings: Settings,
         dense_embedder: DenseEmbedder,
         sparse_embedder: SparseEmbedder,
+        on_change: Optional[Callable[[], None]] = None,
     ):
         self._client = client
         self._settings = settings
         self._dense_embedder = dense_embedder
         self._sparse_embedder = sparse_embedder
+        self._on_change = on_change
+
+    POINT_NAMESPACE = uuid.UUID("6f1c0c8e-4f43-4b8e-9a57-2d1f0f3c9b21")
+
+    def insert(
+        self,
+        chunks: Iterable[TextChunk],
+        source: str,
+        collection_name: Optional[str] = None,
+    ) -> int:
+        return self.insert_documents([(source, chunks)], collection_name)
+
+    def insert_documents(
+        self,
+        documents: Iterable[Tuple[str, Iterable[TextChunk]]],
+        collection_name: Optional[str] = None,
+    ) -> int:
+        inserted = 0
+        batches = flag_last(batched(self._sourced_chunks(documents), self._settings.insert_batch_size))
+        with self._pipeline(collection_name or self._settings.collection_name) as pipeline:
+            for batch, is_last in batches:
+                points = self._build_batch(batch)
+                pipeline.send(points, is_last)
+                inserted += len(points)
+        self._notify_change(inserted)
+        return inserted
+
+    @staticmethod
+    def _sourced_chunks(documents: Iterable[Tuple[str, Iterable[TextChunk]]]) -> Iterator[SourcedChunk]:
+        for source, chunks in documents:
+            for chunk in chunks:
+                yield source, chunk
 
-    def insert(self, chunks: Chunks) -> int:
-        points = self._build_points(chunks)
-        self._upsert(points)
-        return len(points)
+    def _notify_change(self, inserted: int) -> None:
+        if self._on_change is None or inserted == 0:
+            return
+        self._on_change()
 
-    def _build_points(self, chunks: Chunks) -> List[models.PointStruct]:
-        return [self._build_point(chunk) for chunk in chunks]
+    def _pipeline(self, collection_name: str) -> UpsertPipeline:
+        return UpsertPipeline(
+            client=self._client,
+            collection_name=collection_name,
+            max_pending=self._settings.upsert_max_pending,
+        )
 
-    def _build_point(self, chunk: TextChunk) -> models.PointStruct:
-        dense_vector = self._dense_embedder.embed(chunk.content)
-        sparse_vector = self._sparse_embedder.embed(chunk.content)
+    def _build_batch(self, batch: List[SourcedChunk]) -> List[models.PointStruct]:
+        contents = [chunk.content for _, chunk in batch]
+        with METRICS.time("ingest.dense_embedding"):
+            dense_vectors = self._dense_embedder.embed_many(contents)
+        with METRICS.time("ingest.sparse_embedding"):
+            sparse_vectors = self._sparse_embedder.embed_many(contents)
+        return [
+            self._build_point(chunk, source, dense_vector, sparse_vector)
+            for (source, chunk), dense_vector, sparse_vector in zip(batch, dense_vectors, sparse_vectors)
+        ]
 
+    def _build_point(
+        self,
+        chunk: TextChunk,
+        source: str,
+        dense_vector: List[float],
+        sparse_vector: models.SparseVector,
+    ) -> models.PointStruct:
+        content_hash = chunk.content_hash()
         return models.PointStruct(
-            id=str(uuid.uuid4()),
+            id=self.point_id(source, TextChunk.chunk_key(content_hash, chunk.occurrence)),
             vector={
                 self._settings.dense_field: dense_vector,
                 self._settings.sparse_field: sparse_vector,
@@ -44,13 +101,13 @@ class DocumentInserter:
             payload={
                 self._settings.content_field: chunk.content,
                 "chunk_index": chunk.index,
-                "metadata": chunk.metadata,
+                "metadata": dict(chunk.metadata),
+                "source": source,
+                "content_hash": content_hash,
+                "occurrence": chunk.occurrence,
             },
         )
 
-    def _upsert(self, points: List[models.PointStruct]) -> None:
-        self._client.upsert(
-            collection_name=self._settings.collection_name,
-            wait=True,
-            points=points,
-        )
+    @classmethod
+    def point_id(cls, source: str, chunk_key: str) -> str:
+        return str(uuid.uuid5(cls.POINT_NAMESPACE, f"{source}:{chunk_key}"))
@@ -0,0 +1,184 @@
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set
+
+from qdrant_client import QdrantClient
+from qdrant_client.http import models
+
+from src.config.settings import Settings
+from src.document.text_chunker import TextChunk
+from src.storage.document_inserter import DocumentInserter
+from src.storage.section_index import SectionCentroids, SectionIndex
+
+
+class SyncReport:
+    def __init__(self, upserted: int, deleted: int, moved: int, unchanged: int):
+        self.upserted = upserted
+        self.deleted = deleted
+        self.moved = moved
+        self.unchanged = unchanged
+
+    def has_changes(self) -> bool:
+        return self.upserted + self.deleted + self.moved > 0
+
+    def __repr__(self) -> str:
+        return (
+            f"SyncReport(upserted={self.upserted}, deleted={self.deleted}, "
+            f"moved={self.moved}, unchanged={self.unchanged})"
+        )
+
+
+class SourceManifest:
+    def __init__(self, chunk_indexes: Dict[str, int], metadata: Dict[str, Dict[str, str]]):
+        self._chunk_indexes = chunk_indexes
+        self._metadata = metadata
+
+    def contains(self, chunk_key: str) -> bool:
+        return chunk_key in self._chunk_indexes
+
+    def chunk_index(self, chunk_key: str) -> int:
+        return self._chunk_indexes[chunk_key]
+
+    def metadata(self, chunk_key: str) -> Dict[str, str]:
+        return self._metadata.get(chunk_key) or {}
+
+    def is_current(self, chunk_key: str, chunk: TextChunk) -> bool:
+        return self.chunk_index(chunk_key) == chunk.index and self.metadata(chunk_key) == chunk.metadata
+
+    def missing_from(self, chunk_keys: Set[str]) -> List[str]:
+        return [chunk_key for chunk_key in self._chunk_indexes if chunk_key not in chunk_keys]
+
+
+class DocumentSynchronizer:
+    SCROLL_PAGE_SIZE = 1024
+
+    def __init__(
+        self,
+        client: QdrantClient,
+        settings: Settings,
+        inserter: DocumentInserter,
+        on_change: Optional[Callable[[], None]] = None,
+        section_index: Optional[SectionIndex] = None,
+    ):
+        self._client = client
+        self._settings = settings
+        self._inserter = inserter
+        self._on_change = on_change
+        self._section_index = section_index
+
+    def sync(self, chunks: Iterable[TextChunk], source: str) -> SyncReport:
+        manifest = self.manifest(source)
+        seen: Set[str] = set()
+        moved: List[TextChunk] = []
+        added: List[TextChunk] = []
+        changed = self._changed_chunks(chunks, manifest, seen, moved, added)
+        upserted = self._inserter.insert(changed, source=source)
+        removed = manifest.missing_from(seen)
+        retitled = [chunk for chunk in moved if manifest.metadata(chunk.key()) != chunk.metadata]
+        sections = self._sections_before(source, manifest, removed + [chunk.key() for chunk in retitled])
+        self._delete(source, removed)
+        self._reindex(source, moved)
+        unchanged = len(seen) - upserted - len(moved)
+        report = SyncReport(upserted=upserted, deleted=len(removed), moved=len(moved), unchanged=unchanged)
+        self._notify_change(report)
+        self._update_sections(source, sections, added + retitled)
+        return report
+
+    def _notify_change(self, report: SyncReport) -> None:
+        if self._on_change is None or not report.has_changes():
+            return
+        self._on_change()
+
+    def _sections_before(self, source: str, manifest: SourceManifest, chunk_keys: List[str]) -> SectionCentroids:
+        sections = SectionCentroids()
+        if self._section_index is None:
+            return sections
+        point_ids = self._point_ids(source, chunk_keys)
+        vectors = self._section_index.vectors(point_ids)
+        for chunk_key, point_id in zip(chunk_keys, point_ids):
+            if point_id in vectors:
+                sections.remove(manifest.metadata(chunk_key), vectors[point_id])
+        return sections
+
+    def _update_sections(self, source: str, sections: SectionCentroids, chunks: List[TextChunk]) -> None:
+        if self._section_index is None:
+            return
+        point_ids = self._point_ids(source, [chunk.key() for chunk in chunks])
+        vectors = self._section_index.vectors(point_ids)
+        for chunk, point_id in zip(chunks, point_ids):
+            if point_id in vectors:
+                sections.add(chunk.metadata, vectors[point_id])
+        self._section_index.apply(sections)
+
+    @staticmethod
+    def _point_ids(source: str, chunk_keys: List[str]) -> List[str]:
+        return [DocumentInserter.point_id(source, chunk_key) for chunk_key in chunk_keys]
+
+    def manifest(self, source: str) -> SourceManifest:
+        chunk_indexes: Dict[str, int] = {}
+        metadata: Dict[str, Dict[str, str]] = {}
+        offset = None
+        while True:
+            records, offset = self._client.scroll(
+                collection_name=self._settings.collection_name,
+                scroll_filter=self._source_filter(source),
+                limit=self.SCROLL_PAGE_SIZE,
+                offset=offset,
+                with_payload=["content_hash", "occurrence", "chunk_index", "metadata"],
+                with_vectors=False,
+            )
+            for record in records:
+                chunk_key = TextChunk.chunk_key(record.payload["content_hash"], record.payload.get("occurrence", 0))
+                chunk_indexes[chunk_key] = record.payload["chunk_index"]
+                metadata[chunk_key] = record.payload.get("metadata") or {}
+            if offset is None:
+                return SourceManifest(chunk_indexes, metadata)
+
+    @staticmethod
+    def _changed_chunks(
+        chunks: Iterable[TextChunk],
+        manifest: SourceManifest,
+        seen: Set[str],
+        moved: List[TextChunk],
+        added: List[TextChunk],
+    ) -> Iterator[TextChunk]:
+        for chunk in chunks:
+            chunk_key = chunk.key()
+            if chunk_key in seen:
+                continue
+            seen.add(chunk_key)
+            if not manifest.contains(chunk_key):
+                added.append(chunk)
+                yield chunk
+                continue
+            if not manifest.is_current(chunk_key, chunk):
+                moved.append(chunk)
+
+    def _delete(self, source: str, chunk_keys: List[str]) -> None:
+        if not chunk_keys:
+            return
+        self._client.delete(
+            collection_name=self._settings.collection_name,
+            points_selector=models.PointIdsList(points=self._point_ids(source, chunk_keys)),
+            wait=True,
+        )
+
+    def _reindex(self, source: str, chunks: List[TextChunk]) -> None:
+        if not chunks:
+            return
+        operations = [
+            models.SetPayloadOperation(
+                set_payload=models.SetPayload(
+                    payload={"chunk_index": chunk.index, "metadata": dict(chunk.metadata)},
+                    points=[DocumentInserter.point_id(source, chunk.key())],
+                )
+            )
+            for chunk in chunks
+        ]
+        self._client.batch_update_points(
+            collection_name=self._settings.collection_name,
+            update_operations=operations,
+            wait=True,
+        )
+
+    @staticmethod
+    def _source_filter(source: str) -> models.Filter:
+        return models.Filter(must=[models.FieldCondition(key="source", match=models.MatchValue(value=source))])
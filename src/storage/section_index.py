@@ -0,0 +1,182 @@
+import json
+import uuid
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
+
+import numpy as np
+from qdrant_client import QdrantClient
+from qdrant_client.http import models
+
+from src.config.settings import Settings
+from src.observability.latency_metrics import METRICS
+from src.storage.storage_profile import StorageProfile
+
+SectionKey = Tuple[str, str]
+
+
+def section_key(metadata: Mapping[str, str]) -> SectionKey:
+    return metadata.get("header_1", ""), metadata.get("header_2", "")
+
+
+class SectionCentroids:
+    def __init__(self):
+        self._sums: Dict[SectionKey, np.ndarray] = {}
+        self._counts: Dict[SectionKey, int] = {}
+
+    def add(self, metadata: Mapping[str, str], vector: List[float], weight: int = 1) -> None:
+        key = section_key(metadata)
+        vector = np.asarray(vector, dtype=np.float32) * weight
+        self._sums[key] = self._sums.get(key, 0) + vector
+        self._counts[key] = self._counts.get(key, 0) + weight
+
+    def remove(self, metadata: Mapping[str, str], vector: List[float]) -> None:
+        self.add(metadata, vector, -1)
+
+    def is_empty(self) -> bool:
+        return not self._sums
+
+    def keys(self) -> List[SectionKey]:
+        return list(self._sums)
+
+    def dimension(self) -> int:
+        return len(next(iter(self._sums.values())))
+
+    def totals(self) -> List[Tuple[SectionKey, np.ndarray, int]]:
+        return [(key, total, self._counts[key]) for key, total in self._sums.items()]
+
+
+class SectionIndex:
+    COLLECTION_SUFFIX = "_sections"
+    SCROLL_PAGE_SIZE = 1024
+    SECTION_FIELDS = ("header_1", "header_2")
+    SECTION_NAMESPACE = uuid.UUID("3f1c2b7e-9a4d-4c55-8e0a-6b2d1f7c9e41")
+
+    def __init__(self, client: QdrantClient, settings: Settings, collection_name: Optional[str] = None):
+        self._client = client
+        self._settings = settings
+        self._profile = StorageProfile.from_settings(settings)
+        self._chunks_collection = collection_name or settings.collection_name
+        self.collection_name = self.collection_for(self._chunks_collection)
+
+    def for_collection(self, collection_name: str) -> "SectionIndex":
+        return SectionIndex(self._client, self._settings, collection_name)
+
+    def rebuild(self) -> int:
+        with METRICS.time("ingest.section_index"):
+            centroids = self._centroids()
+            if centroids.is_empty():
+                return 0
+            self._ensure(centroids.dimension())
+            points = [self._build_point(key, total, count) for key, total, count in centroids.totals()]
+            self._client.upsert(collection_name=self.collection_name, points=points, wait=True)
+            self._delete_stale([point.id for point in points])
+            return len(points)
+
+    def apply(self, delta: SectionCentroids) -> int:
+        if delta.is_empty():
+            return 0
+        stored = self._stored_sums(delta.keys()) if self.exists() else None
+        if stored is None:
+            return self.rebuild()
+        with METRICS.time("ingest.section_index"):
+            points: List[models.PointStruct] = []
+            emptied: List[str] = []
+            for key, total, count in delta.totals():
+                stored_total, stored_count = stored.get(key, (0, 0))
+                if count + stored_count <= 0:
+                    emptied.append(self.section_id(key))
+                    continue
+                points.append(self._build_point(key, total + stored_total, count + stored_count))
+            self._write(points, emptied)
+            return len(points) + len(emptied)
+
+    def vectors(self, point_ids: Iterable[str]) -> Dict[str, List[float]]:
+        point_ids = list(point_ids)
+        if not point_ids:
+            return {}
+        records = self._client.retrieve(
+            collection_name=self._chunks_collection,
+            ids=point_ids,
+            with_payload=False,
+            with_vectors=[self._settings.dense_field],
+        )
+        return {str(record.id): record.vector[self._settings.dense_field] for record in records}
+
+    def exists(self) -> bool:
+        return self._client.collection_exists(self.collection_name)
+
+    @classmethod
+    def collection_for(cls, collection_name: str) -> str:
+        return f"{collection_name}{cls.COLLECTION_SUFFIX}"
+
+    def _centroids(self) -> SectionCentroids:
+        centroids = SectionCentroids()
+        offset = None
+        while True:
+            records, offset = self._client.scroll(
+                collection_name=self._chunks_collection,
+                limit=self.SCROLL_PAGE_SIZE,
+                offset=offset,
+                with_payload=["metadata"],
+                with_vectors=[self._settings.dense_field],
+            )
+            for record in records:
+                centroids.add(record.payload.get("metadata") or {}, record.vector[self._settings.dense_field])
+            if offset is None:
+                return centroids
+
+    def _ensure(self, dimension: int) -> None:
+        if self.exists():
+            return
+        self._client.create_collection(
+            collection_name=self.collection_name,
+            vectors_config={self._settings.dense_field: self._profile.vector_params(dimension)},
+        )
+
+    def _stored_sums(self, keys: List[SectionKey]) -> Optional[Dict[SectionKey, Tuple[np.ndarray, int]]]:
+        records = self._client.retrieve(
+            collection_name=self.collection_name,
+            ids=[self.section_id(key) for key in keys],
+            with_payload=["metadata", "dense_sum", "chunk_count"],
+        )
+        if any("dense_sum" not in record.payload for record in records):
+            return None
+        return {
+            section_key(record.payload["metadata"]): (
+                np.asarray(record.payload["dense_sum"], dtype=np.float32),
+                record.payload["chunk_count"],
+            )
+            for record in records
+        }
+
+    def _write(self, points: List[models.PointStruct], emptied: List[str]) -> None:
+        if points:
+            self._client.upsert(collection_name=self.collection_name, points=points, wait=True)
+        if emptied:
+            self._client.delete(
+                collection_name=self.collection_name,
+                points_selector=models.PointIdsList(points=emptied),
+                wait=True,
+            )
+
+    def _build_point(self, key: SectionKey, total: np.ndarray, chunk_count: int) -> models.PointStruct:
+        return models.PointStruct(
+            id=self.section_id(key),
+            vector={self._settings.dense_field: (total / chunk_count).tolist()},
+            payload={
+                "metadata": {field: value for field, value in zip(self.SECTION_FIELDS, key) if value},
+                "chunk_count": chunk_count,
+                "dense_sum": total.tolist(),
+            },
+        )
+
+    def _delete_stale(self, current_ids: List[str]) -> None:
+        self._client.delete(
+            collection_name=self.collection_name,
+            points_selector=models.FilterSelector(
+                filter=models.Filter(must_not=[models.HasIdCondition(has_id=current_ids)]),
+            ),
+        )
+
+    @classmethod
+    def section_id(cls, key: SectionKey) -> str:
+        return str(uuid.uuid5(cls.SECTION_NAMESPACE, json.dumps(list(key))))
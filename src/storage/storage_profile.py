@@ -0,0 +1,101 @@
+from typing import Dict, Optional
+
+from qdrant_client.http import models
+
+from src.config.settings import Settings
+
+
+class StorageProfile:
+    def __init__(
+        self,
+        name: str,
+        quantization: str = "none",
+        hnsw_m: int = 16,
+        hnsw_ef_construct: int = 100,
+        on_disk_vectors: bool = False,
+        on_disk_payload: bool = False,
+        sparse_on_disk: bool = False,
+        sparse_full_scan_threshold: Optional[int] = None,
+        rescore: bool = True,
+        oversampling: float = 1.0,
+    ):
+        self.name = name
+        self.quantization = quantization
+        self.hnsw_m = hnsw_m
+        self.hnsw_ef_construct = hnsw_ef_construct
+        self.on_disk_vectors = on_disk_vectors
+        self.on_disk_payload = on_disk_payload
+        self.sparse_on_disk = sparse_on_disk
+        self.sparse_full_scan_threshold = sparse_full_scan_threshold
+        self.rescore = rescore
+        self.oversampling = oversampling
+
+    @classmethod
+    def from_settings(cls, settings: Settings) -> "StorageProfile":
+        if settings.storage_profile not in STORAGE_PROFILES:
+            raise ValueError(f"Unknown storage profile '{settings.storage_profile}'.")
+        return STORAGE_PROFILES[settings.storage_profile]
+
+    def vector_params(self, dimension: int) -> models.VectorParams:
+        return models.VectorParams(
+            size=dimension,
+            distance=models.Distance.COSINE,
+            on_disk=self.on_disk_vectors,
+        )
+
+    def sparse_vector_params(self) -> models.SparseVectorParams:
+        return models.SparseVectorParams(
+            index=models.SparseIndexParams(
+                on_disk=self.sparse_on_disk,
+                full_scan_threshold=self.sparse_full_scan_threshold,
+            )
+        )
+
+    def hnsw_config(self) -> models.HnswConfigDiff:
+        return models.HnswConfigDiff(m=self.hnsw_m, ef_construct=self.hnsw_ef_construct)
+
+    def quantization_config(self) -> Optional[models.QuantizationConfig]:
+        if self.quantization == "scalar":
+            return models.ScalarQuantization(
+                scalar=models.ScalarQuantizationConfig(type=models.ScalarType.INT8, quantile=0.99, always_ram=True)
+            )
+        if self.quantization == "binary":
+            return models.BinaryQuantization(binary=models.BinaryQuantizationConfig(always_ram=True))
+        return None
+
+    def search_params(self) -> Optional[models.SearchParams]:
+        if self.quantization == "none":
+            return None
+        return models.SearchParams(
+            quantization=models.QuantizationSearchParams(rescore=self.rescore, oversampling=self.oversampling)
+        )
+
+    def __repr__(self) -> str:
+        return f"StorageProfile(name={self.name}, quantization={self.quantization}, on_disk={self.on_disk_vectors})"
+
+
+STORAGE_PROFILES: Dict[str, StorageProfile] = {
+    "memory": StorageProfile(name="memory"),
+    "scalar": StorageProfile(
+        name="scalar",
+        quantization="scalar",
+        on_disk_vectors=True,
+        oversampling=1.5,
+    ),
+    "binary": StorageProfile(
+        name="binary",
+        quantization="binary",
+        on_disk_vectors=True,
+        on_disk_payload=True,
+        oversampling=3.0,
+    ),
+    "disk": StorageProfile(
+        name="disk",
+        hnsw_m=8,
+        hnsw_ef_construct=64,
+        on_disk_vectors=True,
+        on_disk_payload=True,
+        sparse_on_disk=True,
+        sparse_full_scan_threshold=5000,
+    ),
+}
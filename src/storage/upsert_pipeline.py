@@ -0,0 +1,56 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from threading import BoundedSemaphore
+from typing import List
+
+from qdrant_client import QdrantClient
+from qdrant_client.http import models
+
+from src.observability.latency_metrics import METRICS
+
+
+class UpsertPipeline:
+    def __init__(self, client: QdrantClient, collection_name: str, max_pending: int):
+        self._client = client
+        self._collection_name = collection_name
+        self._slots = BoundedSemaphore(max_pending)
+        self._executor = ThreadPoolExecutor(max_workers=max_pending)
+        self._futures: List[Future] = []
+
+    def __enter__(self) -> "UpsertPipeline":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self._executor.shutdown(wait=True)
+
+    def send(self, points: List[models.PointStruct], is_last: bool) -> None:
+        if is_last:
+            self._flush(points)
+            return
+        self._submit(points)
+
+    def _submit(self, points: List[models.PointStruct]) -> None:
+        self._slots.acquire()
+        future = self._executor.submit(self._upsert, points, False)
+        future.add_done_callback(lambda _: self._slots.release())
+        self._futures.append(future)
+        self._raise_failures()
+
+    def _flush(self, points: List[models.PointStruct]) -> None:
+        for future in self._futures:
+            future.result()
+        self._futures.clear()
+        self._upsert(points, True)
+
+    def _upsert(self, points: List[models.PointStruct], wait: bool) -> None:
+        with METRICS.time("ingest.upsert"):
+            self._client.upsert(
+                collection_name=self._collection_name,
+                wait=wait,
+                points=points,
+            )
+
+    def _raise_failures(self) -> None:
+        done = [future for future in self._futures if future.done()]
+        for future in done:
+            future.result()
+            self._futures.remove(future)
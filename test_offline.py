@@ -0,0 +1,639 @@
+import asyncio
+import tempfile
+import threading
+import unittest
+import zlib
+from typing import Dict, List, Set, Tuple
+from unittest import mock
+
+from langchain_core.runnables import RunnableLambda
+
+import numpy as np
+from qdrant_client import QdrantClient
+from qdrant_client.http import models
+
+from benchmarks.fake_embeddings import HashingDenseEmbeddings, HashingSparseEmbedder
+from benchmarks.synthetic_corpus import SyntheticCorpus
+from src.config.settings import Settings
+from src.document.text_chunker import TextChunker
+from src.embeddings.dense_embedder import DenseEmbedder
+from src.embeddings.embedding_cache import DenseEmbeddingCache, QueryEmbeddingCache
+from src.embeddings.query_batcher import QueryBatcher
+from src.generation.context_packer import ContextPacker
+from src.generation.query_expander import QueryExpander
+from src.generation.rag_chain import RAGChain
+from src.generation.semantic_answer_cache import SemanticAnswerCache
+from src.generation.stream_event import StreamEvent
+from src.local.local_hybrid_index import LocalHybridIndex
+from src.local.local_hybrid_searcher import LocalHybridSearcher
+from src.search.hybrid_searcher import HybridSearcher
+from src.search.search_result import SearchResult, SearchResults
+from src.search.section_router import SectionRouter
+from src.storage.bulk_loader import BulkLoader
+from src.storage.collection_manager import CollectionManager
+from src.storage.document_inserter import DocumentInserter
+from src.storage.document_synchronizer import DocumentSynchronizer
+from src.storage.section_index import SectionIndex, section_key
+
+StoredChunk = Tuple[str, int, Tuple[Tuple[str, str], ...]]
+
+def text_seed(text: str) -> int:
+    return zlib.crc32(text.encode("utf-8"))
+
+
+class TieFreeDenseEmbeddings(HashingDenseEmbeddings):
+    def embed_query(self, text: str) -> List[float]:
+        noise = np.random.default_rng(text_seed(text)).normal(scale=0.05, size=self.dimension())
+        return (np.asarray(super().embed_query(text)) + noise).tolist()
+
+
+class TieFreeSparseEmbedder(HashingSparseEmbedder):
+    def embed_many(self, texts: List[str]) -> List[models.SparseVector]:
+        vectors = super().embed_many(texts)
+        for text, vector in zip(texts, vectors):
+            scale = 1.0 + np.random.default_rng(text_seed(text)).random()
+            vector.values = [value * scale for value in vector.values]
+        return vectors
+
+
+GUIDE = "# Guide\n\n## Install\n\nRun pip install rag.\n\n## Usage\n\nCall search with a query.\n"
+
+
+class TestOfflineComponents(unittest.TestCase):
+    """
+    Checks that run without API keys or a Qdrant server: they use the in-process
+    QdrantClient(":memory:") and the hashing embedders from benchmarks/fake_embeddings.py.
+
+    Tests:
+      01 → incremental sync: heading rename, move, delete and add
+      02 → collection lifecycle through the alias: shadow → promote → recreate, legacy concrete collection
+      03 → incremental section centroids match a full rebuild without rescanning the corpus
+      04 → context packing merges neighbouring chunks of one source only
+      05 → hierarchical search still finds text before the first h2 heading
+      06 → the dense embedding cache evicts, reloads and survives a write interrupted before its index commit
+      07 → query expansion: configured Mistral model, parsed rephrasings, fused multi-query search
+      08 → the embedded local engine scores like Qdrant after incremental upserts, re-upserts and filters
+      09 → the query batcher fails every waiting query when a batch returns too few results
+      10 → the embedded local engine fuses like Qdrant: same hybrid order for RRF and DBSF
+      11 → identical chunks under different headings or in different sources are stored and synced separately
+      12 → query embeddings use an in-memory LRU and never write to the on-disk document cache
+      13 → the section index follows the collection through bulk loads, recreate and delete
+      14 → routing is skipped while the section index lags behind the collection
+      15 → async searches query the injected client, never the configured server
+    """
+
+    def setUp(self):
+        self.settings = Settings()
+        self.settings.collection_name = "offline"
+        self.client = QdrantClient(":memory:")
+        self.dense_embedder = HashingDenseEmbeddings(dimension=64)
+        self.sparse_embedder = HashingSparseEmbedder()
+        self.collection_manager = CollectionManager(client=self.client, settings=self.settings)
+        self.collection_manager.recreate(embedding_dimension=self.dense_embedder.dimension())
+        self.inserter = DocumentInserter(
+            client=self.client,
+            settings=self.settings,
+            dense_embedder=self.dense_embedder,
+            sparse_embedder=self.sparse_embedder,
+        )
+        self.chunker = TextChunker(chunk_size=self.settings.chunk_size, overlap=self.settings.chunk_overlap)
+
+    def stored_chunks(self, source: str) -> Set[StoredChunk]:
+        records, _ = self.client.scroll(collection_name=self.settings.collection_name, limit=1000)
+        return {
+            (
+                record.payload[self.settings.content_field],
+                record.payload["chunk_index"],
+                tuple(sorted(record.payload["metadata"].items())),
+            )
+            for record in records
+            if record.payload["source"] == source
+        }
+
+    def expected_chunks(self, text: str) -> Set[StoredChunk]:
+        return {
+            (chunk.content, chunk.index, tuple(sorted(chunk.metadata.items())))
+            for chunk in self.chunker.chunk(text)
+        }
+
+    def sync(self, synchronizer: DocumentSynchronizer, text: str) -> Dict[str, int]:
+        report = synchronizer.sync(self.chunker.chunk(text), source="guide.md")
+        self.assertEqual(self.stored_chunks("guide.md"), self.expected_chunks(text))
+        return {
+            "upserted": report.upserted,
+            "deleted": report.deleted,
+            "moved": report.moved,
+            "unchanged": report.unchanged,
+        }
+
+    def test_01_incremental_sync_tracks_headings(self):
+        """Checks that sync patches chunks whose text is unchanged but whose headings or position changed."""
+        synchronizer = DocumentSynchronizer(client=self.client, settings=self.settings, inserter=self.inserter)
+        self.assertEqual(self.sync(synchronizer, GUIDE), {"upserted": 2, "deleted": 0, "moved": 0, "unchanged": 0})
+
+        renamed = GUIDE.replace("## Install", "## Setup")
+        self.assertEqual(self.sync(synchronizer, renamed), {"upserted": 0, "deleted": 0, "moved": 1, "unchanged": 1})
+
+        moved = "# Guide\n\n## Usage\n\nCall search with a query.\n\n# Appendix\n\n## Setup\n\nRun pip install rag.\n"
+        self.assertEqual(self.sync(synchronizer, moved), {"upserted": 0, "deleted": 0, "moved": 2, "unchanged": 0})
+
+        edited = "# Guide\n\n## Deploy\n\nShip the container.\n\n# Appendix\n\n## Setup\n\nRun pip install rag.\n"
+        self.assertEqual(self.sync(synchronizer, edited), {"upserted": 1, "deleted": 1, "moved": 0, "unchanged": 1})
+
+        self.assertEqual(self.sync(synchronizer, edited), {"upserted": 0, "deleted": 0, "moved": 0, "unchanged": 2})
+
+    def collection_names(self) -> Set[str]:
+        return {collection.name for collection in self.client.get_collections().collections}
+
+    def count(self) -> int:
+        return self.client.count(collection_name=self.settings.collection_name).count
+
+    def test_02_collection_lifecycle_through_alias(self):
+        """Checks that recreate, promote and delete keep the collection name served through one alias."""
+        name = self.settings.collection_name
+        chunks = list(self.chunker.chunk(GUIDE))
+        dimension = self.dense_embedder.dimension()
+        self.assertTrue(self.collection_manager.exists())
+        self.assertNotIn(name, self.collection_names())
+        first = self.collection_manager.alias_targets()
+        self.assertEqual(len(first), 1)
+
+        self.inserter.insert(chunks, source="guide.md")
+        self.assertEqual(self.count(), len(chunks))
+
+        shadow = BulkLoader(self.collection_manager, self.inserter).load([("guide.md", chunks)], dimension)
+        self.assertEqual(self.collection_manager.alias_targets(), [shadow])
+        self.assertNotIn(first[0], self.collection_names())
+        self.assertEqual(self.count(), len(chunks))
+
+        self.collection_manager.recreate(embedding_dimension=dimension)
+        recreated = self.collection_manager.alias_targets()
+        self.assertEqual(len(recreated), 1)
+        self.assertNotEqual(recreated, [shadow])
+        self.assertEqual(self.collection_names(), set(recreated))
+        self.assertEqual(self.count(), 0)
+
+        self.collection_manager.delete()
+        self.assertFalse(self.collection_manager.exists())
+        self.assertEqual(self.collection_names(), set())
+
+        self.client.create_collection(name, vectors_config={})
+        self.assertTrue(self.collection_manager.exists())
+        shadow = BulkLoader(self.collection_manager, self.inserter).load([("guide.md", chunks)], dimension)
+        self.assertEqual(self.collection_manager.alias_targets(), [shadow])
+        self.assertEqual(self.collection_names(), {shadow})
+        self.assertEqual(self.count(), len(chunks))
+
+    def scroll_all(self, collection_name: str, vector_name: str) -> List:
+        records, _ = self.client.scroll(
+            collection_name=collection_name,
+            limit=1000,
+            with_payload=True,
+            with_vectors=[vector_name],
+        )
+        return records
+
+    def expected_sections(self) -> Dict[Tuple[str, str], Tuple[int, np.ndarray]]:
+        vectors: Dict[Tuple[str, str], List[List[float]]] = {}
+        for record in self.scroll_all(self.settings.collection_name, self.settings.dense_field):
+            key = section_key(record.payload["metadata"])
+            vectors.setdefault(key, []).append(record.vector[self.settings.dense_field])
+        return {key: (len(group), np.mean(group, axis=0)) for key, group in vectors.items()}
+
+    def indexed_sections(self, section_index: SectionIndex) -> Dict[Tuple[str, str], Tuple[int, np.ndarray]]:
+        return {
+            section_key(record.payload["metadata"]): (
+                record.payload["chunk_count"],
+                np.asarray(record.payload["dense_sum"]) / record.payload["chunk_count"],
+            )
+            for record in self.scroll_all(section_index.collection_name, self.settings.dense_field)
+        }
+
+    def assert_sections_current(self, section_index: SectionIndex) -> None:
+        expected = self.expected_sections()
+        indexed = self.indexed_sections(section_index)
+        self.assertEqual(sorted(indexed), sorted(expected))
+        for key, (count, centroid) in expected.items():
+            self.assertEqual(indexed[key][0], count, msg=f"Chunk count of {key} drifted.")
+            np.testing.assert_allclose(indexed[key][1], centroid, atol=1e-5)
+
+    def test_03_incremental_section_centroids(self):
+        """Checks that sync updates only the touched section centroids and matches a full rebuild."""
+        section_index = SectionIndex(self.client, self.settings)
+        synchronizer = DocumentSynchronizer(
+            client=self.client,
+            settings=self.settings,
+            inserter=self.inserter,
+            section_index=section_index,
+        )
+        synchronizer.sync(self.chunker.chunk(GUIDE), source="guide.md")
+        self.assert_sections_current(section_index)
+
+        faq = "# Guide\n\n## Install\n\nUse a virtual environment.\n"
+        renamed = GUIDE.replace("## Install", "## Setup")
+        edited = renamed.replace("Call search with a query.", "Call search with a question.")
+        dropped = "# Guide\n\n## Setup\n\nRun pip install rag.\n"
+        with mock.patch.object(SectionIndex, "_centroids", side_effect=AssertionError("full rescan")):
+            for source, text in (("faq.md", faq), ("guide.md", renamed), ("guide.md", edited), ("guide.md", dropped)):
+                synchronizer.sync(self.chunker.chunk(text), source=source)
+                self.assert_sections_current(section_index)
+
+        self.assertEqual(section_index.rebuild(), len(self.expected_sections()))
+        self.assert_sections_current(section_index)
+
+    def test_04_context_packing_keeps_sources_apart(self):
+        """Checks that chunks with equal headings and consecutive indexes from different files stay separate."""
+        metadata = {"header_1": "Guide", "header_2": "Install"}
+        results = SearchResults([
+            SearchResult("Run pip install rag.", 0.9, 0, metadata=metadata, source="guide.md"),
+            SearchResult("Use a virtual environment.", 0.8, 1, metadata=metadata, source="faq.md"),
+            SearchResult("Then import rag.", 0.7, 1, metadata=metadata, source="guide.md"),
+        ])
+        merged = ContextPacker(token_budget=1000, max_overlap=self.settings.chunk_overlap).merge(results)
+
+        self.assertEqual(
+            sorted((result.source, result.content) for result in merged),
+            [("faq.md", "Use a virtual environment."), ("guide.md", "Run pip install rag.\n\nThen import rag.")],
+        )
+
+    def test_05_hierarchical_search_reaches_preamble(self):
+        """Checks that chunks without an h2 heading get a section centroid and stay retrievable."""
+        self.settings.search_mode = "hierarchical"
+        preamble = "Release notes for the offline toolkit."
+        self.inserter.insert(self.chunker.chunk(f"{preamble}\n\n{GUIDE}"), source="guide.md")
+        SectionIndex(self.client, self.settings).rebuild()
+        searcher = HybridSearcher(
+            self.settings,
+            limit=1,
+            client=self.client,
+            dense_embeddings=self.dense_embedder,
+            sparse_embedder=self.sparse_embedder,
+        )
+
+        self.assertIn(("", ""), self.indexed_sections(SectionIndex(self.client, self.settings)))
+        for query in (preamble, "Run pip install rag."):
+            results = list(searcher.search_with_scores(query))
+            self.assertEqual([result.content for result in results], [query])
+
+    def cached_vectors(self, directory: str, texts: List[str]) -> Dict[str, List[float]]:
+        cache = DenseEmbeddingCache(directory, model="offline", max_entries=3)
+        return {text: vector for text, vector in zip(texts, cache.get_many(texts)) if vector is not None}
+
+    def test_06_dense_embedding_cache_is_crash_safe(self):
+        """Checks LRU eviction across reopen and that an interrupted put never maps a key to another text's vector."""
+        texts = ["alpha", "beta", "gamma", "delta", "epsilon"]
+        vectors = {text: self.dense_embedder.embed_query(text) for text in texts}
+        with tempfile.TemporaryDirectory() as directory:
+            cache = DenseEmbeddingCache(directory, model="offline", max_entries=3)
+            cache.put_many(texts[:3], [vectors[text] for text in texts[:3]])
+            cache.get_many(["alpha"])
+            cache.put_many(["delta"], [vectors["delta"]])
+
+            reopened = self.cached_vectors(directory, texts)
+            self.assertEqual(sorted(reopened), ["alpha", "delta", "gamma"])
+            for text, vector in reopened.items():
+                np.testing.assert_allclose(vector, vectors[text], atol=1e-6)
+
+            cache = DenseEmbeddingCache(directory, model="offline", max_entries=3)
+            with mock.patch.object(DenseEmbeddingCache, "_remember", side_effect=OSError("crash")):
+                with self.assertRaises(OSError):
+                    cache.put_many(["epsilon"], [vectors["epsilon"]])
+
+            recovered = self.cached_vectors(directory, texts)
+            self.assertEqual(sorted(recovered), ["delta", "gamma"])
+            for text, vector in recovered.items():
+                np.testing.assert_allclose(vector, vectors[text], atol=1e-6)
+
+    def test_07_query_expansion(self):
+        """Checks that QueryExpander and RAGChain use MISTRAL_MODEL_NAME and that expansions feed multi_search."""
+        self.assertIsNone(QueryExpander.from_settings(self.settings))
+        self.settings.mistral_model = "mistral-small-latest"
+        self.settings.query_expansion_variants = 2
+        rephrasings = RunnableLambda(lambda prompt: "How do I set up rag?\n\n  Which pip command installs it?\nExtra")
+        with mock.patch("src.generation.query_expander.ChatMistralAI", return_value=rephrasings) as chat_model:
+            expander = QueryExpander.from_settings(self.settings)
+        self.assertEqual(chat_model.call_args.kwargs["model"], "mistral-small-latest")
+        with mock.patch("src.generation.rag_chain.start_trace_exporter"):
+            with mock.patch("src.generation.rag_chain.ChatMistralAI", return_value=rephrasings) as chat_model:
+                RAGChain(mock.Mock(spec=HybridSearcher), self.settings)
+        self.assertEqual(chat_model.call_args.kwargs["model"], "mistral-small-latest")
+
+        queries = expander.expand("How to install rag?")
+        self.assertEqual(queries, ["How to install rag?", "How do I set up rag?", "Which pip command installs it?"])
+        expanded = expander.expand_many(["How to install rag?", "Install?"])
+        self.assertEqual(expanded, [queries, ["Install?"] + queries[1:]])
+
+        self.inserter.insert(self.chunker.chunk(GUIDE), source="guide.md")
+        searcher = HybridSearcher(
+            self.settings,
+            limit=1,
+            client=self.client,
+            dense_embeddings=self.dense_embedder,
+            sparse_embedder=self.sparse_embedder,
+        )
+        self.assertEqual([result.content for result in searcher.multi_search(queries)], ["Run pip install rag."])
+
+    def qdrant_scores(self, vector, using: str, metadata: Dict[str, str]) -> Dict[str, float]:
+        response = self.client.query_points(
+            collection_name=self.settings.collection_name,
+            query=vector,
+            using=using,
+            query_filter=HybridSearcher._build_filter(metadata) if metadata else None,
+            limit=1000,
+        )
+        return {str(point.id): point.score for point in response.points}
+
+    def assert_same_scores(self, local: List, qdrant: Dict[str, float]) -> None:
+        local_scores = {str(point.id): point.score for point in local}
+        self.assertEqual(sorted(local_scores), sorted(qdrant))
+        for point_id, score in qdrant.items():
+            self.assertAlmostEqual(local_scores[point_id], score, places=4)
+
+    def test_08_local_engine_matches_qdrant(self):
+        """Checks that the incrementally compiled local index returns Qdrant's dense and sparse scores."""
+        self.settings.dense_prefetch_limit = self.settings.sparse_prefetch_limit = 1000
+        chunks = list(self.chunker.chunk(SyntheticCorpus(seed=3).markdown(12)))
+        index = LocalHybridIndex(self.settings, self.dense_embedder.dimension())
+        local_inserter = DocumentInserter(index, self.settings, self.dense_embedder, self.sparse_embedder)
+        for batch in (chunks[::3], chunks[1::3], chunks[::2], chunks[2::3]):
+            local_inserter.insert(batch, source="corpus.md")
+            index.count()
+        self.inserter.insert(chunks, source="corpus.md")
+        self.assertEqual(index.count(), self.count())
+
+        header_2 = chunks[len(chunks) // 2].metadata["header_2"]
+        for chunk in chunks[::5]:
+            dense = self.dense_embedder.embed_query(chunk.content)
+            sparse = self.sparse_embedder.embed_queries([chunk.content])[0]
+            for metadata in ({}, {"header_2": header_2}):
+                dense_points, sparse_points = index.query(dense, sparse, metadata)
+                self.assert_same_scores(dense_points, self.qdrant_scores(dense, self.settings.dense_field, metadata))
+                self.assert_same_scores(sparse_points, self.qdrant_scores(sparse, self.settings.sparse_field, metadata))
+
+    def test_09_query_batcher_fails_short_results(self):
+        """Checks that a batch returning fewer results than queries fails every future instead of hanging."""
+        batcher = QueryBatcher(lambda texts: texts[:-1], window_seconds=0.05, max_batch_size=3, max_concurrency=1)
+        futures = [batcher.submit(text) for text in ("alpha", "beta", "gamma")]
+        for future in futures:
+            with self.assertRaises(ValueError):
+                future.result(timeout=5)
+        self.assertIsNot(batcher.submit("alpha"), futures[0])
+
+    def test_10_local_engine_fuses_like_qdrant(self):
+        """Checks that LocalHybridSearcher returns Qdrant's fused order and scores for every hybrid fusion."""
+        dense_embedder = TieFreeDenseEmbeddings(dimension=64)
+        sparse_embedder = TieFreeSparseEmbedder()
+        chunks = list(self.chunker.chunk(SyntheticCorpus(seed=5).markdown(12)))
+        index = LocalHybridIndex(self.settings, dense_embedder.dimension())
+        DocumentInserter(index, self.settings, dense_embedder, sparse_embedder).insert(chunks, source="corpus.md")
+        DocumentInserter(self.client, self.settings, dense_embedder, sparse_embedder).insert(chunks, source="corpus.md")
+        queries = [" ".join(chunk.content.split()[:8]) for chunk in chunks[::4]]
+
+        for fusion in ("rrf", "dbsf"):
+            self.settings.hybrid_fusion = fusion
+            local = LocalHybridSearcher(index, self.settings, dense_embedder, sparse_embedder, limit=5)
+            qdrant = HybridSearcher(
+                self.settings,
+                limit=5,
+                client=self.client,
+                dense_embeddings=dense_embedder,
+                sparse_embedder=sparse_embedder,
+            )
+            for query in queries:
+                local_results = local.search_with_scores(query)
+                qdrant_results = qdrant.search_with_scores(query)
+                self.assertEqual(
+                    [result.point_id for result in local_results],
+                    [result.point_id for result in qdrant_results],
+                )
+                for local_result, qdrant_result in zip(local_results, qdrant_results):
+                    self.assertAlmostEqual(local_result.score, qdrant_result.score, places=4)
+    def test_11_identical_chunks_keep_their_own_points(self):
+        """Checks that repeated paragraphs get one point each and sync tracks every copy."""
+        repeated = "# Guide\n\n## One\n\nRun pip install rag.\n\n## Two\n\nRun pip install rag.\n"
+        self.assertEqual(self.inserter.insert(self.chunker.chunk(repeated), source="other.md"), 2)
+        self.assertEqual(self.inserter.insert(self.chunker.chunk(repeated), source="guide.md"), 2)
+        self.assertEqual(self.count(), 4)
+        self.assertEqual(self.stored_chunks("guide.md"), self.expected_chunks(repeated))
+
+        synchronizer = DocumentSynchronizer(client=self.client, settings=self.settings, inserter=self.inserter)
+        self.assertEqual(self.sync(synchronizer, repeated), {"upserted": 0, "deleted": 0, "moved": 0, "unchanged": 2})
+        single = "# Guide\n\n## Two\n\nRun pip install rag.\n"
+        self.assertEqual(self.sync(synchronizer, single), {"upserted": 0, "deleted": 1, "moved": 1, "unchanged": 0})
+        self.assertEqual(self.sync(synchronizer, repeated), {"upserted": 1, "deleted": 0, "moved": 1, "unchanged": 0})
+        self.assertEqual(self.count(), 4)
+
+    def test_12_query_embeddings_stay_in_memory(self):
+        """Checks that DenseEmbedder.embed hits the query LRU and leaves the disk cache to embed_many."""
+        texts = ["beta", "gamma", "beta", "delta", "gamma"]
+        expected = [self.dense_embedder.embed_query(text) for text in texts]
+        with tempfile.TemporaryDirectory() as directory:
+            embedder = DenseEmbedder(
+                model="offline",
+                api_key="",
+                cache=DenseEmbeddingCache(directory, model="offline", max_entries=3),
+                query_cache=QueryEmbeddingCache(max_entries=2),
+            )
+            with mock.patch("src.embeddings.dense_embedder.openai_embeddings", return_value=self.dense_embedder):
+                embedder.embed_many(["alpha"])
+                model = mock.patch.object(HashingDenseEmbeddings, "embed_query", wraps=self.dense_embedder.embed_query)
+                with mock.patch.object(DenseEmbeddingCache, "get_many") as disk_reads, model as model_calls:
+                    self.assertEqual([embedder.embed(text) for text in texts], expected)
+            disk_reads.assert_not_called()
+            self.assertEqual([call.args[0] for call in model_calls.call_args_list], ["beta", "gamma", "delta", "gamma"])
+            self.assertEqual(sorted(self.cached_vectors(directory, ["alpha", "beta", "gamma", "delta"])), ["alpha"])
+    def test_13_section_index_follows_collection_lifecycle(self):
+        """Checks that bulk loads promote freshly built sections and that recreate and delete drop them."""
+        dimension = self.dense_embedder.dimension()
+        section_index = SectionIndex(self.client, self.settings)
+        sections_name = section_index.collection_name
+        self.inserter.insert(self.chunker.chunk(GUIDE), source="guide.md")
+        section_index.rebuild()
+        self.assertIn(sections_name, self.collection_names())
+
+        promoted: List[Set[str]] = []
+        promote = self.collection_manager.promote
+
+        def checked_promote(shadow_name: str) -> None:
+            promoted.append(self.collection_names())
+            promote(shadow_name)
+
+        renamed = list(self.chunker.chunk(GUIDE.replace("## Install", "## Setup")))
+        loader = BulkLoader(self.collection_manager, self.inserter, section_index)
+        with mock.patch.object(self.collection_manager, "promote", side_effect=checked_promote):
+            shadow = loader.load([("guide.md", renamed)], dimension)
+        self.assertIn(SectionIndex.collection_for(shadow), promoted[0])
+        self.assertEqual(self.collection_names(), {shadow, SectionIndex.collection_for(shadow)})
+        self.assert_sections_current(section_index)
+        self.assertIn(("Guide", "Setup"), self.indexed_sections(section_index))
+
+        BulkLoader(self.collection_manager, self.inserter).load([("guide.md", renamed)], dimension)
+        self.assertFalse(self.client.collection_exists(sections_name))
+
+        section_index.rebuild()
+        self.collection_manager.recreate(embedding_dimension=dimension)
+        self.assertFalse(self.client.collection_exists(sections_name))
+        self.inserter.insert(renamed, source="guide.md")
+        section_index.rebuild()
+        self.collection_manager.delete()
+        self.assertEqual(self.collection_names(), set())
+
+    def test_14_stale_section_index_is_not_routed(self):
+        """Checks that chunks inserted after the last section build stay reachable by hierarchical search."""
+        self.settings.search_mode = "hierarchical"
+        self.settings.section_catalog_ttl_seconds = 0
+        self.inserter.insert(self.chunker.chunk(GUIDE), source="guide.md")
+        SectionIndex(self.client, self.settings).rebuild()
+        router = SectionRouter(self.client, self.settings)
+        self.assertTrue(router.is_available())
+
+        faq = "# FAQ\n\n## Licensing\n\nThe toolkit ships under the MIT license.\n"
+        self.inserter.insert(self.chunker.chunk(faq), source="faq.md")
+        self.assertFalse(router.is_available())
+        searcher = HybridSearcher(
+            self.settings,
+            limit=1,
+            client=self.client,
+            dense_embeddings=self.dense_embedder,
+            sparse_embedder=self.sparse_embedder,
+        )
+        results = searcher.search_with_scores("The toolkit ships under the MIT license.")
+        self.assertEqual([result.content for result in results], ["The toolkit ships under the MIT license."])
+
+        SectionIndex(self.client, self.settings).rebuild()
+        self.assertTrue(router.is_available())
+
+    def test_15_async_search_uses_injected_client(self):
+        """Checks that asearch and abatch_search read the same store as the sync path."""
+        self.inserter.insert(self.chunker.chunk(GUIDE), source="guide.md")
+        searcher = HybridSearcher(
+            self.settings,
+            limit=2,
+            client=self.client,
+            dense_embeddings=self.dense_embedder,
+            sparse_embedder=self.sparse_embedder,
+        )
+        queries = ["Run pip install rag.", "Call search with a query."]
+
+        async def search_async():
+            return [await searcher.asearch_with_scores(queries[0]), *await searcher.abatch_search(queries)]
+
+        with mock.patch.object(Settings, "async_qdrant_client", side_effect=AssertionError("configured server")):
+            results = asyncio.run(search_async())
+        expected = [searcher.search_with_scores(queries[0]), *searcher.batch_search(queries)]
+        self.assertEqual(
+            [[result.point_id for result in found] for found in results],
+            [[result.point_id for result in found] for found in expected],
+        )
+
+    def test_16_chain_streams_and_batches_through_cache_and_expansion(self):
+        """Checks that streams read and fill the answer cache and batches retrieve through query expansion."""
+        self.settings.answer_cache_backend = "memory"
+        self.settings.query_expansion_variants = 1
+        self.inserter.insert(self.chunker.chunk(GUIDE), source="guide.md")
+        searcher = HybridSearcher(
+            self.settings,
+            limit=1,
+            client=self.client,
+            dense_embeddings=self.dense_embedder,
+            sparse_embedder=self.sparse_embedder,
+        )
+        prompts: List[str] = []
+        answer_model = RunnableLambda(lambda prompt: prompts.append(prompt.to_string()) or "Run pip install rag.")
+        rephrasings = RunnableLambda(lambda prompt: "How do I set up rag?")
+        with mock.patch("src.generation.query_expander.ChatMistralAI", return_value=rephrasings):
+            expander = QueryExpander.from_settings(self.settings)
+        answer_cache = SemanticAnswerCache.from_settings(self.settings)
+        with mock.patch("src.generation.rag_chain.start_trace_exporter"):
+            with mock.patch("src.generation.rag_chain.ChatMistralAI", return_value=answer_model):
+                chain = RAGChain(searcher, self.settings, answer_cache, expander)
+
+        async def stream_async(question: str) -> List[StreamEvent]:
+            return [event async for event in chain._astream_answer(question, None)]
+
+        streamed = [list(chain._stream_answer("How to install rag?", None)) for _ in range(2)]
+        streamed.append(asyncio.run(stream_async("How to install rag")))
+        for events in streamed:
+            self.assertEqual([event.kind for event in events], [StreamEvent.RETRIEVAL, StreamEvent.TOKEN])
+            self.assertEqual(StreamEvent.answer(events), "Run pip install rag.")
+        self.assertEqual(len(prompts), 1)
+
+        with mock.patch.object(expander, "expand_many", wraps=expander.expand_many) as expand_many:
+            answers = chain._batch_answers(["How to install rag?", "Which command installs rag?"], None)
+        self.assertEqual(answers, ["Run pip install rag.", "Run pip install rag."])
+        expand_many.assert_called_once_with(["Which command installs rag?"])
+        self.assertEqual(len(prompts), 2)
+
+    def test_17_inserts_and_bulk_loads_report_changes(self):
+        """Checks that DocumentInserter and BulkLoader call on_change only once the new points are served."""
+        changes: List[Set[str]] = []
+        on_change = mock.Mock(side_effect=lambda: changes.append(self.collection_names()))
+        inserter = DocumentInserter(
+            client=self.client,
+            settings=self.settings,
+            dense_embedder=self.dense_embedder,
+            sparse_embedder=self.sparse_embedder,
+            on_change=on_change,
+        )
+        inserter.insert([], source="guide.md")
+        on_change.assert_not_called()
+        inserter.insert(self.chunker.chunk(GUIDE), source="guide.md")
+        self.assertEqual(on_change.call_count, 1)
+
+        loaded = mock.Mock(side_effect=lambda: changes.append(self.collection_names()))
+        loader = BulkLoader(self.collection_manager, self.inserter, on_change=loaded)
+        shadow = loader.load([("guide.md", self.chunker.chunk(GUIDE))], self.dense_embedder.dimension())
+        loaded.assert_called_once_with()
+        self.assertEqual(changes[-1], {shadow})
+        self.assertEqual(self.collection_manager.alias_targets(), [shadow])
+
+    def test_18_bulk_load_keeps_each_source(self):
+        """Checks that a bulk load stores every document under its own source, as incremental sync expects."""
+        faq = "# FAQ\n\n## Licensing\n\nThe toolkit ships under the MIT license.\n"
+        documents = [("guide.md", self.chunker.chunk(GUIDE)), ("faq.md", self.chunker.chunk(faq))]
+        BulkLoader(self.collection_manager, self.inserter).load(documents, self.dense_embedder.dimension())
+
+        synchronizer = DocumentSynchronizer(client=self.client, settings=self.settings, inserter=self.inserter)
+        for source, text in [("guide.md", GUIDE), ("faq.md", faq)]:
+            self.assertEqual(synchronizer.sync(self.chunker.chunk(text), source).upserted, 0)
+            self.assertEqual(self.stored_chunks(source), self.expected_chunks(text))
+
+    def test_19_query_batcher_dispatches_when_idle(self):
+        """Checks that an idle batcher embeds at once and batches queries that arrive while a batch runs."""
+        running = threading.Event()
+        release = threading.Event()
+        batches: List[List[str]] = []
+
+        def compute(texts: List[str]) -> List[str]:
+            batches.append(texts)
+            running.set()
+            release.wait(timeout=5)
+            return texts
+
+        batcher = QueryBatcher(compute, window_seconds=60, max_batch_size=8, max_concurrency=2)
+        first = batcher.submit("alpha")
+        self.assertTrue(running.wait(timeout=5))
+        waiting = [batcher.submit(text) for text in ("beta", "gamma")]
+        release.set()
+        self.assertEqual([future.result(timeout=5) for future in [first, *waiting]], ["alpha", "beta", "gamma"])
+        self.assertEqual(batches, [["alpha"], ["beta", "gamma"]])
+    def test_20_chunk_metadata_is_shared_read_only(self):
+        """Checks that chunks share one read-only metadata mapping and every payload gets its own dict."""
+        chunks = list(self.chunker.chunk("# Guide\n\n" + "\n\n".join(["Run pip install rag."] * 400)))
+        self.assertGreater(len(chunks), 1)
+        self.assertIs(chunks[0].metadata, chunks[-1].metadata)
+        with self.assertRaises(TypeError):
+            chunks[0].metadata["header_1"] = "Changed"
+
+        points = [
+            self.inserter._build_point(chunk, "guide.md", [0.0] * 64, models.SparseVector(indices=[], values=[]))
+            for chunk in chunks[:2]
+        ]
+        self.assertIsNot(points[0].payload["metadata"], points[1].payload["metadata"])
+        points[0].payload["metadata"]["header_1"] = "Changed"
+        self.assertEqual(points[1].payload["metadata"], {"header_1": "Guide"})
+        self.assertEqual(chunks[0].metadata, {"header_1": "Guide"})
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -1,17 +1,46 @@
+import asyncio
+import time
 import unittest
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
 
-from qdrant_client import QdrantClient
+import httpx
+from langchain_core.embeddings import Embeddings
+from qdrant_client import AsyncQdrantClient, QdrantClient
+from qdrant_client.http.exceptions import ResponseHandlingException
 
+from benchmarks.chunking import langchain_chunks
+from src.config.qdrant_clients import RetryPolicy
 from src.config.settings import Settings
 from src.document.document_loader import DocumentLoader
 from src.document.text_chunker import TextChunker
 from src.embeddings.dense_embedder import DenseEmbedder
+from src.embeddings.embedding_cache import DenseEmbeddingCache, QueryEmbeddingCache, SparseEmbeddingCache
 from src.embeddings.sparse_embedder import SparseEmbedder
 from src.agent.rag_agent import RAGAgent
+from src.generation.answer_store import InMemoryAnswerStore
+from src.generation.context_packer import ContextPacker, TokenEstimator
 from src.generation.rag_chain import RAGChain
+from src.generation.semantic_answer_cache import SemanticAnswerCache
+from src.generation.stream_event import StreamEvent
 from src.search.hybrid_searcher import HybridSearcher
+from src.search.section_catalog import SectionCatalog
 from src.storage.collection_manager import CollectionManager
 from src.storage.document_inserter import DocumentInserter
+from src.storage.section_index import SectionIndex
+
+
+class CountingEmbeddings(Embeddings):
+    def __init__(self, embedder: DenseEmbedder):
+        self._embedder = embedder
+        self.batch_sizes: List[int] = []
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.batch_sizes.append(len(texts))
+        return self._embedder.embed_many(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
 
 
 class TestRAGPipeline(unittest.TestCase):
@@ -21,21 +50,45 @@ class TestRAGPipeline(unittest.TestCase):
     Tests are prefixed with numbers to guarantee execution order:
       01 → create_collection
       02 → insert_documents
-      03 → hybrid search (LangChain retriever)
+      03 → hybrid search (HybridSearcher, Qdrant Query API)
       04 → hybrid search with metadata filter
       05 → RAG chain (Mistral)
       06 → RAG agent (Mistral tool-calling)
-      07 → delete_collection
+      07 → async hybrid search (concurrent dense/sparse embedding)
+      08 → multi-query search (batched query + reciprocal rank fusion)
+      09 → native Query API search with scores
+      10 → batched RAG chain (one retrieval batch + concurrent generation)
+      11 → streamed RAG chain (retrieval event first, then answer tokens)
+      12 → token-budgeted context packing (merged neighbours, no overlap)
+      13 → semantic answer cache (normalized exact hit, invalidation, batched lookups)
+      14 → section catalog (facet) and centroid index for agent pre-routing
+      15 → hierarchical two-stage search (top sections, then filtered chunks)
+      16 → native chunker parity with the LangChain splitters (batch and streamed)
+      17 → shared pooled Qdrant clients with retries on transient errors
+      18 → micro-batched query embeddings across concurrent searches
     """
 
     settings = Settings()
-    client = QdrantClient(url=settings.vector_db_url, api_key=settings.vector_db_api_key)
+    client = settings.qdrant_client()
     dense_embedder = DenseEmbedder(
         model=settings.model_embeddings,
         api_key=settings.openai_api_key,
+        batch_size=settings.embedding_batch_size,
+        max_concurrency=settings.embedding_max_concurrency,
+        cache=DenseEmbeddingCache.from_settings(settings),
+        query_cache=QueryEmbeddingCache.from_settings(settings),
+    )
+    sparse_embedder = SparseEmbedder(
+        batch_size=settings.sparse_batch_size,
+        parallel=settings.sparse_parallel,
+        cache=SparseEmbeddingCache.from_settings(settings, model=SparseEmbedder.DEFAULT_MODEL),
+    )
+    answer_cache = SemanticAnswerCache.from_settings(settings)
+    collection_manager = CollectionManager(
+        client=client,
+        settings=settings,
+        on_change=answer_cache.invalidate if answer_cache else None,
     )
-    sparse_embedder = SparseEmbedder()
-    collection_manager = CollectionManager(client=client, settings=settings)
     document_inserter = DocumentInserter(
         client=client,
         settings=settings,
@@ -43,7 +96,7 @@ class TestRAGPipeline(unittest.TestCase):
         sparse_embedder=sparse_embedder,
     )
     searcher = HybridSearcher(settings=settings, limit=3)
-    rag_chain = RAGChain(searcher=searcher, settings=settings)
+    rag_chain = RAGChain(searcher=searcher, settings=settings, answer_cache=answer_cache)
     rag_agent = RAGAgent(searcher=searcher, settings=settings)
 
     def test_01_create_collection(self):
@@ -69,13 +122,13 @@ class TestRAGPipeline(unittest.TestCase):
 
         self.assertFalse(chunks.is_empty(), msg="doc.md produced zero chunks – check the file.")
 
-        inserted = self.document_inserter.insert(chunks)
+        inserted = self.document_inserter.insert(chunks, source="doc.md")
         point_count = self.client.count(collection_name=self.settings.collection_name).count
 
         print(f"\n[OK] Inserted {inserted} chunk(s) – collection now holds {point_count} point(s).")
 
     def test_03_search_returns_results(self):
-        """Runs a hybrid search via LangChain QdrantVectorStore and asserts hits."""
+        """Runs a hybrid search through HybridSearcher and the Qdrant Query API and asserts hits."""
         query = "What is Retrieval-Augmented Generation?"
         documents = self.searcher.search(query)
 
@@ -139,6 +192,213 @@ class TestRAGPipeline(unittest.TestCase):
         print(f"\n[OK] Agent query: '{query}'")
         print(f"     Answer:\n{answer}")
 
+    def test_07_async_search_returns_results(self):
+        """Runs the async hybrid search path backed by AsyncQdrantClient."""
+        query = "What is Hybrid Search?"
+        documents = asyncio.run(self.searcher.asearch(query))
+
+        self.assertGreater(
+            len(documents), 0,
+            msg="No results returned from asearch.",
+        )
+
+        print(f"\n[OK] Async query: '{query}'")
+        print(f"     Documents returned: {len(documents)}")
+
+    def test_08_multi_query_search_fuses_results(self):
+        """Runs several query variants as one batch query and fuses them with RRF."""
+        queries = [
+            "What is Qdrant?",
+            "Which vector database stores the embeddings?",
+            "How are sparse vectors indexed?",
+        ]
+        results = self.searcher.multi_search(queries)
+
+        self.assertFalse(results.is_empty(), msg="Multi-query search returned no results.")
+        point_ids = [result.point_id for result in results]
+        self.assertEqual(len(point_ids), len(set(point_ids)), msg="Fused results contain duplicates.")
+
+        print(f"\n[OK] Multi-query: {len(queries)} variants → {len(results)} fused hit(s)")
+        for result in results:
+            print(f"  {result}")
+
+    def test_09_search_with_scores(self):
+        """Runs the native Query API path and asserts typed, scored results."""
+        query = "What is Qdrant?"
+        results = self.searcher.search_with_scores(query, metadata={"header_2": "What is Qdrant?"})
+
+        self.assertFalse(results.is_empty(), msg="Scored search returned no results.")
+        scores = [result.score for result in results]
+        self.assertEqual(scores, sorted(scores, reverse=True), msg="Results are not ordered by score.")
+
+        print(f"\n[OK] Scored query: '{query}'")
+        for result in results:
+            print(f"  {result}")
+
+    def test_10_rag_chain_batch(self):
+        """Answers several questions with one batched retrieval and concurrent LLM calls."""
+        questions = ["What is Hybrid Search?", "What is Qdrant?"]
+        answers = self.rag_chain.batch(questions)
+
+        self.assertEqual(len(answers), len(questions))
+        for answer in answers:
+            self.assertGreater(len(answer), 0, msg="Batched RAG chain returned an empty answer.")
+
+        print(f"\n[OK] Batched {len(questions)} questions")
+        for question, answer in zip(questions, answers):
+            print(f"  {question} → {answer[:80]}")
+
+    def test_11_rag_chain_stream(self):
+        """Streams an answer and asserts retrieval arrives before the first token."""
+        query = "What is Hybrid Search?"
+        events = list(self.rag_chain.stream(query))
+
+        self.assertEqual(events[0].kind, StreamEvent.RETRIEVAL, msg="First event is not the retrieval event.")
+        self.assertFalse(events[0].data.is_empty(), msg="Streamed retrieval returned no sources.")
+        self.assertGreater(len(StreamEvent.answer(events)), 0, msg="Stream produced no answer tokens.")
+
+        print(f"\n[OK] Streamed query: '{query}'")
+        for result in events[0].data:
+            print(f"  {result}")
+        print(f"     Answer:\n{StreamEvent.answer(events)}")
+
+    def test_12_context_packing_fits_budget(self):
+        """Packs retrieved chunks into a token budget without repeating overlapping text."""
+        results = self.searcher.search_with_scores("How does RAG work?")
+        packer = ContextPacker(token_budget=self.settings.context_token_budget, max_overlap=self.settings.chunk_overlap)
+        context = packer.pack(results)
+
+        self.assertGreater(len(context), 0, msg="Packed context is empty.")
+        self.assertLessEqual(TokenEstimator().estimate(context), self.settings.context_token_budget + len(results))
+        self.assertLessEqual(len(context), len("\n\n".join(result.content for result in results)))
+
+        print(f"\n[OK] Packed {len(results)} hits into {TokenEstimator().estimate(context)} estimated tokens")
+
+    def test_13_semantic_answer_cache(self):
+        """Answers a question, then serves its normalized duplicate from the answer cache, also inside batches."""
+        cache = SemanticAnswerCache(
+            store=InMemoryAnswerStore(max_entries=100),
+            collection_name=self.settings.collection_name,
+            similarity_threshold=self.settings.answer_cache_similarity,
+            ttl_seconds=self.settings.answer_cache_ttl_seconds,
+        )
+        chain = RAGChain(searcher=self.searcher, settings=self.settings, answer_cache=cache)
+        first = chain.invoke("What is Qdrant?")
+        started = time.perf_counter()
+        second = chain.invoke("  what is qdrant ")
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        self.assertEqual(first, second, msg="Duplicate question was not served from the cache.")
+        cache.invalidate()
+        self.assertIsNone(cache.get_exact("What is Qdrant?"), msg="Invalidation left a cached answer.")
+
+        answers = chain.batch(["What is Qdrant?", "What is RAG?"])
+        self.assertEqual(chain.batch(["what is qdrant", "What is RAG"]), answers, msg="Batch bypassed the cache.")
+        cached = asyncio.run(chain.abatch(["WHAT IS RAG?"]))
+        self.assertEqual(cached, answers[1:], msg="Async batch bypassed the cache.")
+
+        print(f"\n[OK] Cached answer served in {elapsed_ms:.1f} ms")
+
+    def test_14_section_catalog_and_index(self):
+        """Builds per-section centroids and reads the section catalog from the indexed headings."""
+        sections = SectionIndex(client=self.client, settings=self.settings).rebuild()
+        headings = SectionCatalog(client=self.client, settings=self.settings).headings()
+
+        self.assertIn("What is Qdrant?", headings, msg="Catalog is missing a known h2 heading.")
+        self.assertGreaterEqual(sections, len(headings), msg="Some sections have no centroid.")
+
+        print(f"\n[OK] {sections} section centroid(s) for {len(headings)} heading(s)")
+
+    def test_15_hierarchical_search(self):
+        """Picks the top sections from the centroid index, then searches chunks only inside them."""
+        settings = Settings()
+        settings.search_mode = "hierarchical"
+        searcher = HybridSearcher(settings=settings, limit=5)
+        results = searcher.search_with_scores("How does Qdrant store sparse vectors?")
+        sections = {result.metadata.get("header_2") for result in results}
+
+        self.assertFalse(results.is_empty(), msg="Two-stage search returned no chunks.")
+        self.assertLessEqual(len(sections), settings.section_search_limit, msg="Chunks escaped the top sections.")
+
+        print(f"\n[OK] {len(results)} chunk(s) from section(s): {sorted(sections)}")
+
+    def test_16_native_chunker_parity(self):
+        """Checks the span-based chunker against the LangChain splitters on doc.md and edge cases."""
+        size, overlap = self.settings.chunk_size, self.settings.chunk_overlap
+        with open("doc.md", "r", encoding="utf-8") as file:
+            text = file.read()
+        edge_cases = text + "\n```\n# not a header\n\n\tcode\n```\n#### deep\n" + "x" * (3 * size) + "\n# Tail\n~~~\n"
+        chunker = TextChunker(chunk_size=size, overlap=overlap)
+
+        for sample in (text, edge_cases):
+            native = [(chunk.content, chunk.metadata) for chunk in chunker.chunk(sample)]
+            self.assertEqual(native, langchain_chunks(sample, size, overlap), msg="Chunk boundaries diverged.")
+
+        streamed = [(chunk.content, chunk.metadata) for chunk in chunker.stream(text.splitlines(keepends=True))]
+        self.assertEqual(streamed, langchain_chunks(text, size, overlap), msg="Streamed chunks diverged.")
+
+        print(f"\n[OK] {len(streamed)} chunk(s) identical to the LangChain splitters")
+
+    def test_17_shared_qdrant_client(self):
+        """Checks that components share one pooled client per connection config (and event loop) and retries."""
+        self.assertIsInstance(self.client, QdrantClient)
+        self.assertIs(Settings().qdrant_client(), self.client)
+
+        async def async_clients():
+            return self.settings.async_qdrant_client(), Settings().async_qdrant_client()
+
+        first_loop = asyncio.run(async_clients())
+        second_loop = asyncio.run(async_clients())
+        self.assertIsInstance(first_loop[0], AsyncQdrantClient)
+        self.assertIs(first_loop[0], first_loop[1])
+        self.assertIsNot(first_loop[0], second_loop[0], msg="Async clients must not outlive their event loop.")
+
+        attempts = []
+
+        def flaky_count() -> int:
+            attempts.append(len(attempts))
+            if len(attempts) < 3:
+                raise ResponseHandlingException(httpx.ConnectError("connection refused"))
+            return self.client.count(collection_name=self.settings.collection_name).count
+
+        count = RetryPolicy(retries=3, backoff_seconds=0.01).wrap(flaky_count)()
+        self.assertGreater(count, 0)
+        self.assertEqual(len(attempts), 3)
+
+        with self.assertRaises(ValueError):
+            RetryPolicy(retries=3, backoff_seconds=0.01).wrap(lambda: int("not a number"))()
+
+        print(f"\n[OK] shared client counted {count} point(s) after {len(attempts) - 1} retried failure(s)")
+
+    def test_18_micro_batched_query_embeddings(self):
+        """Checks that concurrent searches share batched, coalesced query embeddings and keep their results."""
+        questions = [
+            "What is hybrid search?",
+            "How does reciprocal rank fusion work?",
+            "What are sparse vectors?",
+            "How is Qdrant used?",
+        ]
+        embeddings = CountingEmbeddings(self.dense_embedder)
+        searcher = HybridSearcher(settings=self.settings, limit=3, dense_embeddings=embeddings)
+        expected = {
+            question: [result.content for result in searcher.search_with_scores(question)]
+            for question in questions
+        }
+        embeddings.batch_sizes.clear()
+
+        workload = questions * 6
+        with ThreadPoolExecutor(max_workers=len(workload)) as pool:
+            results = list(pool.map(searcher.search_with_scores, workload))
+
+        for question, result in zip(workload, results):
+            contents = [item.content for item in result]
+            self.assertEqual(contents, expected[question], msg=f"Batched search diverged for '{question}'.")
+        self.assertLess(len(embeddings.batch_sizes), len(workload))
+        self.assertLess(sum(embeddings.batch_sizes), len(workload))
+
+        print(f"\n[OK] {len(workload)} concurrent searches → {len(embeddings.batch_sizes)} embedding call(s) "
+              f"for {sum(embeddings.batch_sizes)} text(s)")
+
 
 if __name__ == "__main__":
     unittest.main(verbosity=2)